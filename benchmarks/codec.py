@@ -0,0 +1,96 @@
+#! python3
+#Compares grebe_codec against the csv module based encoding and decoding
+#previously used by grebe.Client.
+#
+#Both are timed over the same mix of messages, and the decode speedup is
+#also shown for each message.
+
+import os
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(abspath(sys.path[0]), '..'))
+sys.path.append(join(proj_root, 'clients/Python'))
+
+import argparse
+import csv
+import io
+import struct
+import timeit
+
+import grebe_codec
+
+from grebe import PREFIX_SIZE
+
+def csvEncode(mtype, *args):
+    f = io.StringIO()
+    writer = csv.writer(f)
+    writer.writerow(args)
+    bytes_ = (mtype + ':' + f.getvalue()).encode('utf-8')
+    return struct.pack('!H', len(bytes_)) + bytes_
+
+def csvDecode(body):
+    mtype, argcsv = body.split(':', 1)
+    rows = [row for row in csv.reader(io.StringIO(argcsv))]
+    return mtype, rows[0] if rows else []
+
+#The messages of a game, most of them unquoted MOVE and NEXT bodies
+MESSAGES = [
+    ('MOVE', 'e4'),
+    ('NEXT', 'e4', ''),
+    ('NEXT', '', 'd5'),
+    ('MOVE', '2,2'),
+    ('NEXT', '2,2', '3,1'),
+    ('NEXT', ',', ''),
+    ('START', '...\n...\n...', '1000'),
+    ('END', '1-0', 'Three in a row', '3,3', ''),
+]
+
+def bodyOf(message):
+    data = grebe_codec.encode(*message)
+    return data[PREFIX_SIZE:].decode('utf-8')
+
+def encodeAll(encode):
+    return lambda: [encode(*message) for message in MESSAGES]
+
+def decodeAll(decode, bodies):
+    return lambda: [decode(body) for body in bodies]
+
+def report(name, func, number, count=1):
+    duration = min(timeit.repeat(func, number=number, repeat=3))
+    rate = count * number / duration
+    print('{:<16} {:>12,.0f} msgs/s'.format(name, rate))
+    return rate
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=200000,
+                        help='Number of times the messages are encoded and '
+                             'decoded')
+    args = parser.parse_args()
+
+    number = args.number // len(MESSAGES)
+    count = len(MESSAGES)
+    bodies = [bodyOf(message) for message in MESSAGES]
+
+    before = report('csv encode', encodeAll(csvEncode), number, count)
+    after = report('codec encode', encodeAll(grebe_codec.encode), number, 
+                   count)
+    print('Speedup: {:0.2f}x'.format(after / before))
+
+    before = report('csv decode', decodeAll(csvDecode, bodies), number, count)
+    after = report('codec decode', decodeAll(grebe_codec.decode, bodies), 
+                   number, count)
+    print('Speedup: {:0.2f}x'.format(after / before))
+
+    print('Decode speedup by message')
+    for body in bodies:
+        before = min(timeit.repeat(lambda: csvDecode(body), number=number, 
+                                   repeat=3))
+        after = min(timeit.repeat(lambda: grebe_codec.decode(body), 
+                                  number=number, repeat=3))
+        print('{:<40} {:>6.2f}x'.format(repr(body), before / after))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#! python3
+#Measures move() calls per second of Python game modules.
+#
+#Replays the moves of a conformance case file with each game module given,
+#so rule engines can be compared without a server. Every module should be
+#for the game the cases were recorded for.
+
+import os
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(abspath(sys.path[0]), '..'))
+sys.path.append(join(proj_root, 'server'))
+
+import argparse
+import time
+
+from game_api import (loadCases, loadGameClass)
+
+TICTACTOE = join(proj_root, 'samples/tictactoe/server')
+
+def run(path, games, repeat):
+    Game = loadGameClass(path)
+    moves = 0
+    start = time.perf_counter()
+    for i in range(repeat):
+        for turns in games:
+            game = Game()
+            game.start()
+            for p1Move, p2Move in turns:
+                moves += 1
+                if game.move({'P1': p1Move, 'P2': p2Move}) is None:
+                    break
+    duration = time.perf_counter() - start
+
+    print('{:<40} {:>10} moves {:>8.3f}s {:>12,.0f} moves/s'.format(
+        os.path.relpath(path), moves, duration, moves / duration))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('games', metavar='GAME', nargs='*',
+                        default=[join(TICTACTOE, 'game.py')],
+                        help='Paths to Python game modules')
+    parser.add_argument('--cases', default=join(TICTACTOE, 'conformance.json'),
+                        help='Conformance case file with the moves to play')
+    parser.add_argument('--repeat', type=int, default=1000,
+                        help='Number of times to play every case')
+    args = parser.parse_args()
+
+    games = [case['turns'] for case in loadCases(args.cases)]
+    for path in args.games:
+        run(path, games, args.repeat)
+
+if __name__ == '__main__':
+    main()
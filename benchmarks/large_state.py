@@ -0,0 +1,201 @@
+#! python3
+#Benchmarks receiving multi-megabyte game states as large messages.
+#
+#The reader benchmark sends START messages with states of each size over a
+#socket pair and compares FrameReader, which receives the body straight into
+#a reused buffer, with a loop that builds the body up by bytes concatenation.
+#
+#The server benchmark hosts a generated game with a state of each size on a
+#real server and times two players logging in with the large option until
+#P1 has parsed the START, so it includes the server's encoding.
+
+import os
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(abspath(sys.path[0]), '..'))
+sys.path.append(join(proj_root, 'clients/Python'))
+sys.path.append(join(proj_root, 'server'))
+
+import argparse
+import socket
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+
+import grebe_codec
+
+from grebe import (Client, FrameReader, GameEnd, InvalidMessageFormat,
+                   MAX_LARGE_BODY_SIZE, PREFIX_SIZE)
+from tournament import (SERVERS, findFreePort)
+
+MB = 1024 * 1024
+
+#A game that starts with a state of SIZE bytes and ends after P1's move
+GAME_MODULES = {
+    'python': ('.py', '''
+class Game():
+    def __init__(self):
+        self.result = None
+        self.resultReason = None
+
+    def getState(self):
+        return ('.' * 1023 + '\\n') * ({size} // 1024)
+
+    def start(self):
+        return {{'P1': True, 'P2': False}}
+
+    def move(self, moves):
+        self.result = '1-0'
+        self.resultReason = 'Done'
+        return None
+'''),
+    'node': ('.js', '''
+"use strict";
+
+function Game() {{
+  this.result = null;
+  this.resultReason = null;
+}}
+
+Game.prototype.getState = function getState() {{
+  return new Array({size} / 1024 + 1).join(new Array(1024).join('.') + '\\n');
+}};
+
+Game.prototype.start = function start() {{
+  return {{P1: true, P2: false}};
+}};
+
+Game.prototype.move = function move(moves) {{
+  this.result = '1-0';
+  this.resultReason = 'Done';
+  return null;
+}};
+
+exports.Game = Game;
+'''),
+}
+
+def concatRead(sock):
+    """Reads a large message by concatenating the bytes received"""
+
+    header = bytes()
+    while len(header) < grebe_codec.LARGE_HEADER_SIZE:
+        header += sock.recv(grebe_codec.LARGE_HEADER_SIZE - len(header))
+
+    prefix, length = struct.unpack('!HI', header)
+    if prefix != 0 or length > MAX_LARGE_BODY_SIZE:
+        raise InvalidMessageFormat('Not a large message')
+
+    body = bytes()
+    while len(body) < length:
+        body += sock.recv(length - len(body))
+
+    return body.decode('utf-8')
+
+def makeConcatRead(sock):
+    return lambda: concatRead(sock)
+
+def makeReaderRead(sock):
+    reader = FrameReader(sock)
+    reader.largeFrames = True
+    return lambda: str(reader.read(), 'utf-8')
+
+def runReader(name, makeRead, size, count):
+    message = grebe_codec.encode('START', 'x' * size, 1000)
+    sender, receiver = socket.socketpair()
+
+    def send():
+        for i in range(count):
+            sender.sendall(message)
+
+    with sender, receiver:
+        read = makeRead(receiver)
+        thread = threading.Thread(target=send, daemon=True)
+
+        start = time.perf_counter()
+        thread.start()
+        for i in range(count):
+            read()
+        duration = time.perf_counter() - start
+        thread.join()
+
+    rate = count * len(message) / MB / duration
+    print('{:<12} {:>4} MB x {:<4} {:>8.3f}s {:>10.1f} MB/s'.format(
+        name, size // MB, count, duration, rate))
+    return rate
+
+def runServer(server, size, movetime):
+    extension, template = GAME_MODULES[server]
+    with tempfile.TemporaryDirectory() as directory:
+        path = join(directory, 'large_game' + extension)
+        with open(path, 'w') as f:
+            f.write(template.format(size=size))
+
+        port = findFreePort()
+        process = subprocess.Popen(
+                SERVERS[server] + [path, 'A', 'B', '--port', str(port),
+                                   '--movetime', str(movetime)],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            #Wait until the server is listening
+            process.stdout.readline()
+            return timeServerGame(port, size)
+        finally:
+            process.kill()
+            process.wait()
+
+def timeServerGame(port, size):
+    p1 = Client('localhost', port, largeMessages=True)
+    p2 = Client('localhost', port, largeMessages=True)
+    p2Thread = threading.Thread(target=lambda: p2.login('B', ''),
+                                daemon=True)
+
+    start = time.perf_counter()
+    p2Thread.start()
+    role, state, movetime = p1.login('A', '')
+    duration = time.perf_counter() - start
+    p2Thread.join()
+
+    try:
+        p1.move('done')
+    except GameEnd:
+        pass
+    p1.close()
+    p2.close()
+
+    if len(state) != size:
+        raise RuntimeError('State has {} bytes'.format(len(state)))
+
+    print('{:>4} MB {:>8.3f}s {:>10.1f} MB/s'.format(
+        size // MB, duration, size / MB / duration))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='1,4,16',
+                        help='Comma separated state sizes in MB')
+    parser.add_argument('--count', type=int, default=8,
+                        help='Number of messages of each size to read')
+    parser.add_argument('--server', choices=sorted(SERVERS),
+                        help='Also time START from this server')
+    parser.add_argument('--movetime', type=int, default=10000,
+                        help='The time limit per move in milliseconds')
+    args = parser.parse_args()
+
+    sizes = [int(size) * MB for size in args.sizes.split(',')]
+
+    for size in sizes:
+        concat = runReader('concat', makeConcatRead, size, args.count)
+        reader = runReader('FrameReader', makeReaderRead, size, args.count)
+        print('Speedup: {:0.2f}x'.format(reader / concat))
+
+    if args.server is not None:
+        print('START from the {} server'.format(args.server))
+        for size in sizes:
+            runServer(args.server, size, args.movetime)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+#! python3
+#Measures the client's own cost per turn with the in-memory loopback transport.
+#
+#The fake server answers every MOVE with a NEXT, so the time per turn is the
+#client's encode, send, receive and decode without the kernel or a server
+#process. The socket pair run sends the same replies from a thread for
+#comparison. The cost of grebe.Instruments is shown twice: with them
+#disabled, the default, against a client without the checks for them on the
+#send and receive path, and with them enabled against the default client.
+
+import os
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(abspath(sys.path[0]), '..'))
+sys.path.append(join(proj_root, 'clients/Python'))
+
+import argparse
+import socket
+import threading
+import time
+
+import grebe_codec
+
+from grebe import (Client, FrameReader, Instruments)
+from grebe_loopback import LoopbackServer
+
+class NextServer(LoopbackServer):
+    def handle(self, transport, mtype, margs):
+        self.send(transport, 'NEXT', margs[0], '3,1')
+
+class UninstrumentedClient(Client):
+    """A client without the checks for instruments when sending and
+    receiving, the parts of the turn that are timed by them"""
+
+    def _send(self, msgtype, *args):
+        self._writeBuffer.append(grebe_codec.encode(msgtype, *args))
+        if self.autoFlush:
+            frames = self._writeBuffer
+            self._writeBuffer = []
+            self._sendFrames(frames)
+
+    def _receive(self):
+        if self._writeBuffer and not self._reader.hasFrame():
+            self.flush()
+        body = self._reader.read()
+        self._receivedAt = time.monotonic()
+        return self._decode(str(body, 'utf-8'))
+
+    def _moveSent(self, started):
+        self._moveSentAt = time.monotonic()
+        self._sendOverhead = max(self._sendOverhead * 0.9, 
+                                 self._moveSentAt - started)
+
+def loopbackClient(clientClass=Client):
+    client = clientClass('localhost', 0, transport=NextServer().connect)
+    client._connect()
+    return client, lambda: None
+
+def uninstrumentedClient():
+    return loopbackClient(UninstrumentedClient)
+
+def instrumentedClient():
+    client, stop = loopbackClient()
+    client.instruments = Instruments()
+    return client, stop
+
+def socketPairClient():
+    client = Client('localhost', 0)
+    client._sock, server = socket.socketpair()
+    client._reader = FrameReader(client._sock)
+    reply = grebe_codec.encode('NEXT', '2,2', '3,1')
+
+    def serve():
+        reader = FrameReader(server)
+        try:
+            while True:
+                reader.read()
+                server.sendall(reply)
+        except (ConnectionError, OSError):
+            pass
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+
+    def stop():
+        client.close()
+        thread.join()
+        server.close()
+
+    return client, stop
+
+def run(name, makeClient, turns, repeat=1):
+    """Returns the turns per second of the fastest of `repeat` runs"""
+
+    duration = None
+    for i in range(repeat):
+        client, stop = makeClient()
+        client._loggedIn = True
+
+        start = time.perf_counter()
+        for j in range(turns):
+            client.move('2,2')
+        runDuration = time.perf_counter() - start
+        stop()
+        client.close()
+
+        if duration is None or runDuration < duration:
+            duration = runDuration
+
+    print('{:<14} {:>10} turns {:>8.3f}s {:>12,.0f} turns/s'.format(
+        name, turns, duration, turns / duration))
+    return turns / duration
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--turns', type=int, default=200000,
+                        help='Number of MOVE/NEXT round trips')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs of each client, the fastest is kept')
+    args = parser.parse_args()
+
+    uninstrumented = run('uninstrumented', uninstrumentedClient, args.turns,
+                         args.repeat)
+    loopback = run('loopback', loopbackClient, args.turns, args.repeat)
+    instrumented = run('instrumented', instrumentedClient, args.turns,
+                       args.repeat)
+    pair = run('socketpair', socketPairClient, args.turns, args.repeat)
+
+    print('Loopback speedup: {:0.2f}x'.format(loopback / pair))
+    print('Instruments overhead, disabled: {:0.1%}'.format(
+        uninstrumented / loopback - 1))
+    print('Instruments overhead, enabled: {:0.1%}'.format(
+        loopback / instrumented - 1))
+
+if __name__ == '__main__':
+    main()
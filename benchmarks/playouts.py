@@ -0,0 +1,68 @@
+#! python3
+#Benchmarks the MCTS player's search with different numbers of workers.
+#
+#Searches the empty board and a mid game position for the move time with
+#each worker count and reports playouts per second and the speed up over one
+#worker, to see how the root parallel search scales with cores.
+
+import os
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(abspath(sys.path[0]), '..'))
+sys.path.append(join(proj_root, 'clients/Python'))
+sys.path.append(join(proj_root, 'samples/tictactoe/clients/Python'))
+sys.path.append(join(proj_root, 'samples/tictactoe/players/Python'))
+
+import argparse
+import multiprocessing
+import time
+
+from grebe import Deadline
+from mcts import Searcher
+from tictactoe import (Position, TicTacToe)
+
+POSITIONS = {
+    'empty': '...\n...\n...',
+    'midgame': 'X..\n.O.\n..X',
+}
+
+def run(workers, position, movetime, searches):
+    with Searcher(workers) as searcher:
+        for i in range(searches):
+            searcher.search(position,
+                            Deadline(time.monotonic() + movetime / 1000))
+        return searcher.playoutsPerSecond
+
+def parseCounts(value):
+    return [int(count) for count in value.split(',')]
+
+def main():
+    cores = multiprocessing.cpu_count()
+    defaultWorkers = sorted({count for count in (1, 2, 4) if count <= cores} |
+                            {cores})
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=parseCounts, default=defaultWorkers,
+                        help='Comma separated worker counts')
+    parser.add_argument('--movetime', type=int, default=1000,
+                        help='The time for each search in milliseconds')
+    parser.add_argument('--searches', type=int, default=3,
+                        help='Number of searches of each position')
+    args = parser.parse_args()
+
+    print('{} cores'.format(cores))
+    print('{:>8} {:>8} {:>12} {:>8}'.format(
+        'position', 'workers', 'playouts/s', 'speed up'))
+    for name, state in POSITIONS.items():
+        position = Position.fromState(TicTacToe._parseState(None, state))
+        baseline = None
+        for workers in args.workers:
+            rate = run(workers, position, args.movetime, args.searches)
+            baseline = baseline or rate
+            print('{:>8} {:>8} {:>12.0f} {:>7.2f}x'.format(
+                name, workers, rate, rate / baseline))
+
+if __name__ == '__main__':
+    main()
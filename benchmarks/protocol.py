@@ -0,0 +1,323 @@
+#! python3
+#Protocol throughput and latency benchmark.
+#
+#Plays full tic-tac-toe games between zero-think random players on real
+#server processes and measures turns per second, the move() to NEXT round
+#trip latency, messages per second and bytes per turn. Every combination of
+#the spectator counts and concurrent server counts is run and the results are
+#written as JSON. Use --compare to check a run against an earlier one.
+#
+#Spectators are multiplexed by a grebe_host.Host in the main thread and every
+#player runs in its own thread. Rates are over the time from the first START
+#to the last END of each batch of concurrent matches, so server start up and
+#logins aren't included. Message and byte counts include every connection,
+#with 2 bytes of length prefix per message.
+
+import os
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(abspath(sys.path[0]), '..'))
+sys.path.append(join(proj_root, 'clients/Python'))
+sys.path.append(join(proj_root, 'samples/tictactoe/clients/Python'))
+sys.path.append(join(proj_root, 'server'))
+
+import argparse
+import datetime
+import json
+import platform
+import random
+import subprocess
+import threading
+import time
+
+import grebe_codec
+
+from grebe import (Client, GameEnd, PREFIX_SIZE)
+from grebe_host import (Host, Strategy)
+from tictactoe import (TicTacToe, coordsOf)
+from tournament import (SERVERS, findFreePort)
+
+HOST = 'localhost'
+
+GAMES = {
+    'node': join(proj_root, 'samples/tictactoe/server/game.js'),
+    'python': join(proj_root, 'samples/tictactoe/server/game.py'),
+}
+
+def counting(clientClass):
+    """Returns a subclass of `clientClass` that counts messages and bytes"""
+
+    class CountingClient(clientClass):
+        messages = 0
+        bytes = 0
+
+        def _send(self, msgtype, *args):
+            self.messages += 1
+            self.bytes += len(grebe_codec.encode(msgtype, *args))
+            return super()._send(msgtype, *args)
+
+        def _decode(self, body):
+            self.messages += 1
+            self.bytes += PREFIX_SIZE + len(body.encode('utf-8'))
+            return super()._decode(body)
+
+    return CountingClient
+
+CountingClient = counting(Client)
+CountingTicTacToe = counting(TicTacToe)
+
+def percentile(values, p):
+    """The nearest rank percentile of sorted `values`"""
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * p // 100))
+    return values[int(rank) - 1]
+
+def startServer(serverCommand, gamePath, movetime):
+    """Starts a server and returns `(process, port)` once it is listening"""
+
+    for attempt in range(3):
+        port = findFreePort()
+        server = subprocess.Popen(
+                serverCommand + [gamePath, 'A', 'B',
+                                 '--port', str(port),
+                                 '--movetime', str(movetime)],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                universal_newlines=True)
+
+        line = server.stdout.readline()
+        if line == 'Server started\n':
+            return server, port
+
+        stdout, stderr = server.communicate()
+        if 'Port already in use' not in stderr:
+            raise RuntimeError((line + stdout + stderr).strip())
+
+    raise RuntimeError('No free port found')
+
+
+class Player():
+    """Plays random moves and records the round trip of each move"""
+
+    def __init__(self, username, port):
+        self.username = username
+        self.client = CountingTicTacToe(HOST, port)
+        self.latencies = []
+        self.turns = 0
+        self.started = None
+        self.ended = None
+        self.error = None
+
+    def randomMove(self):
+        cells = list(self.client.position.legalMoves())
+        return coordsOf(random.choice(cells))
+
+    def move(self):
+        start = time.perf_counter()
+        try:
+            self.client.move(*self.randomMove())
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+            self.turns += 1
+
+    def run(self):
+        client = self.client
+        try:
+            role, _, _ = client.login(self.username, '')
+            self.started = time.perf_counter()
+            self.turns = 1
+
+            if role == 'P1':
+                self.move()
+
+            while True:
+                client.waitForNextTurn()
+                self.turns += 1
+                self.move()
+
+        except GameEnd:
+            self.ended = time.perf_counter()
+        except Exception as error:
+            self.error = error
+        finally:
+            client.close()
+
+
+def runBatch(serverCommand, gamePath, servers, spectators, movetime, timeout):
+    """Plays one match on each of `servers` servers at the same time"""
+
+    processes = []
+    players = []
+    host = Host()
+    seats = []
+    try:
+        for i in range(servers):
+            process, port = startServer(serverCommand, gamePath, movetime)
+            processes.append(process)
+            for j in range(spectators):
+                seats.append(host.add(CountingClient(HOST, port),
+                                      'S{}'.format(j), '', Strategy()))
+            players.append(Player('A', port))
+            players.append(Player('B', port))
+
+        limit = time.monotonic() + timeout
+        while any(seat.role is None for seat in seats):
+            if time.monotonic() > limit:
+                raise RuntimeError('Spectators failed to log in')
+            host.poll(0.1)
+
+        threads = [threading.Thread(target=player.run, daemon=True)
+                   for player in players]
+        for thread in threads:
+            thread.start()
+        host.run(timeout)
+        for thread in threads:
+            thread.join(timeout)
+
+        for process in processes:
+            process.communicate(timeout=timeout)
+    finally:
+        host.close()
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+                process.communicate()
+
+    return players, seats
+
+def runConfig(serverCommand, gamePath, servers, spectators, games, movetime,
+              timeout):
+    latencies = []
+    turns = 0
+    messages = 0
+    bytes_ = 0
+    duration = 0
+    played = 0
+    errors = 0
+
+    while played < games:
+        players, seats = runBatch(serverCommand, gamePath,
+                                  min(servers, games - played), spectators,
+                                  movetime, timeout)
+        played += len(players) // 2
+
+        finished = [player for player in players if player.ended is not None]
+        errors += len(players) - len(finished)
+        if finished:
+            duration += (max(player.ended for player in finished) -
+                         min(player.started for player in finished))
+
+        for player in finished:
+            latencies.extend(player.latencies)
+        #Each player counts every turn of its match
+        turns += sum(player.turns for player in finished) // 2
+        messages += sum(player.client.messages for player in players)
+        messages += sum(seat.client.messages for seat in seats)
+        bytes_ += sum(player.client.bytes for player in players)
+        bytes_ += sum(seat.client.bytes for seat in seats)
+
+    latencies.sort()
+    ms = lambda value: None if value is None else value * 1000
+    return {
+        'servers': servers,
+        'spectators': spectators,
+        'games': played,
+        'errors': errors,
+        'turns': turns,
+        'duration': duration,
+        'turnsPerSecond': turns / duration if duration else None,
+        'messagesPerSecond': messages / duration if duration else None,
+        'bytesPerTurn': bytes_ / turns if turns else None,
+        'latencyP50Ms': ms(percentile(latencies, 50)),
+        'latencyP99Ms': ms(percentile(latencies, 99)),
+    }
+
+def report(result):
+    print('{:>7} {:>10} {:>6} {:>10.1f} {:>12.1f} {:>9.1f} {:>8.3f} {:>8.3f}'
+          .format(result['servers'], result['spectators'], result['games'],
+                  result['turnsPerSecond'] or 0,
+                  result['messagesPerSecond'] or 0,
+                  result['bytesPerTurn'] or 0,
+                  result['latencyP50Ms'] or 0,
+                  result['latencyP99Ms'] or 0))
+
+def compare(results, baselinePath):
+    with open(baselinePath) as f:
+        baseline = json.load(f)
+
+    previous = {(result['servers'], result['spectators']): result
+                for result in baseline['results']}
+
+    print()
+    print('Compared to ' + baselinePath)
+    print('{:>7} {:>10} {:>12} {:>12}'.format(
+        'servers', 'spectators', 'turns/s', 'p99'))
+    for result in results:
+        old = previous.get((result['servers'], result['spectators']))
+        if old is None:
+            continue
+        change = lambda key: (
+                '{:+.1%}'.format(result[key] / old[key] - 1)
+                if result[key] and old[key] else '-')
+        print('{:>7} {:>10} {:>12} {:>12}'.format(
+            result['servers'], result['spectators'],
+            change('turnsPerSecond'), change('latencyP99Ms')))
+
+def parseCounts(value):
+    return [int(count) for count in value.split(',')]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--server', choices=sorted(SERVERS), default='node')
+    parser.add_argument('--spectators', type=parseCounts, default=[0, 10, 100],
+                        help='Comma separated spectator counts per server')
+    parser.add_argument('--servers', type=parseCounts, default=[1, 4, 16],
+                        help='Comma separated concurrent server counts')
+    parser.add_argument('--games', type=int, default=32,
+                        help='Number of games for each configuration')
+    parser.add_argument('--movetime', type=int, default=1000,
+                        help='The time limit per move in milliseconds')
+    parser.add_argument('--timeout', type=float, default=60,
+                        help='Seconds before a batch of matches is abandoned')
+    parser.add_argument('--output', default='protocol.json',
+                        help='Path to write the JSON results to')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='A previous JSON results file to compare with')
+    args = parser.parse_args()
+
+    serverCommand = SERVERS[args.server]
+    gamePath = GAMES[args.server]
+
+    print('{:>7} {:>10} {:>6} {:>10} {:>12} {:>9} {:>8} {:>8}'.format(
+        'servers', 'spectators', 'games', 'turns/s', 'msgs/s', 'B/turn',
+        'p50 ms', 'p99 ms'))
+
+    results = []
+    for servers in args.servers:
+        for spectators in args.spectators:
+            result = runConfig(serverCommand, gamePath, servers, spectators,
+                               args.games, args.movetime, args.timeout)
+            results.append(result)
+            report(result)
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'benchmark': 'protocol',
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'server': args.server,
+            'games': args.games,
+            'movetime': args.movetime,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results,
+        }, f, indent=2)
+    print('Results written to ' + args.output)
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == '__main__':
+    main()
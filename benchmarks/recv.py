@@ -0,0 +1,100 @@
+#! python3
+#Compares FrameReader against the previous bytes concatenation receive loop.
+#
+#A sender thread writes bursts of NEXT and END sized frames to one end of a 
+#socket pair and the messages are read back from the other end.
+
+import os
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(abspath(sys.path[0]), '..'))
+sys.path.append(join(proj_root, 'clients/Python'))
+
+import argparse
+import socket
+import struct
+import threading
+import time
+
+from grebe import (FrameReader, InvalidMessageFormat, 
+                   MAX_BODY_SIZE, PREFIX_SIZE)
+
+def frame(body):
+    bytes_ = body.encode('utf-8')
+    return struct.pack('!H', len(bytes_)) + bytes_
+
+BURST = (frame('NEXT:"2,2",') + 
+         frame('NEXT:,"3,1"') + 
+         frame('END:1-0,Three in a row,"3,3",'))
+FRAMES_PER_BURST = 3
+
+def concatRead(sock):
+    """The receive loop used by Client._recv before FrameReader"""
+
+    prefix_bytes = bytes()
+    while (len(prefix_bytes) < PREFIX_SIZE):
+        total_bytes_needed = PREFIX_SIZE - len(prefix_bytes)
+        prefix_bytes += sock.recv(total_bytes_needed)
+
+    length = struct.unpack_from('!H', prefix_bytes)[0]
+    if length == 0:
+        raise InvalidMessageFormat('Length prefix is 0')
+    if length > MAX_BODY_SIZE:
+        raise InvalidMessageFormat('Length prefix is too large')
+
+    body_bytes = bytes() 
+    while (len(body_bytes) < length):
+        total_bytes_needed = length - len(body_bytes)
+        body_bytes += sock.recv(total_bytes_needed)
+
+    return body_bytes.decode('utf-8')
+
+def makeConcatRead(sock):
+    return lambda: concatRead(sock)
+
+def makeReaderRead(sock):
+    reader = FrameReader(sock)
+    return lambda: str(reader.read(), 'utf-8')
+
+def run(name, makeRead, bursts):
+    sender, receiver = socket.socketpair()
+
+    def send():
+        #Sends 64 bursts at a time and then the rest
+        payload = BURST * 64
+        for i in range(bursts // 64):
+            sender.sendall(payload)
+        if bursts % 64:
+            sender.sendall(BURST * (bursts % 64))
+
+    with sender, receiver:
+        read = makeRead(receiver)
+        thread = threading.Thread(target=send, daemon=True)
+
+        start = time.perf_counter()
+        thread.start()
+        count = bursts * FRAMES_PER_BURST
+        for i in range(count):
+            read()
+        duration = time.perf_counter() - start
+        thread.join()
+
+    print('{:<12} {:>10} msgs {:>8.3f}s {:>12,.0f} msgs/s'.format(
+        name, count, duration, count / duration))
+    return count / duration
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bursts', type=int, default=100000,
+                        help='Number of NEXT,NEXT,END bursts to send')
+    args = parser.parse_args()
+
+    concat = run('concat', makeConcatRead, args.bursts)
+    reader = run('FrameReader', makeReaderRead, args.bursts)
+
+    print('Speedup: {:0.2f}x'.format(reader / concat))
+
+if __name__ == '__main__':
+    main()
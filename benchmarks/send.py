@@ -0,0 +1,66 @@
+#! python3
+#Compares sending each message with its own syscall against buffering
+#messages and flushing them together.
+#
+#A client writes MOVE messages to one end of a socket pair while a thread
+#drains the other end.
+
+import os
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(abspath(sys.path[0]), '..'))
+sys.path.append(join(proj_root, 'clients/Python'))
+
+import argparse
+import socket
+import threading
+import time
+
+from grebe import Client
+
+def run(name, messages, batch):
+    client = Client('localhost', 0)
+    client._sock, receiver = socket.socketpair()
+    client.autoFlush = batch == 1
+
+    def drain():
+        while receiver.recv(1 << 16):
+            pass
+
+    thread = threading.Thread(target=drain, daemon=True)
+    thread.start()
+
+    start = time.perf_counter()
+    for i in range(0, messages, batch):
+        for j in range(batch):
+            client._send('MOVE', '2,2')
+        client.flush()
+    duration = time.perf_counter() - start
+
+    client.close()
+    thread.join()
+    receiver.close()
+
+    count = (messages // batch) * batch
+    print('{:<12} {:>10} msgs {:>8.3f}s {:>12,.0f} msgs/s'.format(
+        name, count, duration, count / duration))
+    return count / duration
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=500000)
+    parser.add_argument('--batches', type=lambda value: [
+                            int(size) for size in value.split(',')],
+                        default=[4, 16, 64],
+                        help='Comma separated numbers of messages per flush')
+    args = parser.parse_args()
+
+    single = run('unbuffered', args.messages, 1)
+    for batch in args.batches:
+        rate = run('flush/{}'.format(batch), args.messages, batch)
+        print('Speedup: {:0.2f}x'.format(rate / single))
+
+if __name__ == '__main__':
+    main()
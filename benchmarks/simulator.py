@@ -0,0 +1,63 @@
+#! python3
+#Compares the batch simulator with playing games one at a time with game.py.
+#
+#Both play random moves on empty cells until the game ends. Requires NumPy.
+
+import os
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(abspath(sys.path[0]), '..'))
+sys.path.append(join(proj_root, 'samples/tictactoe/server'))
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+import batch
+import game
+
+def playGames(count):
+    cells = ['{},{}'.format(row, column)
+             for row in range(1, 4) for column in range(1, 4)]
+    for i in range(count):
+        instance = game.TicTacToe()
+        toMove = instance.start()
+        free = list(cells)
+        random.shuffle(free)
+        while toMove is not None:
+            move = free.pop()
+            toMove = instance.move({'P1': move if toMove['P1'] else None,
+                                    'P2': move if toMove['P2'] else None})
+
+def playBatch(count):
+    simulator = batch.BatchTicTacToe(count)
+    policy = batch.randomPolicy()
+    simulator.play(policy, policy)
+
+def run(name, play, count):
+    start = time.perf_counter()
+    play(count)
+    duration = time.perf_counter() - start
+    print('{:<8} {:>10} games {:>8.3f}s {:>12,.0f} games/s'.format(
+        name, count, duration, count / duration))
+    return count / duration
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=1000000,
+                        help='Number of games for the batch simulator')
+    parser.add_argument('--single-games', type=int, default=50000,
+                        help='Number of games to play one at a time')
+    args = parser.parse_args()
+
+    single = run('game.py', playGames, args.single_games)
+    batched = run('batch', playBatch, args.games)
+
+    print('Speedup: {:0.1f}x'.format(batched / single))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+#! python3
+#Spectator fan-out benchmark.
+#
+#Plays tic-tac-toe games between zero-think random players while many
+#spectators watch and measures the players' move() to NEXT round trip with
+#and without the spectators, and how long after the players each spectator
+#receives every NEXT and END. Every spectator's events are checked against
+#the moves the players made, so a dropped or reordered event is reported.
+#
+#Spectators are AsyncSpectatorClients on an asyncio loop in the main thread
+#and every player runs in its own thread. Delivery latency is from the first
+#player receiving an event to a spectator receiving it.
+
+import os
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(abspath(sys.path[0]), '..'))
+sys.path.append(join(proj_root, 'clients/Python'))
+sys.path.append(join(proj_root, 'samples/tictactoe/clients/Python'))
+sys.path.append(join(proj_root, 'server'))
+
+import argparse
+import asyncio
+import threading
+import time
+
+from grebe import AsyncSpectatorClient
+from protocol import (GAMES, HOST, Player, percentile, startServer)
+from tictactoe import TicTacToe
+from tournament import SERVERS
+
+class TimedTicTacToe(TicTacToe):
+    """Records when each NEXT and END is received"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.eventTimes = []
+
+    def _decode(self, body):
+        if body.startswith(('NEXT:', 'END:')):
+            self.eventTimes.append(time.perf_counter())
+        return super()._decode(body)
+
+class TimedPlayer(Player):
+    def __init__(self, username, port):
+        super().__init__(username, port)
+        self.client = TimedTicTacToe(HOST, port)
+
+class Spectator():
+    def __init__(self, port, bufferLimit):
+        self.client = AsyncSpectatorClient(HOST, port)
+        if bufferLimit:
+            self.client.bufferLimit = bufferLimit
+        self.events = []
+        self.eventTimes = []
+
+    async def run(self):
+        async for mtype, margs in self.client.events():
+            self.events.append((mtype, margs))
+            if mtype in ('NEXT', 'END'):
+                self.eventTimes.append(time.perf_counter())
+
+async def playGame(serverCommand, gamePath, spectatorCount, movetime,
+                   bufferLimit, timeout):
+    process, port = startServer(serverCommand, gamePath, movetime)
+    spectators = [Spectator(port, bufferLimit) for i in range(spectatorCount)]
+    players = [TimedPlayer('A', port), TimedPlayer('B', port)]
+    try:
+        #Spectators log in first so none of them miss START
+        await asyncio.wait_for(asyncio.gather(*[
+            spectator.client.login('S{}'.format(i), '')
+            for i, spectator in enumerate(spectators)]), timeout)
+
+        threads = [threading.Thread(target=player.run, daemon=True)
+                   for player in players]
+        for thread in threads:
+            thread.start()
+        await asyncio.wait_for(asyncio.gather(*[
+            spectator.run() for spectator in spectators]), timeout)
+
+        loop = asyncio.get_running_loop()
+        for thread in threads:
+            await loop.run_in_executor(None, thread.join, timeout)
+        process.communicate(timeout=timeout)
+    finally:
+        for spectator in spectators:
+            spectator.client.close()
+        if process.poll() is None:
+            process.kill()
+            process.communicate()
+
+    return players, spectators
+
+def firstReceived(players):
+    """When the first player received each NEXT and END"""
+    return [min(times) for times in
+            zip(*(player.client.eventTimes for player in players))]
+
+def checkSpectator(spectator, reference, eventCount):
+    """Returns a description of what's wrong with the events `spectator`
+    received or None if they match `reference`"""
+
+    if spectator.events != reference.events:
+        return 'events differ from the first spectator'
+    if len(spectator.eventTimes) != eventCount:
+        return 'received {} NEXT and END events, expected {}'.format(
+            len(spectator.eventTimes), eventCount)
+    if not spectator.events or spectator.events[0][0] != 'START':
+        return 'START not received'
+    if spectator.events[-1][0] != 'END':
+        return 'END not received'
+    moved = sum(1 for mtype, margs in spectator.events if mtype == 'MOVED')
+    if moved != eventCount:
+        return 'received {} MOVED events, expected {}'.format(
+            moved, eventCount)
+    return None
+
+def runConfig(serverCommand, gamePath, spectatorCount, games, movetime,
+              bufferLimit, timeout):
+    roundTrips = []
+    deliveries = []
+    errors = []
+    for game in range(games):
+        players, spectators = asyncio.run(playGame(
+                serverCommand, gamePath, spectatorCount, movetime,
+                bufferLimit, timeout))
+
+        for player in players:
+            if player.error is not None:
+                errors.append('{}: {!r}'.format(player.username,
+                                                player.error))
+            roundTrips.extend(player.latencies)
+
+        times = firstReceived(players)
+        for number, spectator in enumerate(spectators):
+            problem = checkSpectator(spectator, spectators[0], len(times))
+            if problem is not None:
+                errors.append('S{}: {}'.format(number, problem))
+                continue
+            deliveries.extend(received - sent for received, sent
+                              in zip(spectator.eventTimes, times))
+
+    roundTrips.sort()
+    deliveries.sort()
+    ms = lambda value: None if value is None else value * 1000
+    return {
+        'spectators': spectatorCount,
+        'games': games,
+        'errors': errors,
+        'roundTripP50Ms': ms(percentile(roundTrips, 50)),
+        'roundTripP99Ms': ms(percentile(roundTrips, 99)),
+        'deliveryP50Ms': ms(percentile(deliveries, 50)),
+        'deliveryP99Ms': ms(percentile(deliveries, 99)),
+    }
+
+def parseCounts(value):
+    return [int(count) for count in value.split(',')]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--server', choices=sorted(SERVERS), default='node')
+    parser.add_argument('--spectators', type=parseCounts, default=[0, 1000],
+                        help='Comma separated spectator counts')
+    parser.add_argument('--games', type=int, default=5,
+                        help='Number of games for each spectator count')
+    parser.add_argument('--movetime', type=int, default=1000,
+                        help='The time limit per move in milliseconds')
+    parser.add_argument('--buffer-limit', type=int, default=0,
+                        help="Each spectator's receive buffer limit in bytes")
+    parser.add_argument('--timeout', type=float, default=60,
+                        help='Seconds before a game is abandoned')
+    args = parser.parse_args()
+
+    serverCommand = SERVERS[args.server]
+    gamePath = GAMES[args.server]
+
+    print('{:>10} {:>6} {:>7} {:>12} {:>12} {:>12} {:>12}'.format(
+        'spectators', 'games', 'errors', 'rtt p50 ms', 'rtt p99 ms',
+        'deliv p50 ms', 'deliv p99 ms'))
+    failed = False
+    for spectatorCount in args.spectators:
+        result = runConfig(serverCommand, gamePath, spectatorCount,
+                           args.games, args.movetime, args.buffer_limit,
+                           args.timeout)
+        print('{:>10} {:>6} {:>7} {:>12.3f} {:>12.3f} {:>12} {:>12}'.format(
+            result['spectators'], result['games'], len(result['errors']),
+            result['roundTripP50Ms'] or 0, result['roundTripP99Ms'] or 0,
+            '-' if result['deliveryP50Ms'] is None
+                else '{:.3f}'.format(result['deliveryP50Ms']),
+            '-' if result['deliveryP99Ms'] is None
+                else '{:.3f}'.format(result['deliveryP99Ms'])))
+        for error in result['errors'][:10]:
+            print('  ' + error)
+        failed = failed or bool(result['errors'])
+
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
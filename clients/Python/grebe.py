@@ -1,14 +1,48 @@
 #! python3
 
-import csv
-import io
+import asyncio
+import collections
+import math
 import socket
 import struct
+import threading
+import time
+
+import grebe_codec
 
 MAX_MESSAGE_SIZE = 512
 PREFIX_SIZE = 2
 MAX_BODY_SIZE = 510
 
+#The longest large message body accepted, see `LARGE_OPTION`
+MAX_LARGE_BODY_SIZE = 64 * 1024 * 1024
+
+#Enough room for a burst of full sized messages to be read in one syscall
+RECV_BUFFER_SIZE = 64 * MAX_MESSAGE_SIZE
+
+#Seconds kept in reserve when working out a move deadline
+DEFAULT_SAFETY_MARGIN = 0.005
+
+#Number of round trip times used to estimate the latency
+LATENCY_SAMPLES = 8
+
+#Most buffers a single sendmsg call takes on common platforms
+MAX_SEND_BUFFERS = 1024
+
+#LOGIN option for playing a session of games on one connection
+SESSION_OPTION = 'session'
+
+#LOGIN option for taking a player's seat back after losing the connection
+RESUME_OPTION = 'resume'
+
+#LOGIN option for messages longer than MAX_BODY_SIZE, framed as described
+#in grebe_codec
+LARGE_OPTION = 'large'
+
+#The first and the longest waits between attempts to reconnect, in seconds
+RECONNECT_DELAY = 0.01
+MAX_RECONNECT_DELAY = 0.25
+
 class AlreadyLoggedIn(Exception):
     pass
 
@@ -40,6 +74,19 @@ class ClientAlreadyLoggedIn(Exception):
 class UserAlreadyLoggedIn(Exception):
     pass
 
+class NotASpectator(Exception):
+    """Raised when a `SpectatorClient` is logged in as a player"""
+
+    def __init__(self, role):
+        self.role = role
+
+    def __str__(self):
+        return repr(self.role)
+
+class NoMoveFound(Exception):
+    """Raised when a search offers no move before its deadline"""
+    pass
+
 class GameEnd(Exception):
 
     def __init__(self, result, reason, p1Move, p2Move):
@@ -52,14 +99,396 @@ class GameEnd(Exception):
         return repr((self.result, self.reason))
 
 
-class Client():
+class FrameReader():
+    """Reads length prefixed message bodies from a socket or transport.
+
+    Bytes are received with `recv_into` into a preallocated buffer. Each
+    `recv_into` takes as many bytes as the socket has available, so a burst of
+    messages is read with a single syscall and the frames are then parsed 
+    from the buffer one at a time.
+
+    Large messages are only read once `largeFrames` is set. Their bodies are
+    received straight into a second buffer that is kept for the next one and
+    only grows, so they aren't built up by concatenation. When `fill` is
+    used to wait for `hasFrame`, the main buffer grows instead to hold the
+    whole of a large message."""
+
+    def __init__(self, sock, size=RECV_BUFFER_SIZE):
+        if size < MAX_MESSAGE_SIZE:
+            raise ValueError('size must be at least MAX_MESSAGE_SIZE')
+
+        self.largeFrames = False
+        self._sock = sock
+        self._buffer = bytearray(size)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = 0
+        self._large = bytearray()
+        self._largeView = memoryview(self._large)
+
+    def read(self):
+        """Returns the body of the next message as a memoryview.
+
+        The view is only valid until the next call to `read`."""
+
+        while self._end - self._start < PREFIX_SIZE:
+            self.fill()
+
+        length = self._peekLength()
+        if length == 0 and self.largeFrames:
+            return self._readLarge()
+        if length == 0:
+            raise InvalidMessageFormat('Length prefix is 0')
+        if length > MAX_BODY_SIZE:
+            raise InvalidMessageFormat('Length prefix is too large')
+
+        frame_end = self._start + PREFIX_SIZE + length
+        while self._end < frame_end:
+            self.fill()
+            frame_end = self._start + PREFIX_SIZE + length
+
+        body = self._view[self._start + PREFIX_SIZE:frame_end]
+        self._start = frame_end
+        return body
+
+    def _readLarge(self):
+        while self._end - self._start < grebe_codec.LARGE_HEADER_SIZE:
+            self.fill()
+
+        length, = struct.unpack_from('!I', self._buffer,
+                                     self._start + PREFIX_SIZE)
+        if length > MAX_LARGE_BODY_SIZE:
+            raise InvalidMessageFormat('Length prefix is too large')
+        self._start += grebe_codec.LARGE_HEADER_SIZE
+
+        if len(self._large) < length:
+            self._large = bytearray(max(length, 2 * len(self._large)))
+            self._largeView = memoryview(self._large)
+        view = self._largeView
+
+        #The whole body is buffered if it was waited for with fill
+        if self._end - self._start >= length:
+            body = self._view[self._start:self._start + length]
+            self._start += length
+            return body
+
+        #Otherwise only the start of the body can already be buffered
+        received = self._end - self._start
+        view[:received] = self._view[self._start:self._start + received]
+        self._start += received
+
+        while received < length:
+            count = self._sock.recv_into(view[received:length])
+            if count == 0:
+                raise ConnectionError('Connection closed by server')
+            received += count
+
+        return view[:length]
+
+    def hasFrame(self):
+        """Returns True if a complete message is already buffered."""
+        available = self._end - self._start
+        if available < PREFIX_SIZE:
+            return False
+        return available >= self._frameSize()
+
+    def _peekLength(self):
+        return struct.unpack_from('!H', self._buffer, self._start)[0]
+
+    def _frameSize(self):
+        """The size of the next frame, or MAX_MESSAGE_SIZE if a large one's
+        length hasn't been received"""
+
+        if self._end - self._start < PREFIX_SIZE:
+            return MAX_MESSAGE_SIZE
+        length = self._peekLength()
+        if length != 0 or not self.largeFrames:
+            return PREFIX_SIZE + length
+        if self._end - self._start < grebe_codec.LARGE_HEADER_SIZE:
+            return MAX_MESSAGE_SIZE
+        length, = struct.unpack_from('!I', self._buffer,
+                                     self._start + PREFIX_SIZE)
+        if length > MAX_LARGE_BODY_SIZE:
+            raise InvalidMessageFormat('Length prefix is too large')
+        return grebe_codec.LARGE_HEADER_SIZE + length
+
+    def fill(self):
+        """Receives available bytes into the buffer with one `recv_into`.
+
+        This blocks if the socket has no bytes available."""
+
+        #Move the partial frame to the front if the next one might not fit
+        #and grow the buffer for a large one that is bigger than it
+        size = max(self._frameSize(), MAX_MESSAGE_SIZE)
+        if self._start == self._end:
+            self._start = self._end = 0
+        elif (len(self._buffer) - self._start < size or
+              self._end == len(self._buffer)):
+            pending = self._end - self._start
+            if len(self._buffer) < size:
+                buffer = bytearray(max(size, 2 * len(self._buffer)))
+                buffer[:pending] = self._view[self._start:self._end]
+                self._buffer = buffer
+                self._view = memoryview(buffer)
+            else:
+                self._buffer[:pending] = self._buffer[self._start:self._end]
+            self._start = 0
+            self._end = pending
+
+        count = self._sock.recv_into(self._view[self._end:])
+        if count == 0:
+            raise ConnectionError('Connection closed by server')
+        self._end += count
+
+
+class Deadline():
+    """The time by which a move has to be sent
+
+    `expires` is a `time.monotonic` time. Searches should check `expired` or
+    `remaining` and call `offer` with the best move found so far."""
+
+    def __init__(self, expires):
+        self.expires = expires
+        self.best = None
+        self._stopped = False
+
+    def remaining(self):
+        if self._stopped:
+            return 0.0
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self):
+        return self._stopped or time.monotonic() >= self.expires
+
+    @property
+    def stopped(self):
+        return self._stopped
+
+    def offer(self, *args):
+        """Records the arguments for `move` of the best move so far"""
+        self.best = args
+
+    def stop(self):
+        self._stopped = True
+
+
+class Ponderer():
+    """Searches predicted positions while waiting for the next turn.
+
+    `search(key, deadline)` is called in a worker thread for each key passed
+    to `ponder` and offers moves to `deadline` like the searches passed to
+    `Client.moveBeforeDeadline`. Pondering deadlines don't expire until they
+    are stopped.
+
+    Once the actual turn is known, `take` returns the move found for it. If
+    the key is still being searched, that search carries on under the real
+    deadline instead of starting again.
+
+    Keys can be anything hashable that identifies a position."""
+
+    def __init__(self, search):
+        self._search = search
+        self._condition = threading.Condition()
+        self._pending = collections.deque()
+        self._results = {}
+        self._currentKey = None
+        self._currentDeadline = None
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def ponder(self, keys):
+        """Searches `keys` in order, replacing any keys still pending"""
+
+        keys = list(keys)
+        with self._condition:
+            self._pending = collections.deque(
+                    key for key in keys if key not in self._results)
+            if (self._currentKey is not None and 
+                self._currentKey not in keys):
+                self._currentDeadline.stop()
+            self._condition.notify_all()
+
+    def take(self, key, deadline):
+        """Returns the best move found for `key` or None
+
+        Waits until `deadline` if `key` is being searched. All other 
+        pondering is stopped and the cached results are cleared."""
+
+        with self._condition:
+            self._pending.clear()
+            try:
+                if key in self._results:
+                    return self._results[key].best
+
+                if self._currentKey == key:
+                    current = self._currentDeadline
+                    current.expires = deadline.expires
+                    while (self._currentKey == key and 
+                           not deadline.expired):
+                        self._condition.wait(deadline.remaining())
+                    current.stop()
+                    return current.best
+
+                if self._currentDeadline is not None:
+                    self._currentDeadline.stop()
+                return None
+            finally:
+                self._results.clear()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._pending.clear()
+            if self._currentDeadline is not None:
+                self._currentDeadline.stop()
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+
+                key = self._pending.popleft()
+                deadline = Deadline(math.inf)
+                self._currentKey = key
+                self._currentDeadline = deadline
+
+            try:
+                self._search(key, deadline)
+            except Exception:
+                #Pondering is speculative. The same search will raise again
+                #if it is run for the actual turn.
+                deadline.stop()
+
+            with self._condition:
+                if not deadline.stopped:
+                    self._results[key] = deadline
+                self._currentKey = None
+                self._currentDeadline = None
+                self._condition.notify_all()
+
+
+class Instruments():
+    """Timings and counts from a client's hot path
+
+    Set a client's `instruments` to an `Instruments` to turn them on. Each
+    message received is timed in three stages: `recv`, waiting for it and the
+    syscalls to read it, `decode` and `parse`, the `_parseState` and
+    `_parseMove` hooks. Each message sent is timed in `encode` and `send`.
+    Each move is also timed in `think`, from receiving the START or NEXT for
+    the turn until the MOVE is sent, which is the time spent by the strategy.
+
+    Totals and maximums are kept for each stage, see `summary`. To export
+    every sample, pass a `callback` that takes `(event, mtype, value)`.
+    `event` is a stage with the seconds as `value`, or `sent` or `received`
+    with the message size in bytes."""
+
+    STAGES = ('recv', 'decode', 'parse', 'think', 'encode', 'send')
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.messagesSent = 0
+        self.messagesReceived = 0
+        self.bytesSent = 0
+        self.bytesReceived = 0
+        self.counts = dict.fromkeys(self.STAGES, 0)
+        self.totals = dict.fromkeys(self.STAGES, 0.0)
+        self.maximums = dict.fromkeys(self.STAGES, 0.0)
+
+    def timing(self, stage, mtype, seconds):
+        self.counts[stage] += 1
+        self.totals[stage] += seconds
+        if seconds > self.maximums[stage]:
+            self.maximums[stage] = seconds
+        if self.callback is not None:
+            self.callback(stage, mtype, seconds)
+
+    def message(self, direction, mtype, size):
+        if direction == 'sent':
+            self.messagesSent += 1
+            self.bytesSent += size
+        else:
+            self.messagesReceived += 1
+            self.bytesReceived += size
+        if self.callback is not None:
+            self.callback(direction, mtype, size)
+
+    def summary(self):
+        """Returns the counts and the timings of each stage as a dict"""
+        return {
+            'messagesSent': self.messagesSent,
+            'messagesReceived': self.messagesReceived,
+            'bytesSent': self.bytesSent,
+            'bytesReceived': self.bytesReceived,
+            'stages': {stage: {'count': self.counts[stage],
+                               'total': self.totals[stage],
+                               'max': self.maximums[stage]}
+                       for stage in self.STAGES},
+        }
+
+
+class BaseClient():
+    """Message handling shared by `Client` and `AsyncClient`.
+
+    Subclasses for specific games override `_formatMove`, `_parseMove` and
+    `_parseState`. They can also override `_onStart` and `_onNext` to keep 
+    their own game state up to date as turns are played, and `_onResume`,
+    which is called with the current state when turns were missed while
+    reconnecting and by default calls `_onStart`.
+    
+    The time each START and NEXT is received is recorded so a `Deadline` for
+    the current turn can be worked out. It allows for the round trip time to
+    the server, estimated from the time between sending a move and receiving
+    the next turn, and for the time it takes to send a move."""
 
     def __init__(self, host, port):
         self._host = host
         self._port = port
-        self._sock = None
         self._loggedIn = False
 
+        self.role = None
+        self.movetime = None
+        self.safetyMargin = DEFAULT_SAFETY_MARGIN
+        self._receivedAt = None
+        self._turnStart = None
+        self._moveSentAt = None
+        self._sendOverhead = 0.0
+        self._roundTrips = collections.deque(maxlen=LATENCY_SAMPLES)
+        self._gameOver = False
+        self._turn = 0
+        self._pendingMove = None
+        #Set when the state was caught up from RESUME instead of the moves
+        self._resynced = False
+        self.instruments = None
+        self.largeMessages = False
+        self._largeFrames = False
+
+    @property
+    def latency(self):
+        """The estimated round trip time to the server in seconds
+
+        The minimum of recent samples is used since a sample also includes 
+        any time spent waiting for the other player."""
+        return min(self._roundTrips) if self._roundTrips else 0.0
+
+    def deadline(self):
+        """Returns the `Deadline` for the current turn"""
+        return Deadline(self._turnStart + self.movetime - self.latency - 
+                        self._sendOverhead - self.safetyMargin)
+
+    def _moveSent(self, started):
+        self._moveSentAt = time.monotonic()
+        self._sendOverhead = max(self._sendOverhead * 0.9, 
+                                 self._moveSentAt - started)
+        if self.instruments is not None and self._turnStart is not None:
+            self.instruments.timing('think', 'MOVE', started - self._turnStart)
+
     def _formatMove(self, *args):
         return args[0]
 
@@ -69,24 +498,27 @@ class Client():
     def _parseState(self, value):
         return value
 
-    def login(self, username, password):
-        if self._loggedIn:
-            raise AlreadyLoggedIn()
+    def _onStart(self, initialState):
+        pass
 
-        self._connect()
-        role, = self._login(username, password)
-        initialState, movetime = self._waitForStart()
+    def _onNext(self, p1move, p2move):
+        pass
 
-        self._loggedIn = True
-        return role, initialState, movetime
-    
-    def _connect(self):
-        self._sock = socket.create_connection((self._host, self._port))
+    def _onResume(self, state):
+        self._onStart(state)
+
+    def _loginOptions(self, *options):
+        if self.largeMessages:
+            options += (LARGE_OPTION,)
+        return options
 
-    def _login(self, username, password):
-        self._send('LOGIN', username, password)
-        mtype, margs = self._recv()
+    def _acceptOptions(self, margs):
+        """Returns the options accepted in the LOGIN/SUCCESS arguments"""
+        accepted = margs[1].split() if len(margs) > 1 else []
+        self._largeFrames = LARGE_OPTION in accepted
+        return accepted
 
+    def _checkLogin(self, mtype, margs):
         #TODO: Other errors
         if mtype == 'LOGIN/FAILURE':
             reason = margs[0]
@@ -99,84 +531,655 @@ class Client():
 
         #TODO: Check 'LOGIN/SUCCESS' message type
 
+        self.role = margs[0]
         return margs
 
-
-    def _waitForStart(self):
-        mtype, margs = self._recv()
+    def _checkStart(self, mtype, margs):
         if mtype != 'START':
             raise Exception('Unexpected message type')
 
+        started = (time.perf_counter() if self.instruments is not None 
+                   else None)
         initialState = self._parseState(margs[0])
+        if started is not None:
+            self.instruments.timing('parse', mtype, 
+                                    time.perf_counter() - started)
+
         movetime = int(margs[1]) / 1000
+        self.movetime = movetime
+        #Sessions say which role the client has in each game
+        if len(margs) > 2:
+            self.role = margs[2]
+        self._turnStart = self._receivedAt
+        self._gameOver = False
+        self._turn = 1
+        self._pendingMove = None
+        self._onStart(initialState)
         return initialState, movetime
 
-    def move(self, *args):
-        self._send('MOVE', self._formatMove(*args))
-        return self.waitForNextTurn()
-
-    def waitForNextTurn(self):
-        mtype, margs = self._recv()
+    def _checkNext(self, mtype, margs):
         if mtype != 'NEXT':
             raise Exception('Unexpected message type')
+
+        self._turnStart = self._receivedAt
+        if self._moveSentAt is not None:
+            self._roundTrips.append(self._receivedAt - self._moveSentAt)
+            self._moveSentAt = None
+        started = (time.perf_counter() if self.instruments is not None 
+                   else None)
         p1move = self._parseMove(margs[0])
         p2move = self._parseMove(margs[1])
+        if started is not None:
+            self.instruments.timing('parse', mtype, 
+                                    time.perf_counter() - started)
+
+        self._turn += 1
+        self._pendingMove = None
+        if self._resynced:
+            self._resynced = False
+        else:
+            self._onNext(p1move, p2move)
         return (p1move, p2move)
 
-    def _send(self, msgtype, *args):
-        text = msgtype + ":" + self._toCsv(*args)
-        bytes_ = text.encode('utf-8')
-        prefix = struct.pack('!H', len(bytes_))
+    def _checkSpectatorEvent(self, mtype, margs):
+        if mtype == 'START':
+            return mtype, self._checkStart(mtype, margs)
+        elif mtype == 'NEXT':
+            return mtype, self._checkNext(mtype, margs)
+        elif mtype == 'MOVED':
+            role, move = margs
+            return mtype, (role, self._parseMove(move))
+        raise Exception('Unexpected message type')
+
+    def _decode(self, body):
+        try:
+            mtype, margs = grebe_codec.decode(body)
+        except ValueError as error:
+            raise InvalidMessageFormat(str(error))
+
+        if mtype == 'END':
+            result, reason, p1move, p2move = margs
+            self._gameOver = True
+            raise GameEnd(result, reason, 
+                          self._parseMove(p1move), self._parseMove(p2move))
+
+        elif mtype == 'INVALID':
+            raise InvalidMessageSent(margs[0])
+
+        return (mtype, margs)
+
+
+def connectSocket(host, port):
+    """The default transport for `Client`, a TCP connection"""
+    return socket.create_connection((host, port))
+
+def setNoDelay(sock, noDelay):
+    """Sets TCP_NODELAY if `sock` is a TCP socket"""
+    if (getattr(sock, 'family', None) in (socket.AF_INET, socket.AF_INET6) and
+        sock.type == socket.SOCK_STREAM):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, int(noDelay))
+
+def sendFrames(sock, frames):
+    """Sends every byte of `frames`, a list of bytes objects
+
+    Several frames are sent with scatter-gather `sendmsg` calls if `sock`
+    has it, otherwise they are joined and sent with `sendall`."""
+
+    if len(frames) == 1:
+        sock.sendall(frames[0])
+        return
+
+    sendmsg = getattr(sock, 'sendmsg', None)
+    if sendmsg is None:
+        sock.sendall(b''.join(frames))
+        return
+
+    buffers = [memoryview(frame) for frame in frames]
+    start = 0
+    while start < len(buffers):
+        sent = sendmsg(buffers[start:start + MAX_SEND_BUFFERS])
+        #Skip the buffers that were sent and trim a partly sent one
+        while sent and sent >= len(buffers[start]):
+            sent -= len(buffers[start])
+            start += 1
+        if sent:
+            buffers[start] = buffers[start][sent:]
+
 
-        self._sock.send(prefix + bytes_)
+class Client(BaseClient):
+    """A blocking client
 
-    def _toCsv(self, *args):
-        f = io.StringIO()
-        writer = csv.writer(f)
-        writer.writerow(args)
-        return f.getvalue()
+    `transport` is called with the host and port to connect. It returns an
+    object with the socket methods `send`, `recv_into` and `close`. By
+    default a TCP socket is used; `grebe_loopback` has an in-memory 
+    transport for tests and benchmarks.
 
-    def _fromCsv(self, line):
-        return [row for row in csv.reader(io.StringIO(line))]
+    `instruments` is an optional `Instruments` that times the client's
+    handling of each message.
+
+    Messages are sent as soon as they are written unless `autoFlush` is
+    False, when they are buffered until `flush` is called or the client
+    waits for a message. Buffered messages are sent together with as few
+    syscalls as possible. `noDelay` sets TCP_NODELAY on the connection, so
+    small messages aren't delayed by Nagle's algorithm; None leaves the
+    system default.
+
+    With `reconnect`, a player that loses its connection during a game logs
+    in again, retrying with exponential backoff until the move time has
+    passed, and carries on where it left off. A move the server didn't get
+    is sent again and a turn missed while disconnected is returned by the
+    next `waitForNextTurn`. The server must accept the `resume` option.
+
+    With `largeMessages`, the client asks for messages longer than
+    MAX_BODY_SIZE at LOGIN, which games with large states need. The server
+    must accept the `large` option."""
+
+    def __init__(self, host, port, transport=connectSocket, instruments=None,
+                 noDelay=True, reconnect=False, largeMessages=False):
+        super().__init__(host, port)
+        self.instruments = instruments
+        self.largeMessages = largeMessages
+        self.autoFlush = True
+        self.noDelay = noDelay
+        self.reconnect = reconnect
+        self._transport = transport
+        self._sock = None
+        self._reader = None
+        self._writeBuffer = []
+        self._credentials = None
+        self._resumable = False
+        self._resuming = False
+
+    def login(self, username, password):
+        if self._loggedIn:
+            raise AlreadyLoggedIn()
+
+        self._connect()
+        role, *_ = self._loginWithOptions(username, password)
+        initialState, movetime = self._waitForStart()
+
+        self._loggedIn = True
+        return role, initialState, movetime
+    
+    def _connect(self):
+        self._sock = self._transport(self._host, self._port)
+        if self.noDelay is not None:
+            setNoDelay(self._sock, self.noDelay)
+        self._reader = FrameReader(self._sock)
+        self._reader.largeFrames = self._largeFrames
+
+    def _login(self, username, password, *options):
+        if options:
+            self._send('LOGIN', username, password, ' '.join(options))
+        else:
+            self._send('LOGIN', username, password)
+        return self._checkLogin(*self._recv())
+
+    def _loginWithOptions(self, username, password, *options):
+        """Logs in asking for `options` and the options the client is set up
+        for. Returns the LOGIN/SUCCESS arguments."""
+
+        if self.reconnect:
+            options += (RESUME_OPTION,)
+        options = self._loginOptions(*options)
+        margs = self._login(username, password, *options)
+        accepted = self._acceptOptions(margs)
+        self._reader.largeFrames = self._largeFrames
+        self._credentials = (username, password) + options
+        self._resumable = RESUME_OPTION in accepted
+        return margs
+
+    def _waitForStart(self):
+        return self._checkStart(*self._recv())
+
+    def games(self, username, password):
+        """Logs in for a session and returns an iterator of its games
+
+        Each game is `(role, initialState, movetime)`. The role can change
+        from game to game. Play each game as after `login`, until `GameEnd`
+        is raised; if a game is left before then, the rest of it is skipped.
+        The connection stays open between games and the iterator ends when
+        the server closes it after the last one. A server without sessions
+        plays a single game."""
+
+        if self._loggedIn:
+            raise AlreadyLoggedIn()
+
+        self._connect()
+        role, *options = self._loginWithOptions(username, password,
+                                                SESSION_OPTION)
+        session = bool(options) and SESSION_OPTION in options[0].split()
+        self._loggedIn = True
+        try:
+            initialState, movetime = self._waitForStart()
+            while True:
+                yield self.role, initialState, movetime
+                if not session:
+                    return
+
+                while not self._gameOver:
+                    try:
+                        self._recv()
+                    except GameEnd:
+                        pass
+                try:
+                    initialState, movetime = self._waitForStart()
+                except ConnectionError:
+                    return
+        finally:
+            self.close()
+
+    def move(self, *args):
+        started = time.monotonic()
+        self._pendingMove = self._formatMove(*args)
+        self._send('MOVE', self._pendingMove)
+        self._moveSent(started)
+        return self.waitForNextTurn()
+
+    def moveBeforeDeadline(self, search):
+        """Sends the best move found by `search` before the deadline.
+
+        `search` is called with the turn's `Deadline` in another thread and
+        offers moves to it. The best move offered is sent when `search`
+        returns or the deadline expires, whichever is first. Returns the
+        same value as `move`."""
+
+        deadline = self.deadline()
+        finished = threading.Event()
+        errors = []
+
+        def run():
+            try:
+                search(deadline)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                finished.set()
+
+        threading.Thread(target=run, daemon=True).start()
+        finished.wait(deadline.remaining())
+        deadline.stop()
+
+        if errors:
+            raise errors[0]
+        if deadline.best is None:
+            raise NoMoveFound()
+
+        return self.move(*deadline.best)
+
+    def waitForNextTurn(self):
+        return self._checkNext(*self._recv())
+
+    def flush(self):
+        """Sends every buffered message"""
+        if not self._writeBuffer:
+            return
+        if self.instruments is not None:
+            return self._instrumentedFlush(None)
+
+        frames = self._writeBuffer
+        self._writeBuffer = []
+        self._sendFrames(frames)
+
+    def _send(self, msgtype, *args):
+        if self.instruments is not None:
+            return self._instrumentedSend(msgtype, args)
+        self._writeBuffer.append(grebe_codec.encode(msgtype, *args))
+        if self.autoFlush:
+            frames = self._writeBuffer
+            self._writeBuffer = []
+            self._sendFrames(frames)
+
+    def _sendFrames(self, frames):
+        try:
+            sendFrames(self._sock, frames)
+        except ConnectionError:
+            #The game is resumed when the next message is waited for
+            if not self._canResume():
+                raise
 
     def _recv(self):
+        try:
+            return self._receive()
+        except ConnectionError:
+            if not self._canResume():
+                raise
+        return self._resumeGame()
 
-        prefix_bytes = bytes()
-        while (len(prefix_bytes) < PREFIX_SIZE):
-            total_bytes_needed = PREFIX_SIZE - len(prefix_bytes)
-            prefix_bytes += self._sock.recv(total_bytes_needed)
+    def _canResume(self):
+        return (self._resumable and self._loggedIn and not self._resuming and
+                self._turn > 0 and not self._gameOver)
 
-        length = struct.unpack_from('!H', prefix_bytes)[0]
-        if length == 0:
-            raise InvalidMessageFormat('Length prefix is 0')
-        if length > MAX_BODY_SIZE:
-            raise InvalidMessageFormat('Length prefix is too large')
+    def _resumeGame(self):
+        """Logs in again after the connection was lost during a game and
+        returns the game's next message
 
-        body_bytes = bytes() 
-        while (len(body_bytes) < length):
-            total_bytes_needed = length - len(body_bytes)
-            body_bytes += self._sock.recv(total_bytes_needed)
+        Attempts are retried with exponential backoff until the move time
+        has passed, by when the server will have ended the game."""
 
-        body = body_bytes.decode('utf-8')
-        mtype, argcsv = body.split(':', 1)
-        rows = self._fromCsv(argcsv)
-        if len(rows) > 1:
-            raise InvalidMessageFormat(
-                    'Multiple CSV rows received in message body')
+        lost = time.monotonic()
+        delay = RECONNECT_DELAY
+        self._resuming = True
+        try:
+            while True:
+                self._sock.close()
+                self._writeBuffer = []
+                try:
+                    self._connect()
+                    self._login(*self._credentials)
+                    mtype, margs = self._receive()
+                    break
+                except (OSError, UserAlreadyLoggedIn) as error:
+                    if time.monotonic() + delay - lost > self.movetime:
+                        raise ConnectionError(
+                                'Could not resume the game') from error
+                    time.sleep(delay)
+                    delay = min(2 * delay, MAX_RECONNECT_DELAY)
+        finally:
+            self._resuming = False
 
-        margs = rows[0] if rows else []
+        if mtype != 'RESUME':
+            raise Exception('Unexpected message type')
 
-        if mtype == 'END':
-            result, reason, p1move, p2move = margs
-            raise GameEnd(result, reason, 
-                          self._parseMove(p1move), self._parseMove(p2move))
+        state, turn, p1move, p2move, move, timeleft = margs
+        self._receivedAt -= max(0.0, self.movetime - int(timeleft) / 1000)
+        self._moveSentAt = None
+        if int(turn) == self._turn:
+            if self._pendingMove is not None and not move:
+                self._send('MOVE', self._pendingMove)
+                self._moveSentAt = time.monotonic()
+            return self._recv()
 
-        elif mtype == 'INVALID':
-            raise InvalidMessageSent(margs[0])
+        #The turn missed is returned without `_onNext` since the state has it
+        self._onResume(self._parseState(state))
+        self._turn = int(turn) - 1
+        self._resynced = True
+        return 'NEXT', [p1move, p2move]
 
-        return (mtype, margs)
+    def _receive(self):
+        #Buffered messages are sent before waiting for a reply
+        if self._writeBuffer and not self._reader.hasFrame():
+            self.flush()
+        if self.instruments is not None:
+            return self._instrumentedRecv()
+        body = self._reader.read()
+        self._receivedAt = time.monotonic()
+        return self._decode(str(body, 'utf-8'))
+
+    def _instrumentedSend(self, msgtype, args):
+        instruments = self.instruments
+        started = time.perf_counter()
+        data = grebe_codec.encode(msgtype, *args)
+        instruments.timing('encode', msgtype, time.perf_counter() - started)
+        instruments.message('sent', msgtype, len(data))
+
+        self._writeBuffer.append(data)
+        if self.autoFlush:
+            self._instrumentedFlush(msgtype)
+
+    def _instrumentedFlush(self, msgtype):
+        started = time.perf_counter()
+        frames = self._writeBuffer
+        self._writeBuffer = []
+        self._sendFrames(frames)
+        self.instruments.timing('send', msgtype, time.perf_counter() - started)
+
+    def _instrumentedRecv(self):
+        instruments = self.instruments
+        started = time.perf_counter()
+        body = self._reader.read()
+        received = time.perf_counter()
+        self._receivedAt = time.monotonic()
+
+        text = str(body, 'utf-8')
+        mtype = text.partition(':')[0]
+        header = (PREFIX_SIZE if len(body) <= MAX_BODY_SIZE
+                  else grebe_codec.LARGE_HEADER_SIZE)
+        instruments.message('received', mtype, header + len(body))
+        instruments.timing('recv', mtype, received - started)
+        try:
+            return self._decode(text)
+        finally:
+            instruments.timing('decode', mtype, 
+                               time.perf_counter() - received)
 
     def close(self):
+        """Closes the connection. Buffered messages aren't sent."""
         if self._sock is not None:
             self._sock.close()
+        self._writeBuffer = []
         self._loggedIn = False
+
+
+class SpectatorClient(Client):
+    """Watches a game as a spectator
+
+    `watch` logs in and returns an iterator of the game's events as
+    `(type, args)` tuples:
+
+      ('START', (initialState, movetime))
+      ('MOVED', (role, move))  when P1 or P2 sends a move
+      ('NEXT', (p1move, p2move))
+      ('END', (result, reason, p1move, p2move))
+
+    The iterator ends after END. Messages are only read as events are
+    consumed so no more than the receive buffer is held. A consumer that
+    falls behind leaves the server to buffer the rest, and the server
+    disconnects spectators that are too far behind.
+
+    The username must not be a player's. To parse moves and states with a
+    game's hooks, combine it with the game's client, e.g.
+    `class TicTacToeSpectator(SpectatorClient, TicTacToe)`."""
+
+    def login(self, username, password):
+        """Logs in without waiting for the game to start. Returns the role."""
+        if self._loggedIn:
+            raise AlreadyLoggedIn()
+
+        self._connect()
+        role, *_ = self._loginWithOptions(username, password)
+        if role != 'Spectator':
+            self.close()
+            raise NotASpectator(role)
+
+        self._loggedIn = True
+        return role
+
+    def watch(self, username, password):
+        self.login(username, password)
+        return self.events()
+
+    def events(self):
+        try:
+            while True:
+                try:
+                    mtype, margs = self._recv()
+                except GameEnd as gameEnd:
+                    yield 'END', (gameEnd.result, gameEnd.reason,
+                                  gameEnd.p1Move, gameEnd.p2Move)
+                    return
+                yield self._checkSpectatorEvent(mtype, margs)
+        finally:
+            self.close()
+
+
+class AsyncClient(BaseClient):
+    """A client for use with `asyncio`
+
+    It has the same methods as `Client` but `login`, `move` and
+    `waitForNextTurn` are coroutines. Use `asyncClientFor` to get an
+    `AsyncClient` for a game specific `Client` subclass. `largeMessages`
+    is the same as for `Client`; reconnecting isn't supported."""
+
+    def __init__(self, host, port, largeMessages=False):
+        super().__init__(host, port)
+        self.largeMessages = largeMessages
+        self._reader = None
+        self._writer = None
+
+    async def login(self, username, password):
+        if self._loggedIn:
+            raise AlreadyLoggedIn()
+
+        await self._connect()
+        role, *_ = await self._loginWithOptions(username, password)
+        initialState, movetime = await self._waitForStart()
+
+        self._loggedIn = True
+        return role, initialState, movetime
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(
+                self._host, self._port)
+
+    async def _login(self, username, password, *options):
+        if options:
+            self._send('LOGIN', username, password, ' '.join(options))
+        else:
+            self._send('LOGIN', username, password)
+        return self._checkLogin(*await self._recv())
+
+    async def _loginWithOptions(self, username, password, *options):
+        margs = await self._login(username, password,
+                                  *self._loginOptions(*options))
+        self._acceptOptions(margs)
+        return margs
+
+    async def _waitForStart(self):
+        return self._checkStart(*await self._recv())
+
+    async def games(self, username, password):
+        """An async generator of the games in a session, like `Client.games`"""
+
+        if self._loggedIn:
+            raise AlreadyLoggedIn()
+
+        await self._connect()
+        role, *options = await self._loginWithOptions(username, password,
+                                                      SESSION_OPTION)
+        session = bool(options) and SESSION_OPTION in options[0].split()
+        self._loggedIn = True
+        try:
+            initialState, movetime = await self._waitForStart()
+            while True:
+                yield self.role, initialState, movetime
+                if not session:
+                    return
+
+                while not self._gameOver:
+                    try:
+                        await self._recv()
+                    except GameEnd:
+                        pass
+                try:
+                    initialState, movetime = await self._waitForStart()
+                except ConnectionError:
+                    return
+        finally:
+            self.close()
+
+    async def move(self, *args):
+        started = time.monotonic()
+        self._send('MOVE', self._formatMove(*args))
+        self._moveSent(started)
+        return await self.waitForNextTurn()
+
+    async def waitForNextTurn(self):
+        return self._checkNext(*await self._recv())
+
+    async def flush(self):
+        """Waits until the messages written have been sent"""
+        await self._writer.drain()
+
+    def _send(self, msgtype, *args):
+        self._writer.write(grebe_codec.encode(msgtype, *args))
+
+    async def _recv(self):
+        try:
+            prefix_bytes = await self._reader.readexactly(PREFIX_SIZE)
+            length = struct.unpack('!H', prefix_bytes)[0]
+            if length == 0 and self._largeFrames:
+                length, = struct.unpack('!I', await self._reader.readexactly(
+                        grebe_codec.LARGE_HEADER_SIZE - PREFIX_SIZE))
+                if length > MAX_LARGE_BODY_SIZE:
+                    raise InvalidMessageFormat('Length prefix is too large')
+            elif length == 0:
+                raise InvalidMessageFormat('Length prefix is 0')
+            elif length > MAX_BODY_SIZE:
+                raise InvalidMessageFormat('Length prefix is too large')
+
+            body_bytes = await self._reader.readexactly(length)
+        except asyncio.IncompleteReadError:
+            raise ConnectionError('Connection closed by server')
+
+        self._receivedAt = time.monotonic()
+        return self._decode(str(body_bytes, 'utf-8'))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._loggedIn = False
+
+
+class AsyncSpectatorClient(AsyncClient):
+    """`SpectatorClient` for use with `asyncio`
+
+    `watch` and `events` are async generators. Reading from the connection
+    is paused while more than `bufferLimit` bytes are waiting to be
+    consumed."""
+
+    bufferLimit = RECV_BUFFER_SIZE
+
+    async def login(self, username, password):
+        if self._loggedIn:
+            raise AlreadyLoggedIn()
+
+        await self._connect()
+        role, *_ = await self._loginWithOptions(username, password)
+        if role != 'Spectator':
+            self.close()
+            raise NotASpectator(role)
+
+        self._loggedIn = True
+        return role
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(
+                self._host, self._port, limit=self.bufferLimit)
+
+    async def watch(self, username, password):
+        await self.login(username, password)
+        async for event in self.events():
+            yield event
+
+    async def events(self):
+        try:
+            while True:
+                try:
+                    mtype, margs = await self._recv()
+                except GameEnd as gameEnd:
+                    yield 'END', (gameEnd.result, gameEnd.reason,
+                                  gameEnd.p1Move, gameEnd.p2Move)
+                    return
+                yield self._checkSpectatorEvent(mtype, margs)
+        finally:
+            self.close()
+
+
+def asyncClientFor(clientClass):
+    """Returns an `AsyncClient` subclass using the hooks of `clientClass`
+
+    `clientClass` is a `Client` subclass for a specific game. The hooks and
+    other attributes it adds are reused so moves and states are handled the
+    same way by both clients. Methods that `AsyncClient` implements itself,
+    such as `move`, and special methods aren't copied."""
+
+    mro = clientClass.__mro__
+    namespace = {}
+    for cls in reversed(mro[:mro.index(Client)]):
+        for name, value in vars(cls).items():
+            if not name.startswith('__') and name not in vars(AsyncClient):
+                namespace[name] = value
+
+    return type('Async' + clientClass.__name__, (AsyncClient,), namespace)
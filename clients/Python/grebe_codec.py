@@ -0,0 +1,136 @@
+#! python3
+"""Encodes and decodes Grebe message bodies.
+
+Message arguments are CSV as described in RFC4180. Nearly every field sent
+in practice is either plain or simply quoted because it contains a comma
+(e.g. the tic-tac-toe move `"2,2"`) or line breaks (e.g. a board). Those are
+handled directly with string operations, which also keeps large states out
+of the `csv` module's field size limit. The `csv` module is only used when a
+field contains a quote or a line break is outside quotes.
+
+The output of `encode` is byte for byte the same as writing the arguments
+with `csv.writer`.
+
+Bodies longer than `MAX_SMALL_BODY_SIZE` bytes are framed as large messages:
+a zero length prefix followed by the body's length in 4 big-endian bytes.
+They must only be sent to peers that accepted the `large` LOGIN option."""
+
+import csv
+import io
+import struct
+
+_SPECIAL = ('"', '\r', '\n')
+
+#The longest body that is sent with a 2 byte length prefix
+MAX_SMALL_BODY_SIZE = 510
+
+#The zero prefix and 4 byte length in front of a large message's body
+LARGE_HEADER_SIZE = 6
+
+def encode(mtype, *args):
+    """Returns the length prefixed message for `mtype` and `args` as bytes"""
+
+    fields = []
+    for arg in args:
+        field = '' if arg is None else str(arg)
+        if '"' in field:
+            return _frame(mtype + ':' + _slowEncode(args))
+        if ',' in field or '\r' in field or '\n' in field:
+            field = '"' + field + '"'
+        fields.append(field)
+
+    if len(fields) == 1 and not fields[0]:
+        argcsv = '""'
+    else:
+        argcsv = ','.join(fields)
+
+    return _frame(mtype + ':' + argcsv + '\r\n')
+
+def decode(body):
+    """Returns `(mtype, margs)` for the message body `body`
+
+    Raises `ValueError` if the body is badly formatted."""
+
+    mtype, sep, argcsv = body.partition(':')
+    if not sep:
+        raise ValueError('Message body has no colon')
+
+    if argcsv.endswith('\r\n'):
+        argcsv = argcsv[:-2]
+
+    if not argcsv:
+        return mtype, []
+
+    if '"' not in argcsv:
+        if '\r' in argcsv or '\n' in argcsv:
+            return mtype, _slowDecode(argcsv)
+        return mtype, argcsv.split(',')
+
+    margs = _decodeQuoted(argcsv)
+    if margs is None:
+        margs = _slowDecode(argcsv)
+    return mtype, margs
+
+def _decodeQuoted(argcsv):
+    """Splits `argcsv` where quoted fields don't contain quotes.
+
+    Returns None if anything else is found, including line breaks outside
+    quoted fields."""
+
+    #Odd numbered parts are the contents of quoted fields
+    parts = argcsv.split('"')
+    last = len(parts) - 1
+    if last % 2:
+        return None
+
+    margs = []
+    for i in range(0, last + 1, 2):
+        unquoted = parts[i]
+        if '\r' in unquoted or '\n' in unquoted:
+            return None
+        if i > 0:
+            #Closing quotes must be followed by a comma or the end
+            if not unquoted:
+                if i != last:
+                    return None
+                break
+            if unquoted[0] != ',':
+                return None
+            unquoted = unquoted[1:]
+
+        if i == last:
+            margs.extend(unquoted.split(','))
+        else:
+            #Opening quotes must be at the start of a field
+            if unquoted:
+                if unquoted[-1] != ',':
+                    return None
+                margs.extend(unquoted[:-1].split(','))
+            margs.append(parts[i + 1])
+
+    return margs
+
+def isLarge(frame):
+    """Whether `frame`, from `encode`, is a large message"""
+    return len(frame) > 2 + MAX_SMALL_BODY_SIZE
+
+def _frame(body):
+    bytes_ = body.encode('utf-8')
+    if len(bytes_) > MAX_SMALL_BODY_SIZE:
+        return struct.pack('!HI', 0, len(bytes_)) + bytes_
+    return struct.pack('!H', len(bytes_)) + bytes_
+
+def _slowEncode(args):
+    f = io.StringIO()
+    writer = csv.writer(f)
+    writer.writerow(args)
+    return f.getvalue()
+
+def _slowDecode(argcsv):
+    try:
+        rows = [row for row in csv.reader(io.StringIO(argcsv))]
+    except csv.Error as error:
+        raise ValueError('Invalid CSV in message body: {}'.format(error))
+    if len(rows) > 1:
+        raise ValueError('Multiple CSV rows received in message body')
+    return rows[0] if rows else []
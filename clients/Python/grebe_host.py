@@ -0,0 +1,246 @@
+#! python3
+"""Runs many bot seats from a single process.
+
+Each seat is a client connection playing one game with its own strategy
+object. The connections are multiplexed with `selectors` so a single thread
+serves every seat, across any number of servers.
+
+Usage: grebe_host.py STRATEGY SEAT...
+
+  STRATEGY  Path to a strategy module
+  SEAT      A seat in the format USERNAME@HOST[:PORT]
+
+A strategy module must export a `Client` class, the `grebe.Client` subclass
+for the game, and a `Strategy` callable that returns a new `Strategy` object
+for each seat."""
+
+import os
+import sys
+
+import importlib.util
+import selectors
+import socket
+import time
+
+from grebe import (FrameReader, GameEnd, setNoDelay)
+
+DEFAULT_PORT = 13579
+
+class Strategy():
+    """Base class for the objects that choose moves for a seat.
+
+    `start` and `nextTurn` return the move to send as a tuple of the
+    arguments for the client's `move` method or None to not move."""
+
+    def start(self, role, initialState, movetime):
+        return None
+
+    def nextTurn(self, p1move, p2move):
+        return None
+
+    def moved(self, role, move):
+        """Called for each player's move if the seat is a spectator"""
+        pass
+
+    def end(self, gameEnd):
+        pass
+
+    def error(self, error):
+        """Called if the seat fails for a reason other than the game ending"""
+        pass
+
+
+class Seat():
+    """A client connection that is playing one game for a `Host`"""
+
+    def __init__(self, client, username, password, strategy):
+        self.client = client
+        self.username = username
+        self.password = password
+        self.strategy = strategy
+        self.role = None
+        self.result = None
+        self._connected = False
+        self._output = bytearray()
+
+
+class Host():
+    """Plays the games of many seats using a selector
+
+    The clients used by seats must be `grebe.Client` instances. Only their
+    message handling is used; `login`, `move` and `waitForNextTurn` are
+    never called since they block. Their messages are buffered and each
+    seat's replies to a read are sent together. Sockets stay non-blocking, so
+    output a peer isn't reading is kept until the socket is writable
+    instead of stalling the other seats."""
+
+    def __init__(self, selector=None):
+        self._selector = (selector if selector is not None
+                          else selectors.DefaultSelector())
+
+    @property
+    def seatCount(self):
+        return len(self._selector.get_map())
+
+    def add(self, client, username, password, strategy):
+        """Starts connecting `client` and returns its seat
+        
+        The seat logs in once the connection has been made. Resolving the
+        client's host name blocks, so seats should be added before `run` or
+        with numeric addresses."""
+
+        seat = Seat(client, username, password, strategy)
+
+        family, type_, proto, _, address = socket.getaddrinfo(
+                client._host, client._port, type=socket.SOCK_STREAM)[0]
+        sock = socket.socket(family, type_, proto)
+        if client.noDelay is not None:
+            setNoDelay(sock, client.noDelay)
+        sock.setblocking(False)
+        sock.connect_ex(address)
+
+        client._sock = sock
+        client.autoFlush = False
+        client._reader = FrameReader(sock)
+        self._selector.register(sock, selectors.EVENT_WRITE, seat)
+        return seat
+
+    def run(self, timeout=None):
+        """Plays until every seat's game has ended"""
+
+        while self.seatCount:
+            self.poll(timeout)
+
+    def poll(self, timeout=None):
+        """Handles the messages received within `timeout` seconds"""
+
+        for key, events in self._selector.select(timeout):
+            seat = key.data
+            try:
+                if not seat._connected:
+                    self._handleConnected(seat)
+                    continue
+                if events & selectors.EVENT_READ:
+                    self._handleReadable(seat)
+                if events & selectors.EVENT_WRITE:
+                    self._flush(seat)
+            except GameEnd as gameEnd:
+                seat.result = gameEnd.result
+                self._remove(seat)
+                seat.strategy.end(gameEnd)
+            except Exception as error:
+                self._remove(seat)
+                seat.strategy.error(error)
+
+    def _handleConnected(self, seat):
+        client = seat.client
+        sock = client._sock
+        error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if error:
+            raise ConnectionError(error, os.strerror(error))
+
+        seat._connected = True
+        client._send('LOGIN', seat.username, seat.password)
+        self._flush(seat)
+
+    def _handleReadable(self, seat):
+        client = seat.client
+        reader = client._reader
+        reader.fill()
+        while reader.hasFrame():
+            mtype, margs = client._recv()
+            self._handleMessage(seat, mtype, margs)
+        self._flush(seat)
+
+    def _flush(self, seat):
+        """Sends as much of the seat's output as the socket takes and waits
+        for it to be writable if some is left"""
+
+        client = seat.client
+        sock = client._sock
+        if client._writeBuffer:
+            seat._output += b''.join(client._writeBuffer)
+            client._writeBuffer = []
+
+        while seat._output:
+            try:
+                sent = sock.send(seat._output)
+            except BlockingIOError:
+                break
+            del seat._output[:sent]
+
+        events = selectors.EVENT_READ
+        if seat._output:
+            events |= selectors.EVENT_WRITE
+        if self._selector.get_key(sock).events != events:
+            self._selector.modify(sock, events, seat)
+
+    def _handleMessage(self, seat, mtype, margs):
+        client = seat.client
+        if mtype == 'START':
+            initialState, movetime = client._checkStart(mtype, margs)
+            client._loggedIn = True
+            move = seat.strategy.start(seat.role, initialState, movetime)
+        elif mtype == 'NEXT':
+            p1move, p2move = client._checkNext(mtype, margs)
+            move = seat.strategy.nextTurn(p1move, p2move)
+        elif mtype == 'MOVED':
+            _, (role, move) = client._checkSpectatorEvent(mtype, margs)
+            seat.strategy.moved(role, move)
+            return
+        else:
+            seat.role, = client._checkLogin(mtype, margs)
+            return
+
+        if move is not None:
+            started = time.monotonic()
+            client._send('MOVE', client._formatMove(*move))
+            client._moveSent(started)
+
+    def _remove(self, seat):
+        self._selector.unregister(seat.client._sock)
+        seat.client.close()
+
+    def close(self):
+        for key in list(self._selector.get_map().values()):
+            self._remove(key.data)
+        self._selector.close()
+
+
+def loadStrategyModule(path):
+    spec = importlib.util.spec_from_file_location(
+            'strategy', os.path.abspath(path))
+    if spec is None:
+        raise ImportError('Strategy module not found')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def parseSeat(value):
+    username, _, address = value.rpartition('@')
+    if not username:
+        raise ValueError('Invalid seat: ' + value)
+    host, _, port = address.partition(':')
+    return username, host, int(port) if port else DEFAULT_PORT
+
+def main(args):
+    if len(args) < 2:
+        print(__doc__.split('\n\n')[1], file=sys.stderr)
+        return 1
+
+    module = loadStrategyModule(args[0])
+    seats = [parseSeat(arg) for arg in args[1:]]
+
+    host = Host()
+    try:
+        for username, server, port in seats:
+            host.add(module.Client(server, port), username, '',
+                     module.Strategy())
+        host.run()
+    finally:
+        host.close()
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,216 @@
+#! python3
+"""In-memory transport and fake servers for `grebe.Client`
+
+`LoopbackServer.connect` can be passed as the `transport` of a `Client`.
+Messages sent by the client are handled by the server as soon as they are
+sent, in the same thread, so no sockets, threads or server processes are
+involved.
+
+`ScriptedServer` replays a protocol transcript. A transcript is a list of
+`(direction, body)` pairs, where direction is `>` for a message sent by the
+client and `<` for one sent by the server. `parseTranscript` reads them from
+text with one message per line, e.g.
+
+    > LOGIN:A,
+    < LOGIN/SUCCESS:P1
+    < START:"...\\n...\\n...",1000
+
+The escapes `\\n`, `\\r` and `\\\\` in bodies are decoded, and other
+text, including non-ASCII text, is kept as it is."""
+
+import re
+import struct
+
+import grebe_codec
+
+from grebe import (MAX_BODY_SIZE, PREFIX_SIZE)
+
+_ESCAPES = {'n': '\n', 'r': '\r', '\\': '\\'}
+_escape = re.compile(r'\\([nr\\])')
+
+class LoopbackTransport():
+    """The client end of a connection to a `LoopbackServer`
+
+    Has the socket methods used by `grebe.Client` and `grebe.FrameReader`."""
+
+    def __init__(self, server):
+        self.closed = False
+        self.serverClosed = False
+
+        self._server = server
+        self._inbound = bytearray()
+        self._inboundStart = 0
+        self._outbound = bytearray()
+
+        server.connectionMade(self)
+
+    def send(self, data):
+        if self.closed or self.serverClosed:
+            raise BrokenPipeError('Loopback connection closed')
+
+        self._outbound += data
+        self._server._dataReceived(self, self._outbound)
+        return len(data)
+
+    sendall = send
+
+    def recv_into(self, buffer, nbytes=0):
+        available = len(self._inbound) - self._inboundStart
+        if available == 0:
+            if self.serverClosed or self.closed:
+                return 0
+            #A socket would block forever
+            raise TimeoutError('Loopback server has nothing to send')
+
+        count = min(len(buffer), available)
+        if nbytes:
+            count = min(count, nbytes)
+
+        start = self._inboundStart
+        buffer[:count] = self._inbound[start:start + count]
+        start += count
+        if start == len(self._inbound):
+            self._inbound.clear()
+            start = 0
+        self._inboundStart = start
+        return count
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._server.connectionLost(self)
+
+    def _deliver(self, data):
+        if not self.closed:
+            self._inbound += data
+
+
+class LoopbackServer():
+    """Base class for in-memory fake servers
+
+    Subclasses override `handle`, which is called for each message a client
+    sends, and reply with `send`."""
+
+    def connect(self, host=None, port=None):
+        """A transport function for `grebe.Client`"""
+        return LoopbackTransport(self)
+
+    def connectionMade(self, transport):
+        pass
+
+    def connectionLost(self, transport):
+        pass
+
+    def handle(self, transport, mtype, margs):
+        raise NotImplementedError()
+
+    def send(self, transport, mtype, *args):
+        transport._deliver(grebe_codec.encode(mtype, *args))
+
+    def sendBody(self, transport, body):
+        bytes_ = body.encode('utf-8')
+        if len(bytes_) > MAX_BODY_SIZE:
+            transport._deliver(struct.pack('!HI', 0, len(bytes_)) + bytes_)
+        else:
+            transport._deliver(struct.pack('!H', len(bytes_)) + bytes_)
+
+    def disconnect(self, transport):
+        transport.serverClosed = True
+
+    def _dataReceived(self, transport, buffer):
+        start = 0
+        while len(buffer) - start >= PREFIX_SIZE:
+            length, = struct.unpack_from('!H', buffer, start)
+            headerSize = PREFIX_SIZE
+            #Large messages are accepted from any client
+            if length == 0:
+                if len(buffer) - start < grebe_codec.LARGE_HEADER_SIZE:
+                    break
+                length, = struct.unpack_from('!I', buffer,
+                                             start + PREFIX_SIZE)
+                headerSize = grebe_codec.LARGE_HEADER_SIZE
+            if length == 0 or (headerSize == PREFIX_SIZE and
+                               length > MAX_BODY_SIZE):
+                raise ValueError('Client sent an invalid length prefix')
+
+            end = start + headerSize + length
+            if len(buffer) < end:
+                break
+
+            body = buffer[start + headerSize:end].decode('utf-8')
+            start = end
+            self.handle(transport, *grebe_codec.decode(body))
+
+        del buffer[:start]
+
+
+class TranscriptMismatch(AssertionError):
+    """Raised when a client doesn't send the message a transcript expects"""
+    pass
+
+
+class ScriptedServer(LoopbackServer):
+    """Replays a transcript to a single client connection
+
+    The server's messages are sent as soon as the client has sent every
+    message before them. The connection is closed by the server after the
+    last message if it is END, INVALID or LOGIN/FAILURE, like the real
+    server."""
+
+    _closingTypes = ('END', 'INVALID', 'LOGIN/FAILURE')
+
+    def __init__(self, transcript):
+        self._steps = [(direction, grebe_codec.decode(body), body)
+                       for direction, body in transcript]
+        self._position = 0
+
+    @property
+    def finished(self):
+        return self._position == len(self._steps)
+
+    def connectionMade(self, transport):
+        self._sendReplies(transport)
+
+    def handle(self, transport, mtype, margs):
+        if self.finished:
+            raise TranscriptMismatch(
+                    'Unexpected message {!r}'.format((mtype, margs)))
+
+        direction, expected, body = self._steps[self._position]
+        if direction != '>' or expected != (mtype, margs):
+            raise TranscriptMismatch('Expected {!r} but got {!r}'.format(
+                body, (mtype, margs)))
+
+        self._position += 1
+        self._sendReplies(transport)
+
+    def _sendReplies(self, transport):
+        mtype = None
+        while not self.finished:
+            direction, (mtype, margs), body = self._steps[self._position]
+            if direction != '<':
+                return
+            self.sendBody(transport, body)
+            self._position += 1
+
+        if mtype in self._closingTypes:
+            self.disconnect(transport)
+
+
+def parseTranscript(text):
+    """Returns the transcript in `text` as a list of `(direction, body)`"""
+
+    transcript = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+
+        direction, body = line[0], line[1:].strip()
+        if direction not in '<>':
+            raise ValueError('Invalid transcript line: ' + line)
+
+        body = _escape.sub(lambda match: _ESCAPES[match.group(1)], body)
+        transcript.append((direction, body))
+
+    return transcript
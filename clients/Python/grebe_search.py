@@ -0,0 +1,293 @@
+#! python3
+"""A game independent alpha-beta search engine.
+
+`Engine` searches with iterative deepening negamax alpha-beta. It uses a
+fixed size transposition table keyed by Zobrist hashes that are updated as
+moves are made, and orders moves by the table's move, two killer moves for
+each ply and a history table.
+
+Games are plugged in with a `GameAdapter`. Positions are changed in place
+with `apply` and `undo`. Moves must be hashable. Scores are for the side to
+move and must only depend on the position, not on the path to it, so they
+can be shared through the table."""
+
+import array
+import random
+import time
+
+#Larger than any score an adapter returns
+INFINITY = 1 << 30
+
+#Transposition table entry types
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+KILLERS_PER_PLY = 2
+
+#The depth stored for results that were searched to the end of the game
+FULL_DEPTH = 127
+
+class SearchStopped(Exception):
+    pass
+
+
+def zobristKeys(count, seed=0):
+    """Returns `count` random 64 bit keys, the same for the same `seed`"""
+    rng = random.Random(seed)
+    return [rng.getrandbits(64) for i in range(count)]
+
+
+class GameAdapter():
+    """The interface between a game and `Engine`"""
+
+    def moves(self, position):
+        """Returns the legal moves in `position`"""
+        raise NotImplementedError()
+
+    def apply(self, position, move):
+        raise NotImplementedError()
+
+    def undo(self, position, move):
+        """Reverses `apply(position, move)`"""
+        raise NotImplementedError()
+
+    def isOver(self, position):
+        raise NotImplementedError()
+
+    def evaluate(self, position):
+        """Returns the score of `position` for the side to move"""
+        raise NotImplementedError()
+
+    def hash(self, position):
+        """Returns the Zobrist hash of `position`"""
+        raise NotImplementedError()
+
+    def moveHash(self, position, move):
+        """Returns what `apply(position, move)` XORs into the hash
+
+        Called before the move is applied."""
+        raise NotImplementedError()
+
+
+class TranspositionTable():
+    """A fixed size table of search results indexed by the low bits of the
+    position's hash
+
+    An entry is replaced by a search of the same or greater depth or by any
+    search once the entry is from an earlier `Engine.search`."""
+
+    def __init__(self, size=1 << 16):
+        if size & (size - 1):
+            raise ValueError('size must be a power of 2')
+
+        self.size = size
+        self.generation = 0
+        self._mask = size - 1
+        self._keys = array.array('Q', bytes(8 * size))
+        self._scores = array.array('l', bytes(array.array('l').itemsize *
+                                              size))
+        self._depths = array.array('b', [-1]) * size
+        self._types = array.array('B', bytes(size))
+        self._generations = array.array('H', bytes(2 * size))
+        self._moves = [None] * size
+
+    def clear(self):
+        self.__init__(self.size)
+
+    def newSearch(self):
+        self.generation = (self.generation + 1) & 0xFFFF
+
+    def probe(self, key):
+        """Returns `(depth, type, score, move)` for `key` or None"""
+        index = key & self._mask
+        if self._depths[index] < 0 or self._keys[index] != key:
+            return None
+        return (self._depths[index], self._types[index], self._scores[index],
+                self._moves[index])
+
+    def store(self, key, depth, type, score, move):
+        index = key & self._mask
+        if (self._depths[index] >= 0 and
+            self._generations[index] == self.generation and
+            self._depths[index] > depth):
+            return
+
+        self._keys[index] = key
+        self._depths[index] = depth
+        self._types[index] = type
+        self._scores[index] = score
+        self._generations[index] = self.generation
+        self._moves[index] = move
+
+    def used(self):
+        """Returns the number of entries in use"""
+        return sum(1 for depth in self._depths if depth >= 0)
+
+
+class SearchResult():
+    """The outcome of `Engine.search`
+
+    `move` and `score` are from the deepest completed iteration, which is
+    `depth`. `nodes` counts every position visited, including those in an
+    iteration that was stopped."""
+
+    def __init__(self, move, score, depth, nodes, seconds):
+        self.move = move
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.seconds = seconds
+
+    @property
+    def nodesPerSecond(self):
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+    def __repr__(self):
+        return ('SearchResult(move={!r}, score={}, depth={}, nodes={}, '
+                '{:.0f} nodes/s)'.format(self.move, self.score, self.depth,
+                                        self.nodes, self.nodesPerSecond))
+
+
+class Engine():
+    """Iterative deepening alpha-beta search over a `GameAdapter`
+
+    The transposition table and the history table are kept between searches
+    so a search can reuse the results of the previous turn's."""
+
+    def __init__(self, adapter, tableSize=1 << 16):
+        self.adapter = adapter
+        self.table = TranspositionTable(tableSize)
+        self.history = {}
+        self._killers = []
+        self._deadline = None
+        self._nodes = 0
+        self._rootMove = None
+        #Whether the last subtree searched reached the end of every line
+        self._complete = False
+
+    def search(self, position, deadline=None, maxDepth=FULL_DEPTH - 1):
+        """Searches `position` until `deadline` expires or `maxDepth` or the
+        end of the game is reached.
+
+        `deadline` is a `grebe.Deadline` or None for no time limit. Returns
+        a `SearchResult` whose move is None if no iteration completed or
+        there are no moves."""
+
+        started = time.perf_counter()
+        self.table.newSearch()
+        self._killers = [[None] * KILLERS_PER_PLY for i in range(maxDepth)]
+        self._deadline = deadline
+        self._nodes = 0
+        self._rootMove = None
+
+        #Older history counts matter less than this search's
+        for move in self.history:
+            self.history[move] //= 2
+
+        key = self.adapter.hash(position)
+        bestMove = None
+        bestScore = None
+        completed = 0
+        for depth in range(1, maxDepth + 1):
+            try:
+                score = self._negamax(position, key, depth, 0,
+                                      -INFINITY, INFINITY)
+            except SearchStopped:
+                break
+
+            completed = depth
+            bestScore = score
+            bestMove = self._rootMove
+            if self._complete:
+                break
+
+        return SearchResult(bestMove, bestScore, completed, self._nodes,
+                            time.perf_counter() - started)
+
+    def _orderedMoves(self, position, ply, tableMove):
+        moves = self.adapter.moves(position)
+        killers = self._killers[ply] if ply < len(self._killers) else ()
+        history = self.history
+
+        def rank(move):
+            if move == tableMove:
+                return INFINITY + 1
+            if move in killers:
+                return INFINITY
+            return history.get(move, 0)
+
+        moves.sort(key=rank, reverse=True)
+        return moves
+
+    def _addKiller(self, ply, move):
+        if ply >= len(self._killers):
+            return
+        killers = self._killers[ply]
+        if move not in killers:
+            killers.pop()
+            killers.insert(0, move)
+
+    def _negamax(self, position, key, depth, ply, alpha, beta):
+        self._nodes += 1
+        if (self._deadline is not None and self._nodes & 0xFF == 0 and
+            self._deadline.expired):
+            raise SearchStopped()
+
+        adapter = self.adapter
+        if adapter.isOver(position):
+            self._complete = True
+            return adapter.evaluate(position)
+        if depth == 0:
+            self._complete = False
+            return adapter.evaluate(position)
+
+        originalAlpha = alpha
+        tableMove = None
+        entry = self.table.probe(key)
+        if entry is not None:
+            entryDepth, type, score, tableMove = entry
+            if entryDepth >= depth and ply > 0:
+                self._complete = entryDepth == FULL_DEPTH
+                if type == EXACT:
+                    return score
+                if type == LOWER and score >= beta:
+                    return score
+                if type == UPPER and score <= alpha:
+                    return score
+
+        best = -INFINITY
+        bestMove = None
+        complete = True
+        for move in self._orderedMoves(position, ply, tableMove):
+            childKey = key ^ adapter.moveHash(position, move)
+            adapter.apply(position, move)
+            try:
+                score = -self._negamax(position, childKey, depth - 1, ply + 1,
+                                       -beta, -alpha)
+            finally:
+                adapter.undo(position, move)
+            complete = complete and self._complete
+
+            if score > best:
+                best = score
+                bestMove = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                self._addKiller(ply, move)
+                self.history[move] = self.history.get(move, 0) + depth * depth
+                break
+
+        if best <= originalAlpha:
+            type = UPPER
+        elif best >= beta:
+            type = LOWER
+        else:
+            type = EXACT
+        self.table.store(key, FULL_DEPTH if complete else depth, type, best,
+                         bestMove)
+        if ply == 0:
+            self._rootMove = bestMove
+        self._complete = complete
+        return best
@@ -8,9 +8,176 @@ from os.path import (abspath, dirname, join, normpath)
 proj_root = normpath(join(abspath(sys.path[0]), '../../../..'))
 sys.path.append(join(proj_root, 'clients/Python'))
 
-from grebe import Client
+from grebe import (Client, asyncClientFor)
+from grebe_search import (GameAdapter, zobristKeys)
+
+#Cells are numbered 0 to 8 row by row. Bit n of a board is cell n.
+FULL_BOARD = 0b111111111
+
+WIN_MASKS = (0b000000111, 0b000111000, 0b111000000,
+             0b001001001, 0b010010010, 0b100100100,
+             0b100010001, 0b001010100)
+
+#Indexed by a board, 1 if it has three in a row
+_WINS = bytes(any(board & mask == mask for mask in WIN_MASKS)
+              for board in range(FULL_BOARD + 1))
+
+def cellOf(row, column):
+    """Returns the cell for 1 based `row` and `column`"""
+    return (row - 1) * 3 + (column - 1)
+
+def coordsOf(cell):
+    """Returns the 1 based `(row, column)` of `cell`"""
+    return (cell // 3 + 1, cell % 3 + 1)
+
+class Position():
+    """A tic-tac-toe position stored as a bitboard for each side
+
+    `apply` and `undo` are O(1) and only valid for legal moves."""
+
+    __slots__ = ('x', 'o', 'moveCount')
+
+    def __init__(self, x=0, o=0):
+        self.x = x
+        self.o = o
+        self.moveCount = bin(x).count('1') + bin(o).count('1')
+
+    @classmethod
+    def fromState(cls, state):
+        """Returns the position for a state from `TicTacToe._parseState`"""
+        x = 0
+        o = 0
+        for r, row in enumerate(state):
+            for c, element in enumerate(row):
+                if element == 'X':
+                    x |= 1 << (r * 3 + c)
+                elif element == 'O':
+                    o |= 1 << (r * 3 + c)
+        return cls(x, o)
+
+    def copy(self):
+        position = Position.__new__(Position)
+        position.x = self.x
+        position.o = self.o
+        position.moveCount = self.moveCount
+        return position
+
+    @property
+    def isP1ToMove(self):
+        return self.moveCount % 2 == 0
+
+    def legalMoves(self):
+        """Yields the empty cells"""
+        empty = ~(self.x | self.o) & FULL_BOARD
+        while empty:
+            low = empty & -empty
+            yield low.bit_length() - 1
+            empty ^= low
+
+    def isEmpty(self, cell):
+        return not (self.x | self.o) & (1 << cell)
+
+    def apply(self, cell):
+        if self.moveCount % 2 == 0:
+            self.x |= 1 << cell
+        else:
+            self.o |= 1 << cell
+        self.moveCount += 1
+
+    def undo(self, cell):
+        self.moveCount -= 1
+        if self.moveCount % 2 == 0:
+            self.x &= ~(1 << cell)
+        else:
+            self.o &= ~(1 << cell)
+
+    def replace(self, cell):
+        """Marks `cell` for the side to move even if it isn't empty.
+        
+        The server doesn't check that a cell is empty when a move is made so
+        this is used to follow its state."""
+        bit = 1 << cell
+        if self.moveCount % 2 == 0:
+            self.x |= bit
+            self.o &= ~bit
+        else:
+            self.o |= bit
+            self.x &= ~bit
+        self.moveCount += 1
+
+    def isWin(self, forP1):
+        return _WINS[self.x if forP1 else self.o] == 1
+
+    @property
+    def result(self):
+        """The result in the format used by the server or None"""
+        if _WINS[self.x]:
+            return '1-0'
+        if _WINS[self.o]:
+            return '0-1'
+        if self.moveCount == 9:
+            return '1/2-1/2'
+        return None
+
+    def __eq__(self, other):
+        return (isinstance(other, Position) and
+                self.x == other.x and self.o == other.o and
+                self.moveCount == other.moveCount)
+
+    def __hash__(self):
+        return (self.x << 9) | self.o
+
+    def __repr__(self):
+        return 'Position({:#011b}, {:#011b})'.format(self.x, self.o)
+
+class SearchAdapter(GameAdapter):
+    """Lets `grebe_search.Engine` search `Position`s
+
+    Moves are cells. Wins score more the sooner they come, so the engine
+    takes the quickest win and puts off a loss for as long as it can."""
+
+    #A key for each cell for each side, then one for P2 to move
+    KEYS = zobristKeys(2 * 9 + 1)
+    P2_TO_MOVE = KEYS[18]
+
+    def moves(self, position):
+        return list(position.legalMoves())
+
+    def apply(self, position, cell):
+        position.apply(cell)
+
+    def undo(self, position, cell):
+        position.undo(cell)
+
+    def isOver(self, position):
+        return position.result is not None
+
+    def evaluate(self, position):
+        result = position.result
+        if result is None or result == '1/2-1/2':
+            return 0
+        #The side that just moved won
+        return position.moveCount - 10
+
+    def hash(self, position):
+        key = self.P2_TO_MOVE if not position.isP1ToMove else 0
+        for cell in range(9):
+            if position.x & (1 << cell):
+                key ^= self.KEYS[cell]
+            elif position.o & (1 << cell):
+                key ^= self.KEYS[9 + cell]
+        return key
+
+    def moveHash(self, position, cell):
+        side = 0 if position.isP1ToMove else 9
+        return self.KEYS[side + cell] ^ self.P2_TO_MOVE
 
 class TicTacToe(Client):
+    """Tic-tac-toe client
+
+    `position` follows the game as turns are played."""
+
+    position = None
 
     def _formatMove(self, *args):
         return '{},{}'.format(*args); 
@@ -25,5 +192,21 @@ class TicTacToe(Client):
     def _parseState(self, value):
         return tuple(tuple(row) for row in value.split())
 
+    def _onStart(self, initialState):
+        self.position = Position.fromState(initialState)
+
+    def _onNext(self, p1move, p2move):
+        move = p1move if self.position.isP1ToMove else p2move
+        if move is None:
+            return
+
+        cell = cellOf(*move)
+        if self.position.isEmpty(cell):
+            self.position.apply(cell)
+        else:
+            self.position.replace(cell)
+
     def move(self, row, column):
-        super().move(row, column)
+        return super().move(row, column)
+
+AsyncTicTacToe = asyncClientFor(TicTacToe)
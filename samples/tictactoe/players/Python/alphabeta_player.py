@@ -0,0 +1,53 @@
+#!python3
+#Plays with the alpha-beta engine in grebe_search.
+#
+#The engine's transposition table is kept for the whole game. The depth,
+#score and nodes per second of each search are written to stderr.
+
+import os
+import random
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(abspath(sys.path[0]), '../../../..'))
+sys.path.append(join(proj_root, 'clients/Python'))
+sys.path.append(join(proj_root, 'samples/tictactoe/clients/Python'))
+
+import grebe
+from grebe_search import Engine
+from tictactoe import (SearchAdapter, TicTacToe, coordsOf)
+
+if not (3 <= len(sys.argv) <= 4):
+    print('Invalid number of args', file=sys.stderr)
+    sys.exit(1)
+
+username = sys.argv[1]
+server = sys.argv[2]
+port = int(sys.argv[3]) if len(sys.argv) == 4 else 13579
+
+client = TicTacToe(server, port)
+engine = Engine(SearchAdapter())
+
+def bestMove():
+    position = client.position.copy()
+    result = engine.search(position, client.deadline())
+    print(result, file=sys.stderr)
+
+    cell = result.move
+    if cell is None:
+        cell = random.choice(list(position.legalMoves()))
+    return coordsOf(cell)
+
+try:
+    role, _, _ = client.login(username, '')
+
+    if role == 'P1':
+        client.move(*bestMove())
+
+    while True:
+        client.waitForNextTurn()
+        client.move(*bestMove())
+
+except grebe.GameEnd:
+    pass
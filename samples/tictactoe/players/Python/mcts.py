@@ -0,0 +1,265 @@
+#! python3
+#Root parallel Monte Carlo tree search for tic-tac-toe.
+#
+#Each worker process grows its own tree from the same root with UCT
+#selection and random playouts. Only the visits and wins of the root's
+#children are sent back and added up, and the most visited move is played.
+#Workers keep their trees between turns and carry on from the subtree for
+#the position the game reached.
+#
+#A node's wins are for the player whose move led to it, with a draw counting
+#half. Playouts only play empty cells.
+
+import os
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(dirname(abspath(__file__)), '../../../..'))
+sys.path.append(join(proj_root, 'clients/Python'))
+sys.path.append(join(proj_root, 'samples/tictactoe/clients/Python'))
+
+import math
+import multiprocessing
+import random
+import time
+
+from tictactoe import Position
+
+EXPLORATION = 1.4
+
+#Playouts between checks of the time
+CHECK_INTERVAL = 16
+
+#The share of the time left kept for sending the trees back and merging them
+MERGE_SHARE = 0.2
+
+class Node():
+    __slots__ = ('children', 'visits', 'wins')
+
+    def __init__(self, visits=0, wins=0.0):
+        self.children = {}
+        self.visits = visits
+        self.wins = wins
+
+    def size(self):
+        return 1 + sum(child.size() for child in self.children.values())
+
+    def stats(self):
+        """Returns the visits and wins of each child by cell"""
+        return {cell: (child.visits, child.wins)
+                for cell, child in self.children.items()}
+
+def _select(node):
+    logVisits = math.log(node.visits)
+    best = None
+    bestScore = -1.0
+    for cell, child in node.children.items():
+        score = (child.wins / child.visits +
+                 EXPLORATION * math.sqrt(logVisits / child.visits))
+        if score > bestScore:
+            best = cell
+            bestScore = score
+    return best
+
+def playout(root, position, rng):
+    """Runs one playout from `position`, which is changed, into `root`"""
+
+    rootMoveCount = position.moveCount
+    node = root
+    path = [root]
+
+    while position.result is None:
+        moves = list(position.legalMoves())
+        untried = [cell for cell in moves if cell not in node.children]
+        if untried:
+            cell = rng.choice(untried)
+            position.apply(cell)
+            node.children[cell] = node = Node()
+            path.append(node)
+            break
+
+        cell = _select(node)
+        position.apply(cell)
+        node = node.children[cell]
+        path.append(node)
+
+    while position.result is None:
+        position.apply(rng.choice(list(position.legalMoves())))
+
+    result = position.result
+    p1Score = 1.0 if result == '1-0' else 0.0 if result == '0-1' else 0.5
+
+    #The player whose move led to the root moved before the root's move count
+    moverIsP1 = rootMoveCount % 2 == 1
+    for node in path:
+        node.visits += 1
+        node.wins += p1Score if moverIsP1 else 1.0 - p1Score
+        moverIsP1 = not moverIsP1
+
+def mergeStats(statsList):
+    """Adds up the `Node.stats` of several trees"""
+    merged = {}
+    for stats in statsList:
+        for cell, (visits, wins) in stats.items():
+            total = merged.get(cell, (0, 0.0))
+            merged[cell] = (total[0] + visits, total[1] + wins)
+    return merged
+
+def bestCell(stats):
+    """The most visited move in `stats` or None if it's empty"""
+    if not stats:
+        return None
+    return max(stats.items(), key=lambda item: item[1][0])[0]
+
+def subtree(root, rootPosition, position, depth=2):
+    """Returns the node in `root` for `position` or None
+
+    Only the `depth` plies after `rootPosition` are looked at."""
+
+    if rootPosition == position:
+        return root
+    if depth == 0:
+        return None
+
+    for cell, child in root.children.items():
+        after = rootPosition.copy()
+        after.apply(cell)
+        node = subtree(child, after, position, depth - 1)
+        if node is not None:
+            return node
+    return None
+
+class Tree():
+    """A search tree that is kept as the game goes on"""
+
+    def __init__(self, rng=None):
+        self.root = Node()
+        self.position = None
+        self.rng = rng or random.Random()
+
+    def advance(self, position):
+        """Makes `position` the root and returns the visits kept from earlier
+        searches"""
+
+        root = None
+        if self.position is not None:
+            root = subtree(self.root, self.position, position)
+        self.root = root or Node()
+        self.position = position.copy()
+        return self.root.visits
+
+    def grow(self, seconds):
+        """Runs playouts for `seconds` and returns how many were run"""
+        stop = time.monotonic() + seconds
+        playouts = 0
+        while True:
+            for i in range(CHECK_INTERVAL):
+                playout(self.root, self.position.copy(), self.rng)
+            playouts += CHECK_INTERVAL
+            if time.monotonic() >= stop:
+                return playouts
+
+    def search(self, position, seconds):
+        """Returns `(stats, playouts, reused)` for a search of `position`"""
+        reused = self.advance(position)
+        playouts = self.grow(seconds)
+        return self.root.stats(), playouts, reused
+
+def _work(connection, seed):
+    """Runs searches for a `Searcher` until it sends None"""
+    tree = Tree(random.Random(seed))
+    while True:
+        request = connection.recv()
+        if request is None:
+            return
+        number, position, seconds = request
+        connection.send((number,) + tree.search(position, seconds))
+
+class Searcher():
+    """Searches with `workers` processes that each keep their own tree
+
+    With one worker the search runs in this process. `playouts`, `seconds`
+    and `reused` add up every search, so `playoutsPerSecond` is over the
+    game. `stats` are the merged root stats of the last search."""
+
+    def __init__(self, workers=None, seed=None):
+        self.workers = workers or multiprocessing.cpu_count()
+        self.stats = {}
+        self.playouts = 0
+        self.seconds = 0.0
+        self.reused = 0
+
+        rng = random.Random(seed)
+        self._number = 0
+        self._tree = None
+        self._connections = []
+        self._processes = []
+        if self.workers == 1:
+            self._tree = Tree(rng)
+            return
+
+        for i in range(self.workers):
+            connection, workerConnection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                    target=_work, args=(workerConnection, rng.getrandbits(64)),
+                    daemon=True)
+            process.start()
+            workerConnection.close()
+            self._connections.append(connection)
+            self._processes.append(process)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+            connection.close()
+        for process in self._processes:
+            process.join(1)
+            if process.is_alive():
+                process.terminate()
+        self._connections = []
+        self._processes = []
+
+    @property
+    def playoutsPerSecond(self):
+        return self.playouts / self.seconds if self.seconds else 0.0
+
+    def search(self, position, deadline):
+        """Searches `position` and returns the best cell before `deadline`
+
+        `deadline` is a `grebe.Deadline`. Workers that haven't replied by
+        the deadline are left out. Returns None if none of them replied."""
+
+        started = time.monotonic()
+        seconds = deadline.remaining() * (1 - MERGE_SHARE)
+
+        if self._tree is not None:
+            results = [self._tree.search(position, seconds)]
+        else:
+            self._number += 1
+            for connection in self._connections:
+                connection.send((self._number, position, seconds))
+            results = []
+            for connection in self._connections:
+                #Replies to searches that missed their deadline are dropped
+                while connection.poll(deadline.remaining()):
+                    reply = connection.recv()
+                    if reply[0] == self._number:
+                        results.append(reply[1:])
+                        break
+
+        self.stats = mergeStats(stats for stats, _, _ in results)
+        for _, playouts, reused in results:
+            self.playouts += playouts
+            self.reused += reused
+        self.seconds += time.monotonic() - started
+        return bestCell(self.stats)
@@ -0,0 +1,63 @@
+#!python3
+#Plays with a root parallel Monte Carlo tree search on every core.
+#
+#Usage: mcts_player.py USERNAME SERVER [PORT [WORKERS]]
+#
+#The search uses the time left for each move and the tree is kept between
+#turns. Playouts per second over the game are written to stderr at the end.
+
+import os
+import random
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(abspath(sys.path[0]), '../../../..'))
+sys.path.append(join(proj_root, 'clients/Python'))
+sys.path.append(join(proj_root, 'samples/tictactoe/clients/Python'))
+sys.path.append(join(proj_root, 'samples/tictactoe/players/Python'))
+
+import grebe
+from mcts import Searcher
+from tictactoe import (TicTacToe, coordsOf)
+
+if __name__ == '__main__':
+    if not (3 <= len(sys.argv) <= 5):
+        print('Invalid number of args', file=sys.stderr)
+        sys.exit(1)
+
+    username = sys.argv[1]
+    server = sys.argv[2]
+    port = int(sys.argv[3]) if len(sys.argv) >= 4 else 13579
+    workers = int(sys.argv[4]) if len(sys.argv) == 5 else None
+
+    client = TicTacToe(server, port)
+    searcher = Searcher(workers)
+
+    def bestMove():
+        position = client.position
+        cell = searcher.search(position, client.deadline())
+        if cell is None:
+            cell = random.choice(list(position.legalMoves()))
+        return coordsOf(cell)
+
+    try:
+        role, _, _ = client.login(username, '')
+
+        if role == 'P1':
+            client.move(*bestMove())
+
+        while True:
+            client.waitForNextTurn()
+            client.move(*bestMove())
+
+    except grebe.GameEnd:
+        pass
+
+    finally:
+        searcher.close()
+        print('{} playouts in {:.2f}s, {:.0f} playouts/s with {} workers, '
+              '{} reused'.format(searcher.playouts, searcher.seconds,
+                                 searcher.playoutsPerSecond, searcher.workers,
+                                 searcher.reused),
+              file=sys.stderr)
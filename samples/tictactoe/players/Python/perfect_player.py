@@ -0,0 +1,48 @@
+#!python3
+#Plays perfectly using the table from perfect_table.py
+
+import os
+import random
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(abspath(sys.path[0]), '../../../..'))
+sys.path.append(join(proj_root, 'clients/Python'))
+sys.path.append(join(proj_root, 'samples/tictactoe/clients/Python'))
+sys.path.append(join(proj_root, 'samples/tictactoe/players/Python'))
+
+import grebe
+from perfect_table import (NO_MOVE, PerfectTable)
+from tictactoe import (TicTacToe, coordsOf)
+
+if not (3 <= len(sys.argv) <= 4):
+    print('Invalid number of args', file=sys.stderr)
+    sys.exit(1)
+
+username = sys.argv[1]
+server = sys.argv[2]
+port = int(sys.argv[3]) if len(sys.argv) == 4 else 13579
+
+client = TicTacToe(server, port)
+table = PerfectTable()
+
+def bestMove():
+    cell = table.bestMove(client.position)
+    if cell == NO_MOVE:
+        #Only happens if the server let a move replace a mark
+        cell = random.choice(list(client.position.legalMoves()))
+    return coordsOf(cell)
+
+try:
+    role, _, _ = client.login(username, '')
+
+    if role == 'P1':
+        client.move(*bestMove())
+
+    while True:
+        client.waitForNextTurn()
+        client.move(*bestMove())
+
+except grebe.GameEnd:
+    pass
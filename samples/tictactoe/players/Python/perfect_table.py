@@ -0,0 +1,130 @@
+#!python3
+#Perfect play table for tic-tac-toe.
+#
+#The table is solved once with minimax and written to a file that is then
+#memory mapped, so a move is a single byte lookup.
+#
+#File format: an 8 byte header followed by one byte for each of the 3^9
+#boards, indexed by the board read as a base 3 number where cell n is digit
+#n (0 empty, 1 X, 2 O). The low 4 bits of a byte are the best move's cell or
+#NO_MOVE if the game is over. The next 2 bits are the value for the side to
+#move: LOSS, DRAW or WIN. Boards that can't be reached are UNREACHABLE.
+#Running this module writes the table.
+
+import os
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(dirname(abspath(__file__)), '../../../..'))
+sys.path.append(join(proj_root, 'clients/Python'))
+sys.path.append(join(proj_root, 'samples/tictactoe/clients/Python'))
+
+import mmap
+
+from tictactoe import (FULL_BOARD, Position)
+
+MAGIC = b'GRBTTT01'
+TABLE_SIZE = 3 ** 9
+DEFAULT_PATH = join(dirname(abspath(__file__)), 'perfect.table')
+
+NO_MOVE = 0xF
+LOSS = 0
+DRAW = 1
+WIN = 2
+UNREACHABLE = 0xFF
+
+#Indexed by a bitboard, the base 3 value of its set cells as 1 digits
+_BASE3 = tuple(sum(3 ** cell for cell in range(9) if board & (1 << cell))
+               for board in range(FULL_BOARD + 1))
+
+def indexOf(position):
+    return _BASE3[position.x] + 2 * _BASE3[position.o]
+
+def _solve(position, table, scores):
+    """Fills in `table` for `position` and the positions reachable from it.
+
+    Returns a score for the side to move. Quicker wins and slower losses
+    have larger scores."""
+
+    index = indexOf(position)
+    if index in scores:
+        return scores[index]
+
+    result = position.result
+    if result is not None:
+        if result == '1/2-1/2':
+            score, value = 0, DRAW
+        else:
+            #The side that just moved won
+            score, value = position.moveCount - 10, LOSS
+        table[index] = (value << 4) | NO_MOVE
+        scores[index] = score
+        return score
+
+    bestScore = None
+    bestCell = None
+    for cell in position.legalMoves():
+        position.apply(cell)
+        score = -_solve(position, table, scores)
+        position.undo(cell)
+        if bestScore is None or score > bestScore:
+            bestScore = score
+            bestCell = cell
+
+    value = WIN if bestScore > 0 else LOSS if bestScore < 0 else DRAW
+    table[index] = (value << 4) | bestCell
+    scores[index] = bestScore
+    return bestScore
+
+def solve():
+    """Returns the table as a bytearray without the header"""
+    table = bytearray([UNREACHABLE]) * TABLE_SIZE
+    _solve(Position(), table, {})
+    return table
+
+def generate(path=DEFAULT_PATH):
+    table = solve()
+    temp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(table)
+    os.replace(temp_path, path)
+    return sum(1 for entry in table if entry != UNREACHABLE)
+
+class PerfectTable():
+    """A memory mapped perfect play table"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        if not os.path.exists(path):
+            generate(path)
+
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if (len(self._map) != len(MAGIC) + TABLE_SIZE or
+            self._map[:len(MAGIC)] != MAGIC):
+            self._map.close()
+            raise ValueError('Invalid perfect play table: ' + path)
+
+    def lookup(self, position):
+        """Returns `(cell, value)` for `position`
+
+        `cell` is None if the game is over."""
+
+        entry = self._map[len(MAGIC) + indexOf(position)]
+        if entry == UNREACHABLE:
+            raise KeyError(position)
+        cell = entry & 0xF
+        return (None if cell == NO_MOVE else cell), entry >> 4
+
+    def bestMove(self, position):
+        return self._map[len(MAGIC) + indexOf(position)] & 0xF
+
+    def close(self):
+        self._map.close()
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATH
+    count = generate(path)
+    print('Wrote {} positions to {}'.format(count, path))
@@ -0,0 +1,108 @@
+#!python3
+#Plays with a full depth negamax search and ponders on the opponent's turn.
+#
+#While waiting for the opponent, every reply they could make is searched 
+#in the background. The search for the actual reply is then either already
+#done or carries on with the time left for the move.
+
+import os
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(abspath(sys.path[0]), '../../../..'))
+sys.path.append(join(proj_root, 'clients/Python'))
+sys.path.append(join(proj_root, 'samples/tictactoe/clients/Python'))
+
+import grebe
+from tictactoe import (Position, TicTacToe, coordsOf)
+
+class SearchStopped(Exception):
+    pass
+
+def negamax(position, deadline):
+    if deadline.expired:
+        raise SearchStopped()
+
+    result = position.result
+    if result is not None:
+        #Quicker wins and slower losses score more
+        return 0 if result == '1/2-1/2' else position.moveCount - 10
+
+    best = -10
+    for cell in position.legalMoves():
+        position.apply(cell)
+        score = -negamax(position, deadline)
+        position.undo(cell)
+        if score > best:
+            best = score
+    return best
+
+def keyOf(position):
+    return (position.x, position.o, position.moveCount)
+
+def search(key, deadline):
+    """Offers the best move for the position `key` as moves are searched"""
+
+    x, o, moveCount = key
+    position = Position(x, o)
+    position.moveCount = moveCount
+
+    best = None
+    try:
+        for cell in position.legalMoves():
+            if best is None:
+                deadline.offer(*coordsOf(cell))
+            position.apply(cell)
+            score = -negamax(position, deadline)
+            position.undo(cell)
+            if best is None or score > best:
+                best = score
+                deadline.offer(*coordsOf(cell))
+    except SearchStopped:
+        pass
+
+def replies(position):
+    """Yields the keys of the positions after each opponent reply"""
+    for cell in position.legalMoves():
+        position.apply(cell)
+        yield keyOf(position)
+        position.undo(cell)
+
+if __name__ == '__main__':
+    if not (3 <= len(sys.argv) <= 4):
+        print('Invalid number of args', file=sys.stderr)
+        sys.exit(1)
+
+    username = sys.argv[1]
+    server = sys.argv[2]
+    port = int(sys.argv[3]) if len(sys.argv) == 4 else 13579
+
+    client = TicTacToe(server, port)
+    ponderer = grebe.Ponderer(search)
+
+    def play():
+        position = client.position
+        best = ponderer.take(keyOf(position), client.deadline())
+        if best is not None:
+            client.move(*best)
+        else:
+            client.moveBeforeDeadline(
+                    lambda deadline: search(keyOf(position), deadline))
+
+    try:
+        role, _, _ = client.login(username, '')
+
+        if role == 'P1':
+            play()
+
+        while True:
+            ponderer.ponder(list(replies(client.position)))
+            client.waitForNextTurn()
+            play()
+
+    except grebe.GameEnd:
+        pass
+
+    finally:
+        ponderer.close()
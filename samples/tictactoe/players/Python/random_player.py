@@ -11,7 +11,7 @@ sys.path.append(join(proj_root, 'clients/Python'))
 sys.path.append(join(proj_root, 'samples/tictactoe/clients/Python'))
 
 import grebe
-from tictactoe import TicTacToe
+from tictactoe import (TicTacToe, coordsOf)
 
 if not (3 <= len(sys.argv) <= 4):
     print('Invalid number of args', file=sys.stderr)
@@ -23,24 +23,18 @@ port = int(sys.argv[3]) if len(sys.argv) == 4 else 13579
 
 client = TicTacToe(server, port)
 
-open_cells = [(r,c) for r in (1,2,3) for c in (1,2,3)]
+def randomMove():
+    return coordsOf(random.choice(list(client.position.legalMoves())))
 
 try:
     role, _, _ = client.login(username, '')
 
     if role == 'P1':
-        move = random.choice(open_cells)
-        open_cells.remove(move)
-        client.move(*move)
+        client.move(*randomMove())
 
     while True:
-        p1move, p2move = client.waitForNextTurn()
-        opmove = p2move if role == 'P1' else p1move
-        open_cells.remove(opmove)
-
-        move = random.choice(open_cells)
-        open_cells.remove(move)
-        client.move(*move)
+        client.waitForNextTurn()
+        client.move(*randomMove())
 
 except grebe.GameEnd:
     pass
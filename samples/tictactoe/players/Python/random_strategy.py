@@ -0,0 +1,34 @@
+#!python3
+#Strategy module for clients/Python/grebe_host.py that plays random moves
+
+import os
+import random
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(dirname(abspath(__file__)), '../../../..'))
+sys.path.append(join(proj_root, 'clients/Python'))
+sys.path.append(join(proj_root, 'samples/tictactoe/clients/Python'))
+
+import grebe_host
+from tictactoe import TicTacToe as Client
+from tictactoe import (Position, cellOf, coordsOf)
+
+class Strategy(grebe_host.Strategy):
+
+    def start(self, role, initialState, movetime):
+        self._isP1 = role == 'P1'
+        self._position = Position.fromState(initialState)
+        return self._move()
+
+    def nextTurn(self, p1move, p2move):
+        move = p1move if self._position.isP1ToMove else p2move
+        if move is not None:
+            self._position.apply(cellOf(*move))
+        return self._move()
+
+    def _move(self):
+        if self._position.isP1ToMove != self._isP1:
+            return None
+        return coordsOf(random.choice(list(self._position.legalMoves())))
@@ -0,0 +1,206 @@
+#! python3
+#Batch tic-tac-toe simulator for evaluating strategies offline.
+#
+#Plays many games in lockstep over NumPy arrays with the same rules as
+#game.js: a move that isn't a cell loses, moving when it isn't your turn
+#loses, a move replaces whatever is in the cell, only the mover is checked
+#for three in a row and the game is drawn after 9 moves.
+#
+#Boards are an (N, 9) int8 array where cell n is row n // 3 + 1 and column
+#n % 3 + 1, the same as the client's cellOf, holding EMPTY, X or O. Moves are
+#cell numbers, with NO_MOVE for a player who doesn't move. Requires NumPy.
+
+import numpy as np
+
+EMPTY = 0
+X = 1
+O = 2
+
+NO_MOVE = -1
+
+#Result codes
+ONGOING = 0
+P1_WIN = 1
+P2_WIN = 2
+DRAW = 3
+
+#Reason codes
+THREE_IN_A_ROW = 1
+INVALID_MOVE = 2
+OUT_OF_SQUARES = 3
+
+RESULTS = {P1_WIN: '1-0', P2_WIN: '0-1', DRAW: '1/2-1/2'}
+REASONS = {THREE_IN_A_ROW: 'Three in a row',
+           INVALID_MOVE: 'Invalid move',
+           OUT_OF_SQUARES: 'Out of squares'}
+
+WIN_LINES = np.array([[0, 1, 2], [3, 4, 5], [6, 7, 8],
+                      [0, 3, 6], [1, 4, 7], [2, 5, 8],
+                      [0, 4, 8], [2, 4, 6]])
+
+_MARKS = {'.': EMPTY, 'X': X, 'O': O}
+
+def cellOfMove(move):
+    """Returns the cell for a move string, NO_MOVE for None or 9 if invalid"""
+    if move is None:
+        return NO_MOVE
+    if (len(move) == 3 and move[0] in '123' and move[1] == ',' and
+        move[2] in '123'):
+        return (int(move[0]) - 1) * 3 + int(move[2]) - 1
+    return 9
+
+def isWin(boards, marks):
+    """Returns which of `boards` have three in a row of their mark in `marks`"""
+    lines = boards[:, WIN_LINES]
+    return (lines == marks[:, None, None]).all(axis=2).any(axis=1)
+
+class BatchTicTacToe():
+    """N games of tic-tac-toe played in lockstep
+
+    `boards` is an optional (N, 9) array or a list of N game.js board
+    strings for the starting positions. Invalid starting boards aren't
+    detected."""
+
+    def __init__(self, count=None, boards=None):
+        if boards is None:
+            self.boards = np.zeros((count, 9), dtype=np.int8)
+        elif isinstance(boards, np.ndarray):
+            self.boards = boards.astype(np.int8, copy=True)
+        else:
+            self.boards = np.array(
+                    [[_MARKS[mark] for mark in board.replace('\n', '')]
+                     for board in boards], dtype=np.int8)
+
+        count = len(self.boards)
+        self.moveNumber = np.count_nonzero(self.boards, axis=1).astype(np.int8)
+        self.result = np.full(count, ONGOING, dtype=np.int8)
+        self.reason = np.zeros(count, dtype=np.int8)
+
+        p1Win = isWin(self.boards, np.full(count, X, dtype=np.int8))
+        p2Win = isWin(self.boards, np.full(count, O, dtype=np.int8))
+        self._end(p1Win, P1_WIN, THREE_IN_A_ROW)
+        self._end(p2Win & ~p1Win, P2_WIN, THREE_IN_A_ROW)
+        self._end(self.active & (self.moveNumber == 9), DRAW, OUT_OF_SQUARES)
+
+    def __len__(self):
+        return len(self.boards)
+
+    @property
+    def active(self):
+        return self.result == ONGOING
+
+    @property
+    def p1ToMove(self):
+        return self.moveNumber % 2 == 0
+
+    def _end(self, games, result, reason):
+        self.result[games] = result
+        self.reason[games] = reason
+
+    def move(self, p1Moves, p2Moves):
+        """Plays a turn of every active game. Like game.js' move.
+
+        `p1Moves` and `p2Moves` are arrays of N cells. Moves for games that
+        have ended are ignored. Returns the games that are still active."""
+
+        p1Moves = np.asarray(p1Moves)
+        p2Moves = np.asarray(p2Moves)
+        active = self.active
+        p1ToMove = self.p1ToMove
+
+        moves = np.where(p1ToMove, p1Moves, p2Moves)
+        otherMoves = np.where(p1ToMove, p2Moves, p1Moves)
+        loser = np.where(p1ToMove, P2_WIN, P1_WIN)
+
+        #The player not to move moved
+        games = active & (otherMoves != NO_MOVE)
+        self._end(games, np.where(p1ToMove, P1_WIN, P2_WIN)[games],
+                  INVALID_MOVE)
+        active &= ~games
+
+        games = active & ((moves < 0) | (moves > 8))
+        self._end(games, loser[games], INVALID_MOVE)
+        active &= ~games
+
+        indices = np.flatnonzero(active)
+        marks = np.where(p1ToMove[indices], X, O).astype(np.int8)
+        self.boards[indices, moves[indices]] = marks
+
+        won = isWin(self.boards[indices], marks)
+        winners = indices[won]
+        self._end(winners, np.where(marks[won] == X, P1_WIN, P2_WIN),
+                  THREE_IN_A_ROW)
+
+        indices = indices[~won]
+        self.moveNumber[indices] += 1
+        self._end(indices[self.moveNumber[indices] == 9], DRAW,
+                  OUT_OF_SQUARES)
+
+        return self.active
+
+    def play(self, p1Policy, p2Policy):
+        """Plays every game to the end
+
+        A policy is called with this simulator and the indices of the games
+        where its player is to move, and returns an array of their moves."""
+
+        count = len(self)
+        while True:
+            active = self.active
+            if not active.any():
+                return
+
+            p1ToMove = self.p1ToMove
+            p1Moves = np.full(count, NO_MOVE, dtype=np.int64)
+            p2Moves = np.full(count, NO_MOVE, dtype=np.int64)
+
+            indices = np.flatnonzero(active & p1ToMove)
+            if len(indices):
+                p1Moves[indices] = p1Policy(self, indices)
+            indices = np.flatnonzero(active & ~p1ToMove)
+            if len(indices):
+                p2Moves[indices] = p2Policy(self, indices)
+
+            self.move(p1Moves, p2Moves)
+
+    def resultOf(self, game):
+        """Returns the result and reason of a game as game.js' strings"""
+        return (RESULTS.get(int(self.result[game])),
+                REASONS.get(int(self.reason[game])))
+
+    def getState(self, game):
+        marks = '.XO'
+        cells = [marks[cell] for cell in self.boards[game]]
+        return '\n'.join(''.join(cells[row:row + 3]) for row in (0, 3, 6))
+
+    def scores(self):
+        """Returns the number of P1 wins, P2 wins and draws"""
+        counts = np.bincount(self.result, minlength=4)
+        return int(counts[P1_WIN]), int(counts[P2_WIN]), int(counts[DRAW])
+
+
+def randomPolicy(rng=None):
+    """Returns a policy that plays uniformly at random on empty cells"""
+
+    rng = np.random.default_rng() if rng is None else rng
+
+    def policy(game, indices):
+        scores = rng.random((len(indices), 9))
+        scores[game.boards[indices] != EMPTY] = -1
+        return scores.argmax(axis=1)
+
+    return policy
+
+def tablePolicy(table):
+    """Returns a policy that plays the best move from a perfect play table
+
+    `table` is the array of table entries, as in perfect_table.py, without
+    the header."""
+
+    table = np.asarray(table, dtype=np.uint8)
+    powers = 3 ** np.arange(9)
+
+    def policy(game, indices):
+        return table[game.boards[indices] @ powers] & 0xF
+
+    return policy
@@ -0,0 +1,135 @@
+#! python3
+#Tic-tac-toe game module for server/server.py. A port of game.js that
+#implements server/game_api.Game.
+
+import re
+
+class TicTacToe():
+
+    _moveRegex = re.compile('[1-3],[1-3]')
+
+    def __init__(self, board=None):
+        if board is None:
+            board = ('...\n' +
+                     '...\n' +
+                     '...')
+
+        rows = board.split('\n')
+        if len(rows) != 3:
+            raise ValueError('`board` has incorrect number of rows')
+
+        for i, row in enumerate(rows):
+            if len(row) != 3:
+                raise ValueError(
+                        '`board` row {} has incorrect length'.format(i + 1))
+
+        xCount = 0
+        oCount = 0
+
+        self._board = [['.', '.', '.'],
+                       ['.', '.', '.'],
+                       ['.', '.', '.']]
+
+        for r in range(3):
+            for c in range(3):
+                element = rows[r][c]
+                if element == 'X':
+                    xCount += 1
+                elif element == 'O':
+                    oCount += 1
+                elif element != '.':
+                    raise ValueError('`board` has an invalid element')
+                self._board[r][c] = element
+
+        if xCount < oCount or xCount > oCount + 1:
+            raise ValueError('`board` has incorrect number of Xs and Os')
+
+        self._moveNumber = xCount + oCount
+
+        p1Win = self._checkWin(True)
+        p2Win = self._checkWin(False)
+
+        if p1Win and p2Win:
+            raise ValueError('`board` has invalid position')
+
+        if p1Win:
+            self.result = '1-0'
+            self.resultReason = 'Three in a row'
+        elif p2Win:
+            self.result = '0-1'
+            self.resultReason = 'Three in a row'
+        elif self._moveNumber == 9:
+            self.result = '1/2-1/2'
+            self.resultReason = 'Out of squares'
+        else:
+            self.result = None
+            self.resultReason = None
+
+    def getState(self):
+        return '\n'.join(''.join(row) for row in self._board)
+
+    def _checkWin(self, forP1):
+        mark = 'X' if forP1 else 'O'
+        board = self._board
+
+        for i in range(3):
+            if mark == board[i][0] == board[i][1] == board[i][2]:
+                return True
+
+            if mark == board[0][i] == board[1][i] == board[2][i]:
+                return True
+
+        if mark == board[0][0] == board[1][1] == board[2][2]:
+            return True
+
+        if mark == board[0][2] == board[1][1] == board[2][0]:
+            return True
+
+        return False
+
+    def start(self):
+        if self.result is not None:
+            raise ValueError('Game has ended')
+        p1ToMove = self._isP1ToMove()
+        return {'P1': p1ToMove, 'P2': not p1ToMove}
+
+    def _isP1ToMove(self):
+        return self._moveNumber % 2 == 0
+
+    def move(self, value):
+        p1Move = value.get('P1')
+        p2Move = value.get('P2')
+        p1ToMove = self._isP1ToMove()
+
+        otherMove = p2Move if p1ToMove else p1Move
+        if otherMove is not None:
+            self.result = '1-0' if p1ToMove else '0-1'
+            self.resultReason = 'Invalid move'
+            return None
+
+        move = p1Move if p1ToMove else p2Move
+        if move is None or not self._moveRegex.fullmatch(move):
+            self.result = '0-1' if p1ToMove else '1-0'
+            self.resultReason = 'Invalid move'
+            return None
+
+        r, c = (int(coord) - 1 for coord in move.split(','))
+
+        self._board[r][c] = 'X' if p1ToMove else 'O'
+
+        if self._checkWin(p1ToMove):
+            self.result = '1-0' if p1ToMove else '0-1'
+            self.resultReason = 'Three in a row'
+            return None
+
+        self._moveNumber += 1
+        if self._moveNumber == 9:
+            self.result = '1/2-1/2'
+            self.resultReason = 'Out of squares'
+            return None
+
+        p1ToMove = self._isP1ToMove()
+
+        return {'P1': p1ToMove, 'P2': not p1ToMove}
+
+Game = TicTacToe
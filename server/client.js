@@ -7,6 +7,19 @@ var util = require('util');
 var PREFIX_LENGTH = 2;
 var MAX_BODY_LENGTH = 510;
 
+// Large messages have a zero prefix followed by a 4 byte length
+var LARGE_HEADER_LENGTH = 6;
+var MAX_LARGE_BODY_LENGTH = 64 * 1024 * 1024;
+
+// Sent to clients without the large option instead of a large message
+var MESSAGE_TOO_LARGE = 'Message too large, log in with the large option';
+
+// LOGIN options the server supports
+var SESSION_OPTION = 'session';
+var RESUME_OPTION = 'resume';
+var LARGE_OPTION = 'large';
+var OPTIONS = [SESSION_OPTION, RESUME_OPTION, LARGE_OPTION];
+
 function Client(connection) {
   events.EventEmitter.call(this);
 
@@ -17,13 +30,21 @@ function Client(connection) {
   this._isAuthenticated = false;
   this.isDisconnected = false;
 
+  // Session clients stay connected between games
+  this.session = false;
+  // Resume clients can log in again to take their seat back during a game
+  this.resume = false;
+  // Whether messages longer than MAX_BODY_LENGTH can be sent both ways
+  this.large = false;
+  this._options = null;
+
   this._inBodyLength = 0;
   this._inHandlers = {
     'LOGIN' : this._handleLogIn.bind(this),
     'MOVE' : this._handleMove.bind(this)
   };
 
-  this._outBuffer = new Buffer(PREFIX_LENGTH + MAX_BODY_LENGTH);
+  this._outBuffer = Buffer.alloc(PREFIX_LENGTH + MAX_BODY_LENGTH);
   
   connection.on('readable', this._handleReadable.bind(this));
   connection.on('error', this._handleError.bind(this));
@@ -36,17 +57,25 @@ Client.prototype.authenticate = function authenticate(role) {
   this.role = role;
   this._isAuthenticated = true;
 
-  this._sendLoginSuccess(role);
+  if (this._options === null) {
+    this._sendLoginSuccess(role);
+  } else {
+    this._sendLoginSuccess(role, this._options.join(' '));
+  }
 };
 
 Client.prototype.denyAuthentication = function denyAuthentication(reason) {
   this._sendLogInFailureAndDisconnect(reason); 
 };
 
+Client.prototype.sendGameEnd = function sendGameEnd(result, reason, moves) {
+  this._sendGameEnd(result, reason, moves.P1, moves.P2);
+};
+
 Client.prototype.sendGameEndAndDisconnect = 
   function sendGameEndAndDisconnect(result, reason, moves) {
 
-  this._sendGameEnd(result, reason, moves.P1, moves.P2);
+  this.sendGameEnd(result, reason, moves);
   this._disconnect();
 };
 
@@ -66,6 +95,16 @@ Client.prototype._handleReadable = function _handleReadable() {
     }
     var lengthInput = prefixBytes.readUInt16BE(0);
     var isOutOfRange = lengthInput === 0 || lengthInput > MAX_BODY_LENGTH;
+    if (lengthInput === 0 && this.large) {
+      var lengthBytes = this._connection.read(
+          LARGE_HEADER_LENGTH - PREFIX_LENGTH);
+      if (lengthBytes === null) {
+        this._connection.unshift(prefixBytes);
+        return;
+      }
+      lengthInput = lengthBytes.readUInt32BE(0);
+      isOutOfRange = lengthInput === 0 || lengthInput > MAX_LARGE_BODY_LENGTH;
+    }
     if (isOutOfRange) {
       this._sendInvalidAndDisconnect('Prefix shows valid length prefix');
       return;
@@ -101,8 +140,9 @@ Client.prototype._handleReadable = function _handleReadable() {
 };
 
 Client.prototype._handleError = function _handleError(error) {
-  if (error.code === 'ECONNRESET') {
-    // Will be handled by _handleClose
+  if (error.code === 'ECONNRESET' || error.code === 'EPIPE') {
+    // Will be handled by _handleClose. Newer versions of node report writes
+    // after the other end has closed here instead of throwing from write()
     return;
   }
   throw error;
@@ -114,7 +154,7 @@ Client.prototype._handleClose = function _handleClose(hadError) {
 };
 
 Client.prototype._handleLogIn = function _handleLogIn(args) {
-  if (args.length !== 2) {
+  if (args.length !== 2 && args.length !== 3) {
     this._sendInvalidAndDisconnect(
         'Incorrect number of arguments for LOGIN');
     return;
@@ -135,6 +175,16 @@ Client.prototype._handleLogIn = function _handleLogIn(args) {
     return;
   }
 
+  // Unknown options are ignored and left out of LOGIN/SUCCESS
+  if (args.length === 3) {
+    this._options = args[2].split(/\s+/).filter(function(option) {
+      return OPTIONS.indexOf(option) !== -1;
+    });
+    this.session = this._options.indexOf(SESSION_OPTION) !== -1;
+    this.resume = this._options.indexOf(RESUME_OPTION) !== -1;
+    this.large = this._options.indexOf(LARGE_OPTION) !== -1;
+  }
+
   this.username = username;
   this.emit('authRequest', this, username, password);
 };
@@ -174,7 +224,12 @@ Client.prototype._sendMessage = function _sendMessage(type, args) {
 
   var bodyLength = Buffer.byteLength(body);
   if (bodyLength > MAX_BODY_LENGTH) {
-    throw new Error('Message byte length exceeds MAX_BODY_LENGTH.');
+    if (this.large) {
+      this.sendEncoded(encodeMessage(type, args));
+    } else {
+      this.sendInvalidAndDisconnect(MESSAGE_TOO_LARGE);
+    }
+    return;
   }
 
   this._outBuffer.writeUInt16BE(bodyLength, 0);
@@ -192,6 +247,44 @@ Client.prototype._sendMessage = function _sendMessage(type, args) {
   }
 };
 
+// Sends a message encoded with `encodeMessage`. The same buffer can be sent
+// to many clients. `large` is whether it has large messages.
+Client.prototype.sendEncoded = function sendEncoded(buffer, large) {
+  if (this.isDisconnected) {
+    return;
+  }
+  if (large && !this.large) {
+    this.sendInvalidAndDisconnect(MESSAGE_TOO_LARGE);
+    return;
+  }
+
+  try {
+    this._connection.write(buffer);
+  } catch (error) {
+    if (error.code === 'EPIPE') {
+      // Handled by 'close' event handler
+      return;
+    }
+
+    throw error;
+  }
+};
+
+// The number of bytes written that haven't been sent yet
+Client.prototype.pendingBytes = function pendingBytes() {
+  return this._connection.bufferSize;
+};
+
+Client.prototype.disconnect = function disconnect() {
+  this._disconnect();
+};
+
+Client.prototype.sendResume = function sendResume(state, turnNumber, lastMoves,
+                                                  move, timeleft) {
+  this._sendMessage('RESUME', [state, turnNumber, lastMoves.P1, lastMoves.P2,
+                               move, timeleft]);
+};
+
 Client.prototype.sendNextTurn = function sendNextTurn(moves) {
   this._sendMessage('NEXT', [moves.P1, moves.P2]);
 };
@@ -207,11 +300,43 @@ Client.prototype._sendLoginFailure = createSendFunc('LOGIN/FAILURE');
 Client.prototype._sendLoginSuccess = createSendFunc('LOGIN/SUCCESS');
 Client.prototype._sendGameEnd = createSendFunc('END');
 
-Client.prototype.sendGameStart = createSendFunc('START');
+Client.prototype.sendGameStart = function sendGameStart(initialState,
+                                                        movetime) {
+  if (this.session) {
+    this._sendMessage('START', [initialState, movetime, this.role]);
+  } else {
+    this._sendMessage('START', [initialState, movetime]);
+  }
+};
 
 Client.prototype._disconnect = function _disconnect() {
   this.isDisconnected = true;
   this._connection.end();
 };
 
+// Bodies longer than MAX_BODY_LENGTH are encoded as large messages
+function encodeMessage(type, args) {
+  var body = type + ':' + csv.stringify(args).trim();
+
+  var bodyLength = Buffer.byteLength(body);
+  if (bodyLength > MAX_BODY_LENGTH) {
+    var buffer = Buffer.alloc(LARGE_HEADER_LENGTH + bodyLength);
+    buffer.writeUInt16BE(0, 0);
+    buffer.writeUInt32BE(bodyLength, PREFIX_LENGTH);
+    buffer.write(body, LARGE_HEADER_LENGTH);
+    return buffer;
+  }
+
+  var buffer = Buffer.alloc(PREFIX_LENGTH + bodyLength);
+  buffer.writeUInt16BE(bodyLength, 0);
+  buffer.write(body, PREFIX_LENGTH);
+  return buffer;
+}
+
+function isLarge(buffer) {
+  return buffer.length > PREFIX_LENGTH + MAX_BODY_LENGTH;
+}
+
 exports.Client = Client;
+exports.encodeMessage = encodeMessage;
+exports.isLarge = isLarge;
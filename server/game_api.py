@@ -0,0 +1,187 @@
+#! python3
+"""The game module API for Python game modules, and its conformance suite.
+
+`Game` is the API in docs/gameapi.txt as a protocol class. A Python game
+module exports a class that implements it as `Game`, the same as a JS one.
+Moves and the values returned by `start` and `move` are dicts with `P1` and
+`P2` keys, and `None` takes the place of `null`.
+
+A conformance case is a sequence of joint moves with what the reference
+implementation, the game's JS module, did with them: the value returned by
+`start` and each `move`, and the result, result reason and state after each.
+Cases are stored as JSON and recorded by running the JS module with node.
+
+Usage:
+  game_api.py check GAME CASES
+  game_api.py record JSGAME CASES
+
+  check   Replays the cases in CASES with the Python game module GAME
+  record  Records the steps of the moves in CASES with the JS module JSGAME"""
+
+import os
+import sys
+
+import importlib.util
+import json
+import subprocess
+import typing
+
+RESULTS = (None, '1-0', '0-1', '1/2-1/2')
+
+@typing.runtime_checkable
+class Game(typing.Protocol):
+    """A game between P1 and P2 played in turns of joint moves"""
+
+    #None until the game ends, then one of '1-0', '0-1' or '1/2-1/2'
+    result: typing.Optional[str]
+
+    #None until the game ends, then the reason for the result
+    resultReason: typing.Optional[str]
+
+    def start(self) -> typing.Dict[str, bool]:
+        """Starts the game and returns which players move in the first turn"""
+        ...
+
+    def move(self, value: typing.Dict[str, typing.Optional[str]]
+             ) -> typing.Optional[typing.Dict[str, bool]]:
+        """Plays the joint move for the turn.
+
+        Returns which players move in the next turn or None if the game
+        ended."""
+        ...
+
+    def getState(self) -> str:
+        """Returns the game state in the game's notation"""
+        ...
+
+
+def loadGameClass(path):
+    spec = importlib.util.spec_from_file_location(
+            'game', os.path.abspath(path))
+    if spec is None:
+        raise ImportError('Game module not found: ' + path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.Game
+
+def loadCases(path):
+    with open(path) as f:
+        return json.load(f)['cases']
+
+def writeCases(path, cases):
+    """Writes `cases` as JSON with one case per line"""
+    with open(path, 'w') as f:
+        f.write('{"cases": [\n')
+        f.write(',\n'.join(json.dumps(case) for case in cases))
+        f.write('\n]}\n')
+
+def _step(game, toMove):
+    return {'toMove': toMove,
+            'result': game.result,
+            'resultReason': game.resultReason,
+            'state': game.getState()}
+
+def replay(gameClass, turns):
+    """Plays `turns` with a new game and returns its steps
+
+    The first step is after `start` and there is one for each `move` up to
+    the end of the game."""
+
+    game = gameClass()
+    toMove = game.start()
+    steps = [_step(game, toMove)]
+    for p1Move, p2Move in turns:
+        if toMove is None:
+            break
+        toMove = game.move({'P1': p1Move, 'P2': p2Move})
+        steps.append(_step(game, toMove))
+    return steps
+
+def checkConformance(gameClass, cases):
+    """Returns a description of each way `gameClass` differs from `cases`"""
+
+    failures = []
+    if not isinstance(gameClass(), Game):
+        failures.append('{} does not have every member of the game API'
+                        .format(gameClass.__name__))
+        return failures
+
+    for number, case in enumerate(cases):
+        name = case.get('name', str(number))
+        try:
+            steps = replay(gameClass, case['turns'])
+        except Exception as error:
+            failures.append('{}: raised {!r}'.format(name, error))
+            continue
+
+        if len(steps) != len(case['steps']):
+            failures.append('{}: ended after {} moves, expected {}'.format(
+                name, len(steps) - 1, len(case['steps']) - 1))
+        for i, (actual, expected) in enumerate(zip(steps, case['steps'])):
+            if actual != expected:
+                where = 'start' if i == 0 else 'move {}'.format(i)
+                failures.append('{}: after {} got {!r}, expected {!r}'.format(
+                    name, where, actual, expected))
+                break
+
+        result = steps[-1]['result']
+        if result not in RESULTS:
+            failures.append('{}: invalid result {!r}'.format(name, result))
+
+    return failures
+
+_recordScript = '''
+var Game = require(process.argv[1]).Game;
+var cases = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+console.log(JSON.stringify(cases.map(function(turns) {
+  function step(game, toMove) {
+    return {toMove: toMove, result: game.result,
+            resultReason: game.resultReason, state: game.getState()};
+  }
+  var game = new Game();
+  var toMove = game.start();
+  var steps = [step(game, toMove)];
+  for (var i = 0; i < turns.length && toMove !== null; i++) {
+    toMove = game.move({P1: turns[i][0], P2: turns[i][1]});
+    steps.push(step(game, toMove));
+  }
+  return steps;
+})));
+'''
+
+def recordCases(jsGamePath, cases):
+    """Fills in the steps of `cases` by running the JS game module"""
+
+    output = subprocess.check_output(
+            ['node', '-e', _recordScript, os.path.abspath(jsGamePath)],
+            input=json.dumps([case['turns'] for case in cases]),
+            universal_newlines=True)
+
+    for case, steps in zip(cases, json.loads(output)):
+        #Only keep the turns that were played
+        case['turns'] = case['turns'][:len(steps) - 1]
+        case['steps'] = steps
+    return cases
+
+def main(args):
+    if len(args) != 3 or args[0] not in ('check', 'record'):
+        print(__doc__.split('\n\n', 3)[-1], file=sys.stderr)
+        return 1
+
+    command, gamePath, casesPath = args
+    cases = loadCases(casesPath)
+
+    if command == 'record':
+        recordCases(gamePath, cases)
+        writeCases(casesPath, cases)
+        print('Recorded {} cases'.format(len(cases)))
+        return 0
+
+    failures = checkConformance(loadGameClass(gamePath), cases)
+    for failure in failures:
+        print(failure)
+    print('{} cases, {} failures'.format(len(cases), len(failures)))
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
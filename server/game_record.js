@@ -0,0 +1,114 @@
+"use strict";
+
+// Appends game records to an archive. See game_record.py for the format and
+// the reader.
+
+var fs = require('fs');
+
+var MAGIC = 'GRBREC02';
+var INDEX_MAGIC = 'GRBIDX01';
+var INDEX_SUFFIX = '.idx';
+var NO_MOVE = 0xFFFFFFFF;
+
+function RecordWriter(path) {
+  this.path = path;
+
+  this._fd = fs.openSync(path, 'a');
+  this._indexFd = fs.openSync(path + INDEX_SUFFIX, 'a');
+  this._size = fs.fstatSync(this._fd).size;
+
+  if (this._size === 0) {
+    this._append(this._fd, Buffer.from(MAGIC, 'ascii'));
+    this._size = MAGIC.length;
+  } else {
+    var header = Buffer.alloc(MAGIC.length);
+    var fd = fs.openSync(path, 'r');
+    var read = fs.readSync(fd, header, 0, MAGIC.length, 0);
+    fs.closeSync(fd);
+    if (read !== MAGIC.length || header.toString('ascii') !== MAGIC) {
+      this.close();
+      throw new Error('Not a game record archive: ' + path);
+    }
+  }
+  if (fs.fstatSync(this._indexFd).size === 0) {
+    this._append(this._indexFd, Buffer.from(INDEX_MAGIC, 'ascii'));
+  }
+}
+
+RecordWriter.prototype.write = function write(record) {
+  var body = encodeRecordBody(record);
+  var buffer = Buffer.alloc(4 + body.length);
+  buffer.writeUInt32BE(body.length, 0);
+  body.copy(buffer, 4);
+
+  var offset = this._size;
+  this._append(this._fd, buffer);
+  this._size += buffer.length;
+
+  var entry = Buffer.alloc(8);
+  entry.writeUInt32BE(Math.floor(offset / 0x100000000), 0);
+  entry.writeUInt32BE(offset % 0x100000000, 4);
+  this._append(this._indexFd, entry);
+};
+
+RecordWriter.prototype.close = function close() {
+  fs.closeSync(this._fd);
+  fs.closeSync(this._indexFd);
+};
+
+RecordWriter.prototype._append = function _append(fd, buffer) {
+  var written = 0;
+  while (written < buffer.length) {
+    written += fs.writeSync(fd, buffer, written, buffer.length - written, null);
+  }
+};
+
+function encodeRecordBody(record) {
+  var parts = [];
+
+  parts.push(packString(record.p1, 2));
+  parts.push(packString(record.p2, 2));
+  parts.push(packUInt32(record.movetime));
+  parts.push(packString(record.initialState, 4));
+  parts.push(packUInt32(record.turns.length));
+  for (var i = 0; i < record.turns.length; i++) {
+    var turn = record.turns[i];
+    parts.push(packUInt32(turn.offset));
+    parts.push(packMove(turn.p1Move));
+    parts.push(packMove(turn.p2Move));
+  }
+  parts.push(packString(record.result, 4));
+  parts.push(packString(record.reason, 4));
+
+  return Buffer.concat(parts);
+}
+
+function packUInt32(value) {
+  var buffer = Buffer.alloc(4);
+  buffer.writeUInt32BE(value, 0);
+  return buffer;
+}
+
+function packString(value, lengthSize) {
+  var length = Buffer.byteLength(value, 'utf8');
+  var buffer = Buffer.alloc(lengthSize + length);
+  if (lengthSize === 2) {
+    buffer.writeUInt16BE(length, 0);
+  } else {
+    buffer.writeUInt32BE(length, 0);
+  }
+  if (length > 0) {
+    buffer.write(value, lengthSize, length, 'utf8');
+  }
+  return buffer;
+}
+
+function packMove(move) {
+  if (move === null) {
+    return packUInt32(NO_MOVE);
+  }
+  return packString(move, 4);
+}
+
+exports.RecordWriter = RecordWriter;
+exports.encodeRecordBody = encodeRecordBody;
@@ -0,0 +1,288 @@
+#! python3
+"""Writes and reads archives of game records.
+
+An archive is append only. It starts with an 8 byte header, `MAGIC`, and is
+followed by one record per game: a 4 byte length and then the record body.
+
+A record body has, in order:
+
+  P1 username          2 byte length and UTF-8 bytes
+  P2 username          2 byte length and UTF-8 bytes
+  Movetime             4 bytes, milliseconds
+  Initial state        4 byte length and UTF-8 bytes
+  Turn count           4 bytes
+  For each turn:
+    Offset             4 bytes, milliseconds from the start of the game
+    P1 move            4 byte length and UTF-8 bytes
+    P2 move            4 byte length and UTF-8 bytes
+  Result               4 byte length and UTF-8 bytes
+  Reason               4 byte length and UTF-8 bytes
+
+Integers are unsigned and big endian like the protocol's length prefix. A
+move length of `NO_MOVE` means the player didn't move in the turn. Moves
+can be as long as a large message, so their lengths don't share the 2 byte
+limit of usernames, which are sent before large messages are negotiated.
+The offset of a turn is the game time, as logged by the server, when its
+moves were applied.
+
+The index file, the archive path with `.idx` appended, is an 8 byte header,
+`INDEX_MAGIC`, followed by the 8 byte offset of each record. The reader
+rebuilds the part of the index that is missing or invalid by scanning the
+archive, so an archive can be read without one.
+
+Usage: game_record.py ARCHIVE [GAME]
+
+Prints the number of games in ARCHIVE, or game number GAME."""
+
+import os
+import sys
+
+import mmap
+import struct
+
+from array import array
+from collections import namedtuple
+
+MAGIC = b'GRBREC02'
+INDEX_MAGIC = b'GRBIDX01'
+INDEX_SUFFIX = '.idx'
+NO_MOVE = 0xFFFFFFFF
+
+GameRecord = namedtuple('GameRecord', ['p1', 'p2', 'movetime', 'initialState',
+                                       'turns', 'result', 'reason'])
+Turn = namedtuple('Turn', ['offset', 'p1Move', 'p2Move'])
+
+_length = struct.Struct('!I')
+_shortLength = struct.Struct('!H')
+_turnOffset = struct.Struct('!I')
+_indexEntry = struct.Struct('!Q')
+
+class InvalidArchive(Exception):
+    pass
+
+def _packString(parts, value, lengthStruct=_length):
+    bytes_ = value.encode('utf-8')
+    parts.append(lengthStruct.pack(len(bytes_)))
+    parts.append(bytes_)
+
+def _packMove(parts, move):
+    if move is None:
+        parts.append(_length.pack(NO_MOVE))
+    else:
+        _packString(parts, move)
+
+def encodeRecord(record):
+    """Returns `record` as bytes, including its length"""
+
+    parts = []
+    _packString(parts, record.p1, _shortLength)
+    _packString(parts, record.p2, _shortLength)
+    parts.append(_length.pack(record.movetime))
+    _packString(parts, record.initialState)
+    parts.append(_length.pack(len(record.turns)))
+    for offset, p1Move, p2Move in record.turns:
+        parts.append(_turnOffset.pack(offset))
+        _packMove(parts, p1Move)
+        _packMove(parts, p2Move)
+    _packString(parts, record.result)
+    _packString(parts, record.reason)
+
+    body = b''.join(parts)
+    return _length.pack(len(body)) + body
+
+def decodeRecord(buffer, position=0):
+    """Returns the `GameRecord` that starts at `position` in `buffer`
+
+    `position` is the start of the record's length."""
+
+    def string(lengthStruct=_length):
+        nonlocal position
+        length, = lengthStruct.unpack_from(buffer, position)
+        position += lengthStruct.size
+        if length == NO_MOVE:
+            return None
+        value = str(buffer[position:position + length], 'utf-8')
+        position += length
+        return value
+
+    def integer():
+        nonlocal position
+        value, = _length.unpack_from(buffer, position)
+        position += _length.size
+        return value
+
+    end = position + _length.size + integer()
+    if end > len(buffer):
+        raise InvalidArchive('Record is truncated')
+
+    p1 = string(_shortLength)
+    p2 = string(_shortLength)
+    movetime = integer()
+    initialState = string()
+    turns = []
+    for i in range(integer()):
+        offset = integer()
+        turns.append(Turn(offset, string(), string()))
+    result = string()
+    reason = string()
+
+    if position != end:
+        raise InvalidArchive('Record length is incorrect')
+
+    return GameRecord(p1, p2, movetime, initialState, turns, result, reason)
+
+
+class RecordWriter():
+    """Appends game records to an archive and its index
+
+    Only one writer should have an archive open at a time."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'ab')
+        self._indexFile = open(path + INDEX_SUFFIX, 'ab')
+
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        else:
+            with open(path, 'rb') as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    self.close()
+                    raise InvalidArchive('Not a game record archive: ' + path)
+        if self._indexFile.tell() == 0:
+            self._indexFile.write(INDEX_MAGIC)
+
+    def write(self, record):
+        offset = self._file.tell()
+        self._file.write(encodeRecord(record))
+        self._file.flush()
+        self._indexFile.write(_indexEntry.pack(offset))
+        self._indexFile.flush()
+
+    def close(self):
+        self._file.close()
+        self._indexFile.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class RecordReader():
+    """Reads a memory mapped archive
+
+    Iterating yields every game in order. Games can also be read by number,
+    which uses the index."""
+
+    def __init__(self, path):
+        self.path = path
+        self._index = None
+
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._map[:len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise InvalidArchive('Not a game record archive: ' + path)
+
+    def __iter__(self):
+        for offset in self.offsets():
+            yield decodeRecord(self._map, offset)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, number):
+        return decodeRecord(self._map, self.index[number])
+
+    def offsets(self, start=len(MAGIC)):
+        """Yields the offset of each complete record from `start` on
+
+        A truncated record at the end, from a writer that stopped part way
+        through, is ignored."""
+
+        size = len(self._map)
+        position = start
+        while position + _length.size <= size:
+            length, = _length.unpack_from(self._map, position)
+            end = position + _length.size + length
+            if end > size:
+                return
+            yield position
+            position = end
+
+    @property
+    def index(self):
+        """An array of the offset of each record"""
+        if self._index is None:
+            self._index = self._loadIndex()
+        return self._index
+
+    def _loadIndex(self):
+        index = array('Q')
+        try:
+            with open(self.path + INDEX_SUFFIX, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b''
+
+        if data[:len(INDEX_MAGIC)] == INDEX_MAGIC:
+            count = (len(data) - len(INDEX_MAGIC)) // _indexEntry.size
+            index.frombytes(data[len(INDEX_MAGIC):
+                                 len(INDEX_MAGIC) + count * _indexEntry.size])
+            if sys.byteorder == 'little':
+                index.byteswap()
+
+        #Keep the entries that point to consecutive records
+        size = len(self._map)
+        expected = len(MAGIC)
+        valid = 0
+        for offset in index:
+            if offset != expected or offset + _length.size > size:
+                break
+            length, = _length.unpack_from(self._map, offset)
+            if offset + _length.size + length > size:
+                break
+            expected = offset + _length.size + length
+            valid += 1
+        del index[valid:]
+
+        index.extend(self.offsets(expected))
+        return index
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def main(args):
+    if not 1 <= len(args) <= 2:
+        print(__doc__.split('\n\n')[-2], file=sys.stderr)
+        return 1
+
+    with RecordReader(args[0]) as reader:
+        if len(args) == 1:
+            print('{} games'.format(len(reader)))
+            return 0
+
+        record = reader[int(args[1])]
+        print('{} v {}, movetime {}'.format(
+            record.p1, record.p2, record.movetime))
+        print(record.initialState)
+        for offset, p1Move, p2Move in record.turns:
+            for role, move in (('P1', p1Move), ('P2', p2Move)):
+                if move is not None:
+                    print('{}: {} {}'.format(offset, role, move))
+        print('Result {} ({})'.format(record.result, record.reason))
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -7,6 +7,9 @@ var net = require('net');
 var path = require('path');
 
 var Client = require('./client.js').Client;
+var encodeMessage = require('./client.js').encodeMessage;
+var isLarge = require('./client.js').isLarge;
+var RecordWriter = require('./game_record.js').RecordWriter;
 
 var pkg = require('./package.json');
 var semver = require('semver');
@@ -19,7 +22,12 @@ if(!semver.satisfies(process.version, pkg.engines.node)) {
 var doc = (
 'Usage: server.js GAME P1 P2 [options]\n' +
 '\n' + 
-'Runs the server for a single match between two players.\n' + 
+'Runs the server for a match between two players. A match is a single game\n' +
+'or, with --games, a series of games played without restarting the server.\n' +
+'Clients that log in with the session option stay connected between games;\n' +
+'others log in again for each game. Players that log in with the resume\n' +
+'option keep their seat after losing their connection until the move time\n' +
+'of a turn runs out, and can log in again to carry on playing.\n' +
 '\n' +
 'Arguments:\n' + 
 '  GAME Path to the game module\n' +
@@ -29,7 +37,10 @@ var doc = (
 'Options:\n' +
 '  -h --help      Show help\n' + 
 '  --port PORT    The port to use [default: 13579]\n' + 
-'  --movetime MS  The time limit per move in milliseconds [default: 1000]\n'
+'  --movetime MS  The time limit per move in milliseconds [default: 1000]\n' +
+'  --record FILE  Game record archive to append each game to\n' +
+'  --games N      The number of games to play [default: 1]\n' +
+'  --alternate    Swap the players\' roles after each game\n'
 );
 
 var input = docopt.docopt(doc);
@@ -49,6 +60,15 @@ if (isNaN(movetime) || movetime <= 0) {
   process.exit(1);
 }
 
+var games = parseInt(input['--games'], 10);
+if (isNaN(games) || games <= 0) {
+  console.log('Invalid number of games');
+  process.exit(1);
+}
+var alternate = input['--alternate'];
+
+var recorder = input['--record'] ? new RecordWriter(input['--record']) : null;
+
 try {
   var Game = require(gameModulePath).Game;
 } catch (error) {
@@ -59,17 +79,52 @@ try {
   throw error;
 }
 
+// Spectators that fall this far behind are disconnected
+var SPECTATOR_BUFFER_LIMIT = 1024 * 1024;
+
 var loggedInUsernames = [];
+var playerClients = {};
 var p1 = null;
 var p2 = null;
 var spectators = [];
+var spectatorQueue = [];
+var spectatorFlushScheduled = false;
+var spectatorsLeave = false;
+
+var score = {};
+score[p1Username] = 0;
+score[p2Username] = 0;
+var gamesPlayed = 0;
+var matchEnded = false;
 
 var game = null;
 var gameStarted = false;
 var gameEnded = false;
 var turnNumber = 0;
+var turnTimer = null;
 var toMove = {P1: false, P2: false};
 var moves = {P1: null, P2: null};
+var lastMoves = {P1: null, P2: null};
+var turnStartHRTime = null;
+
+var initialState = null;
+var recordedTurns = [];
+
+// The roles are swapped in every other game with --alternate
+function usernameFor(role) {
+  var swapped = alternate && gamesPlayed % 2 === 1;
+  return (role === 'P1') !== swapped ? p1Username : p2Username;
+}
+
+function roleOf(username) {
+  if (username === usernameFor('P1')) {
+    return 'P1';
+  }
+  if (username === usernameFor('P2')) {
+    return 'P2';
+  }
+  return 'Spectator';
+}
 
 var startHRTime = null;
 function gametime() {
@@ -77,24 +132,49 @@ function gametime() {
   return Math.floor(diff[0] * 1e3 + diff[1] / 1e6);
 }
 
+function startIfReady() {
+  var first = playerClients[usernameFor('P1')];
+  var second = playerClients[usernameFor('P2')];
+  if (first && !first.isDisconnected && second && !second.isDisconnected &&
+      !gameStarted && !matchEnded) {
+    startGame();
+  }
+}
+
 function startGame() {
-  console.log('Starting game')
+  if (games > 1) {
+    console.log('Starting game ' + (gamesPlayed + 1) + ' of ' + games);
+  } else {
+    console.log('Starting game');
+  }
   gameStarted = true;
+  gameEnded = false;
   startHRTime = process.hrtime();
 
+  p1 = playerClients[usernameFor('P1')];
+  p2 = playerClients[usernameFor('P2')];
+  p1.role = 'P1';
+  p2.role = 'P2';
+
+  // A new game from the module that is already loaded
   game = new Game();
   toMove = game.start();
+  turnNumber = 0;
+  moves = {P1: null, P2: null};
+  lastMoves = {P1: null, P2: null};
+  recordedTurns = [];
 
   turnNumber++;
   console.log(gametime() + ': Turn ' + turnNumber);
 
   var clients = getFairClientList();
-  var initialState = game.getState();
+  initialState = game.getState();
   for (var i = 0; i < clients.length; i++) {
     clients[i].sendGameStart(initialState, movetime);
   }
+  queueForSpectators('START', [initialState, movetime]);
 
-  setTimeout(makeTimeout(turnNumber), movetime);
+  startTimer();
 }
 
 function nextTurn() {
@@ -103,6 +183,7 @@ function nextTurn() {
   }
 
   toMove = game.move(moves);
+  recordTurn(moves);
 
   if (toMove === null) {
     endGame(game.result, game.resultReason, moves);
@@ -112,15 +193,16 @@ function nextTurn() {
   turnNumber++;
   console.log(gametime() + ': Turn ' + turnNumber);
 
-  var lastMoves = moves;
+  lastMoves = moves;
   moves = { P1: null, P2: null };
   
   var clients = getFairClientList();
   for (var i = 0; i < clients.length; i++) {
     clients[i].sendNextTurn(lastMoves);
   }
+  queueForSpectators('NEXT', [lastMoves.P1, lastMoves.P2]);
 
-  setTimeout(makeTimeout(turnNumber), movetime);
+  startTimer();
 }
 
 function endGame(result, reason, moves) {
@@ -128,16 +210,128 @@ function endGame(result, reason, moves) {
     return;
   }
   gameEnded = true;
+  clearTimeout(turnTimer);
   console.log(gametime() + ': Result ' + result + ' (' + reason + ')' )
 
+  if (gameStarted && recorder !== null) {
+    if (recordedTurns.length < turnNumber) {
+      recordTurn(moves);
+    }
+    recorder.write({
+      p1: usernameFor('P1'),
+      p2: usernameFor('P2'),
+      movetime: movetime,
+      initialState: initialState,
+      turns: recordedTurns,
+      result: result,
+      reason: reason
+    });
+  }
+
+  addToScore(result);
+  gamesPlayed++;
+  matchEnded = gamesPlayed >= games;
+
   var clients = getFairClientList();
   for (var i = 0; i < clients.length; i++) {
-    clients[i].sendGameEndAndDisconnect(result, reason, moves);
+    if (clients[i].session && !matchEnded) {
+      clients[i].sendGameEnd(result, reason, moves);
+    } else {
+      clients[i].sendGameEndAndDisconnect(result, reason, moves);
+      unseat(clients[i]);
+    }
+  }
+  // Read when the queue is flushed, which only happens with spectators
+  spectatorsLeave = spectators.length > 0;
+  queueForSpectators('END', [result, reason, moves.P1, moves.P2]);
+
+  if (!matchEnded) {
+    gameStarted = false;
+    setImmediate(startIfReady);
+    return;
   }
 
+  if (games > 1) {
+    console.log('Score: ' + p1Username + ' ' + score[p1Username] + ' - ' +
+                score[p2Username] + ' ' + p2Username);
+  }
+  if (recorder !== null) {
+    recorder.close();
+  }
   server.close();
 }
 
+function addToScore(result) {
+  var points = {'1-0': [1, 0], '0-1': [0, 1], '1/2-1/2': [0.5, 0.5]};
+  if (result in points) {
+    score[usernameFor('P1')] += points[result][0];
+    score[usernameFor('P2')] += points[result][1];
+  }
+}
+
+// Removes a client that left between games so its user can log in again
+function unseat(client) {
+  if (matchEnded) {
+    return;
+  }
+
+  if (playerClients[client.username] === client) {
+    delete playerClients[client.username];
+  }
+  var index = spectators.indexOf(client);
+  if (index > -1) {
+    spectators.splice(index, 1);
+  }
+  index = loggedInUsernames.indexOf(client.username);
+  if (index > -1) {
+    loggedInUsernames.splice(index, 1);
+  }
+}
+
+function isSeated(client) {
+  return playerClients[client.username] === client ||
+      spectators.indexOf(client) > -1;
+}
+
+// Whether the player lost its connection during the game and can log in
+// again to take its seat back
+function awaitsResume(username) {
+  var previous = playerClients[username];
+  return previous !== undefined && previous.isDisconnected &&
+      gameStarted && !gameEnded;
+}
+
+function resume(client, previous) {
+  var role = previous.role;
+  playerClients[client.username] = client;
+  if (previous === p1) {
+    p1 = client;
+  } else {
+    p2 = client;
+  }
+
+  console.log(role + ' resumed');
+  loggedInUsernames.push(client.username);
+  client.authenticate(role);
+
+  var elapsed = process.hrtime(turnStartHRTime);
+  var timeleft = movetime - Math.floor(elapsed[0] * 1e3 + elapsed[1] / 1e6);
+  client.sendResume(game.getState(), turnNumber, lastMoves, moves[role],
+                    Math.max(0, timeleft));
+}
+
+function recordTurn(moves) {
+  if (recorder !== null) {
+    recordedTurns.push({offset: gametime(), p1Move: moves.P1, p2Move: moves.P2});
+  }
+}
+
+function startTimer() {
+  clearTimeout(turnTimer);
+  turnStartHRTime = process.hrtime();
+  turnTimer = setTimeout(makeTimeout(turnNumber), movetime);
+}
+
 function makeTimeout(turnNumber) {
   var created = gametime();
   return function() {
@@ -154,11 +348,20 @@ function timeout(turnNumber_, created) {
     return;
   }
 
+  // Players that haven't resumed in time
+  var players = [p1, p2];
+  for (var i = 0; i < players.length; i++) {
+    if (players[i].isDisconnected) {
+      endGame(lossFor(players[i]), players[i].role + ' disconnected', moves);
+      return;
+    }
+  }
+
   var p1Disqualified = toMove.P1 && moves.P1 === null;
   var p2Disqualified = toMove.P2 && moves.P2 === null; 
   
   if (p1Disqualified && p2Disqualified) {
-    // TODO: Game drawn
+    endGame('1/2-1/2', 'Both players exceeded move time limit', moves);
   } else if (p1Disqualified) {
     endGame('0-1', 'P1 exceeded move time limit', moves)
   } else if (p2Disqualified) {
@@ -180,11 +383,46 @@ function getFairClientList() {
     result.push(p1);
   }
 
-  for (var i = 0; i < spectators.length; i++) {
-    result.push(spectators[i]);
+  return result;
+}
+
+// Messages to spectators are encoded once and sent after the players have
+// been sent theirs, batched with any others queued in the same tick.
+function queueForSpectators(type, args) {
+  if (spectators.length === 0) {
+    return;
+  }
+
+  spectatorQueue.push(encodeMessage(type, args));
+  if (!spectatorFlushScheduled) {
+    spectatorFlushScheduled = true;
+    setImmediate(flushSpectatorQueue);
   }
+}
 
-  return result;
+function flushSpectatorQueue() {
+  spectatorFlushScheduled = false;
+
+  var large = spectatorQueue.some(isLarge);
+  var buffer = Buffer.concat(spectatorQueue);
+  spectatorQueue = [];
+  var leave = spectatorsLeave;
+  spectatorsLeave = false;
+
+  var current = spectators.slice();
+  for (var i = 0; i < current.length; i++) {
+    var spectator = current[i];
+    if (spectator.pendingBytes() > SPECTATOR_BUFFER_LIMIT) {
+      spectator.disconnect();
+      continue;
+    }
+
+    spectator.sendEncoded(buffer, large);
+    if (leave && (matchEnded || !spectator.session)) {
+      spectator.disconnect();
+      unseat(spectator);
+    }
+  }
 }
 
 function lossFor(player) {
@@ -202,37 +440,40 @@ function handleConnection(socket) {
     //TODO: Proper password checking
   
     if (loggedInUsernames.indexOf(username) > -1) {
-      //TODO: Get the existing client, if it's disconnected
-      //      replace it instead of denying
       client.denyAuthentication('User already logged in');
       return;
     }
 
-    var role;
-    if (username === p1Username) {
-      console.log('P1 logged in');
-      role = 'P1';
-      p1 = client;
-    } else if (username === p2Username) {
-      console.log('P2 logged in');
-      role = 'P2';
-      p2 = client;
-    } else {
-      role = 'Spectator';
+    if (matchEnded) {
+      client.denyAuthentication('Incorrect password');
+      return;
+    }
+
+    if (awaitsResume(username)) {
+      // Only clients that can handle RESUME take over a player's seat
+      if (!client.resume) {
+        client.denyAuthentication('User already logged in');
+        return;
+      }
+      resume(client, playerClients[username]);
+      return;
+    }
+
+    var role = roleOf(username);
+    if (role === 'Spectator') {
       spectators.push(client);
+    } else {
+      console.log(role + ' logged in');
+      playerClients[username] = client;
     }
     
     loggedInUsernames.push(username);
     client.authenticate(role);
-
-    if (p1 !== null && !p1.isDisconnected && 
-        p2 !== null && !p2.isDisconnected) {
-      startGame();
-    }
+    startIfReady();
   });
 
   client.on('disconnect', function(client, reason) {
-    if (gameEnded) {
+    if (matchEnded || !isSeated(client)) {
       return;
     }
 
@@ -243,10 +484,21 @@ function handleConnection(socket) {
     }
 
     if (!gameStarted) {
+      if (playerClients[client.username] === client) {
+        delete playerClients[client.username];
+      }
+      index = spectators.indexOf(client);
+      if (index > -1) {
+        spectators.splice(index, 1);
+      }
       return;
     }
 
     if (client === p1 || client === p2) {
+      // The seat is kept until the turn's move time runs out
+      if (client.resume) {
+        return;
+      }
       endGame(
         lossFor(client),
         (client === p1 ? 'P1' : 'P2') + ' disconnected', 
@@ -256,6 +508,10 @@ function handleConnection(socket) {
 
   client.on('move', function(client, move) {
     if (!gameStarted) {
+      // A move sent as the last game ended
+      if (gamesPlayed > 0 && client.session) {
+        return;
+      }
       client.sendInvalidAndDisconnect('Not logged in');
       return;
     }
@@ -273,10 +529,13 @@ function handleConnection(socket) {
         lossFor(client),
         role + ' moved when not allowed to', 
         moves);
+      return;
     }
 
     moves[role] = move;
-    //TODO: Broadcast moves to specators
+    if (!gameEnded) {
+      queueForSpectators('MOVED', [role, move]);
+    }
 
     if ((!toMove.P1 || moves.P1 !== null) &&
         (!toMove.P2 || moves.P2 !== null)) {
@@ -0,0 +1,842 @@
+#! python3
+"""Runs a server for many independent matches.
+
+A Python port of server.js. All matches share one listening socket. A client
+is routed to a match by the username it logs in with. Spectators use the
+username of either player in the match as their password to pick the match
+they watch; this isn't needed if there is only one match.
+
+With `--games N` each match is a series of N games, with the players'
+roles swapped after each game if `--alternate` is given, and the score of
+the series is logged at the end. Clients that log in with the `session`
+option stay connected between games; others are disconnected after each END
+and log in again for the next game.
+
+A player that logs in with the `resume` option and loses its connection
+during a game keeps its seat until the move time of a turn runs out. If it
+logs in again before then, it is sent RESUME and carries on playing.
+
+Messages longer than 512 bytes are only sent to clients that logged in with
+the `large` option. Other clients are sent INVALID and disconnected instead.
+
+The server exits once every match has ended."""
+
+import os
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(dirname(abspath(__file__)), '..'))
+sys.path.append(join(proj_root, 'clients/Python'))
+
+import argparse
+import asyncio
+import csv
+import errno
+import importlib.util
+import random
+import re
+import struct
+import time
+
+import grebe_codec
+
+from game_record import (GameRecord, RecordWriter, Turn)
+
+PREFIX_LENGTH = 2
+MAX_BODY_LENGTH = 510
+
+#Large messages have a zero prefix followed by a 4 byte length
+LARGE_HEADER_LENGTH = 6
+MAX_LARGE_BODY_LENGTH = 64 * 1024 * 1024
+
+#Spectators that fall this far behind are disconnected
+SPECTATOR_BUFFER_LIMIT = 1024 * 1024
+
+#LOGIN options the server supports
+SESSION_OPTION = 'session'
+RESUME_OPTION = 'resume'
+LARGE_OPTION = 'large'
+OPTIONS = (SESSION_OPTION, RESUME_OPTION, LARGE_OPTION)
+
+#Sent to clients without the large option instead of a large message
+MESSAGE_TOO_LARGE = 'Message too large, log in with the large option'
+
+_usernameRegex = re.compile('[a-zA-Z0-9 ]+')
+
+class Connection(asyncio.Protocol):
+    """A client connection. The counterpart of client.js."""
+
+    def __init__(self, server):
+        self.username = None
+        self.role = None
+        self.match = None
+        self.isDisconnected = False
+        self.session = False
+        self.resume = False
+        #Whether messages longer than MAX_BODY_LENGTH can be sent both ways
+        self.large = False
+        self._options = None
+
+        self._server = server
+        self._transport = None
+        self._isAuthenticated = False
+        self._buffer = bytearray()
+        self._inHandlers = {
+            'LOGIN': self._handleLogIn,
+            'MOVE': self._handleMove,
+        }
+        self.closed = asyncio.get_running_loop().create_future()
+
+    def connection_made(self, transport):
+        self._transport = transport
+        self._server.connections.add(self)
+
+    def connection_lost(self, error):
+        self._server.connections.discard(self)
+        self.isDisconnected = True
+        self.closed.set_result(None)
+        self._server.handleDisconnect(self)
+
+    def data_received(self, data):
+        buffer = self._buffer
+        buffer += data
+
+        start = 0
+        while not self.isDisconnected:
+            if len(buffer) - start < PREFIX_LENGTH:
+                break
+
+            length, = struct.unpack_from('!H', buffer, start)
+            headerLength = PREFIX_LENGTH
+            if length == 0 and self.large:
+                if len(buffer) - start < LARGE_HEADER_LENGTH:
+                    break
+                length, = struct.unpack_from('!I', buffer,
+                                             start + PREFIX_LENGTH)
+                headerLength = LARGE_HEADER_LENGTH
+                isOutOfRange = (length == 0 or
+                                length > MAX_LARGE_BODY_LENGTH)
+            else:
+                isOutOfRange = length == 0 or length > MAX_BODY_LENGTH
+            if isOutOfRange:
+                self._sendInvalidAndDisconnect(
+                        'Prefix shows valid length prefix')
+                break
+
+            end = start + headerLength + length
+            if len(buffer) < end:
+                break
+
+            body = buffer[start + headerLength:end].decode('utf-8',
+                                                           'replace')
+            start = end
+            self._handleBody(body)
+
+        del buffer[:start]
+
+    def _handleBody(self, body):
+        mtype, sep, argcsv = body.partition(':')
+        if not sep:
+            self._sendInvalidAndDisconnect(
+                    'Body has invalid format - no colon.')
+            return
+
+        if mtype not in self._inHandlers:
+            self._sendInvalidAndDisconnect('Invalid message type')
+            return
+
+        try:
+            mtype, margs = grebe_codec.decode(body)
+        except ValueError as error:
+            self._sendInvalidAndDisconnect(str(error))
+            return
+
+        self._inHandlers[mtype](margs)
+
+    def _handleLogIn(self, args):
+        if len(args) not in (2, 3):
+            self._sendInvalidAndDisconnect(
+                    'Incorrect number of arguments for LOGIN')
+            return
+
+        username, password = args[:2]
+
+        if (username != username.strip() or
+            not _usernameRegex.fullmatch(username)):
+            self._sendLogInFailureAndDisconnect('Bad username')
+            return
+
+        if self._isAuthenticated:
+            self._sendLogInFailureAndDisconnect('Client already logged in')
+            return
+
+        #Unknown options are ignored and left out of LOGIN/SUCCESS
+        if len(args) == 3:
+            self._options = [option for option in args[2].split()
+                             if option in OPTIONS]
+            self.session = SESSION_OPTION in self._options
+            self.resume = RESUME_OPTION in self._options
+            self.large = LARGE_OPTION in self._options
+
+        self.username = username
+        self._server.handleAuthRequest(self, username, password)
+
+    def _handleMove(self, args):
+        if len(args) != 1:
+            self._sendInvalidAndDisconnect(
+                    'Incorrect number of arguments for MOVE')
+            return
+
+        if self.match is None:
+            self.sendInvalidAndDisconnect('Not logged in')
+            return
+
+        self.match.handleMove(self, args[0])
+
+    def authenticate(self, match, role):
+        self.match = match
+        self.role = role
+        self._isAuthenticated = True
+        if self._options is None:
+            self._sendMessage('LOGIN/SUCCESS', role)
+        else:
+            self._sendMessage('LOGIN/SUCCESS', role, ' '.join(self._options))
+
+    def denyAuthentication(self, reason):
+        self._sendLogInFailureAndDisconnect(reason)
+
+    def sendGameStart(self, initialState, movetime):
+        if self.session:
+            self._sendMessage('START', initialState, movetime, self.role)
+        else:
+            self._sendMessage('START', initialState, movetime)
+
+    def sendResume(self, state, turnNumber, lastMoves, move, timeleft):
+        self._sendMessage('RESUME', state, turnNumber, lastMoves['P1'],
+                          lastMoves['P2'], move, timeleft)
+
+    def sendNextTurn(self, moves):
+        self._sendMessage('NEXT', moves['P1'], moves['P2'])
+
+    def sendGameEnd(self, result, reason, moves):
+        self._sendMessage('END', result, reason, moves['P1'], moves['P2'])
+
+    def sendGameEndAndDisconnect(self, result, reason, moves):
+        self.sendGameEnd(result, reason, moves)
+        self._disconnect()
+
+    def sendInvalidAndDisconnect(self, reason):
+        self._sendMessage('INVALID', reason)
+        self._disconnect()
+
+    def sendEncoded(self, data, large=False):
+        """Sends messages that are already encoded. `large` is whether there
+        are large messages among them."""
+        if large and not self.large:
+            self.sendInvalidAndDisconnect(MESSAGE_TOO_LARGE)
+        elif not self.isDisconnected:
+            self._transport.write(data)
+
+    def pendingBytes(self):
+        """The number of bytes written that haven't been sent yet"""
+        return self._transport.get_write_buffer_size()
+
+    def disconnect(self):
+        self._disconnect()
+
+    def _sendInvalidAndDisconnect(self, reason):
+        self.sendInvalidAndDisconnect(reason)
+        if self.match is not None:
+            self.match.handleInvalidMessage(self)
+
+    def _sendLogInFailureAndDisconnect(self, reason):
+        self._sendMessage('LOGIN/FAILURE', reason)
+        self._disconnect()
+
+    def _sendMessage(self, mtype, *args):
+        if self.isDisconnected:
+            return
+
+        message = grebe_codec.encode(mtype, *args)
+        if grebe_codec.isLarge(message) and not self.large:
+            self.sendInvalidAndDisconnect(MESSAGE_TOO_LARGE)
+            return
+
+        self._transport.write(message)
+
+    def _disconnect(self):
+        self.isDisconnected = True
+        self._transport.close()
+
+
+class Match():
+    """A single game between two players. The counterpart of the game state
+    that server.js keeps in globals."""
+
+    def __init__(self, server, name, p1Username, p2Username, games=1,
+                 alternate=False):
+        self.name = name
+        self.p1Username = p1Username
+        self.p2Username = p2Username
+        self.games = games
+        self.alternate = alternate
+        self.gamesPlayed = 0
+        self.finished = False
+        self.score = {p1Username: 0, p2Username: 0}
+
+        #The players in the current game
+        self.p1 = None
+        self.p2 = None
+        self.spectators = []
+        self._players = {}
+
+        self.game = None
+        self.gameStarted = False
+        self.gameEnded = False
+
+        self._server = server
+        self._turnNumber = 0
+        self._toMove = {'P1': False, 'P2': False}
+        self._moves = {'P1': None, 'P2': None}
+        self._lastMoves = {'P1': None, 'P2': None}
+        self._timer = None
+        self._turnStartTime = None
+        self._startTime = None
+        self._initialState = None
+        self._turns = []
+        self._spectatorQueue = []
+        self._spectatorsLeave = False
+
+    def log(self, message):
+        self._server.log(self, message)
+
+    def gametime(self):
+        return int((time.monotonic() - self._startTime) * 1000)
+
+    def usernameFor(self, role):
+        """The username of the player with `role` in the next or current
+        game. The roles are swapped in every other game with `alternate`."""
+        swapped = self.alternate and self.gamesPlayed % 2 == 1
+        return (self.p1Username if (role == 'P1') != swapped
+                else self.p2Username)
+
+    def roleOf(self, username):
+        for role in ('P1', 'P2'):
+            if username == self.usernameFor(role):
+                return role
+        return 'Spectator'
+
+    def join(self, client, username):
+        if self.awaitsResume(username):
+            self._resume(client, self._players[username])
+            return
+
+        role = self.roleOf(username)
+        if role == 'Spectator':
+            self.spectators.append(client)
+        else:
+            self.log(role + ' logged in')
+            self._players[username] = client
+
+        client.authenticate(self, role)
+        self._startIfReady()
+
+    def isSeated(self, client):
+        return (self._players.get(client.username) is client or
+                client in self.spectators)
+
+    def awaitsResume(self, username):
+        """Whether the player `username` lost its connection during the game
+        and can log in again to take its seat back"""
+        previous = self._players.get(username)
+        return (previous is not None and previous.isDisconnected and
+                self.gameStarted and not self.gameEnded)
+
+    def _resume(self, client, previous):
+        role = previous.role
+        self._players[client.username] = client
+        if previous is self.p1:
+            self.p1 = client
+        else:
+            self.p2 = client
+
+        self.log(role + ' resumed')
+        client.authenticate(self, role)
+        timeleft = self._server.movetime - int(
+                (time.monotonic() - self._turnStartTime) * 1000)
+        client.sendResume(self.game.getState(), self._turnNumber,
+                          self._lastMoves, self._moves[role],
+                          max(0, timeleft))
+
+    def startGame(self):
+        if self.games > 1:
+            self.log('Starting game {} of {}'.format(self.gamesPlayed + 1,
+                                                     self.games))
+        else:
+            self.log('Starting game')
+        self.gameStarted = True
+        self.gameEnded = False
+        self._startTime = time.monotonic()
+        self._turnNumber = 0
+        self._moves = {'P1': None, 'P2': None}
+        self._lastMoves = {'P1': None, 'P2': None}
+        self._turns = []
+
+        self.p1 = self._players[self.usernameFor('P1')]
+        self.p2 = self._players[self.usernameFor('P2')]
+        self.p1.role = 'P1'
+        self.p2.role = 'P2'
+
+        self.game = self._server.Game()
+        self._toMove = self.game.start()
+
+        self._turnNumber += 1
+        self.log('{}: Turn {}'.format(self.gametime(), self._turnNumber))
+
+        initialState = self.game.getState()
+        self._initialState = initialState
+        for client in self._getFairClientList():
+            client.sendGameStart(initialState, self._server.movetime)
+        self._queueForSpectators('START', initialState, self._server.movetime)
+
+        self._startTimer()
+
+    def nextTurn(self):
+        if self.gameEnded:
+            return
+
+        self._toMove = self.game.move(self._moves)
+        self._recordTurn(self._moves)
+
+        if self._toMove is None:
+            self.endGame(self.game.result, self.game.resultReason,
+                         self._moves)
+            return
+
+        self._turnNumber += 1
+        self.log('{}: Turn {}'.format(self.gametime(), self._turnNumber))
+
+        lastMoves = self._moves
+        self._lastMoves = lastMoves
+        self._moves = {'P1': None, 'P2': None}
+
+        for client in self._getFairClientList():
+            client.sendNextTurn(lastMoves)
+        self._queueForSpectators('NEXT', lastMoves['P1'], lastMoves['P2'])
+
+        self._startTimer()
+
+    def endGame(self, result, reason, moves):
+        if self.gameEnded:
+            return
+        self.gameEnded = True
+        self._cancelTimer()
+        self.log('{}: Result {} ({})'.format(self.gametime(), result, reason))
+
+        if self.gameStarted and self._server.recorder is not None:
+            if len(self._turns) < self._turnNumber:
+                self._recordTurn(moves)
+            self._server.recorder.write(GameRecord(
+                    self.usernameFor('P1'), self.usernameFor('P2'),
+                    self._server.movetime,
+                    self._initialState, self._turns, result, reason))
+
+        self._addToScore(result)
+        self.gamesPlayed += 1
+        self.finished = self.gamesPlayed >= self.games
+
+        for client in self._getFairClientList():
+            if client is None:
+                continue
+            if client.session and not self.finished:
+                client.sendGameEnd(result, reason, moves)
+            else:
+                client.sendGameEndAndDisconnect(result, reason, moves)
+                self._unseat(client)
+        #Read when the queue is flushed, which only happens with spectators
+        self._spectatorsLeave = bool(self.spectators)
+        self._queueForSpectators('END', result, reason,
+                                 moves['P1'], moves['P2'])
+
+        if self.finished:
+            if self.games > 1:
+                self.log('Score: {} {:g} - {:g} {}'.format(
+                        self.p1Username, self.score[self.p1Username],
+                        self.score[self.p2Username], self.p2Username))
+            self._server.handleMatchEnd(self)
+        else:
+            self.gameStarted = False
+            asyncio.get_running_loop().call_soon(self._startIfReady)
+
+    def _addToScore(self, result):
+        points = {'1-0': (1, 0), '0-1': (0, 1), '1/2-1/2': (0.5, 0.5)}
+        if result in points:
+            self.score[self.usernameFor('P1')] += points[result][0]
+            self.score[self.usernameFor('P2')] += points[result][1]
+
+    def _startIfReady(self):
+        first = self._players.get(self.usernameFor('P1'))
+        second = self._players.get(self.usernameFor('P2'))
+        if (first is not None and not first.isDisconnected and
+            second is not None and not second.isDisconnected and
+            not self.gameStarted and not self.finished):
+            self.startGame()
+
+    def _removePlayer(self, client):
+        if self._players.get(client.username) is client:
+            del self._players[client.username]
+        elif client in self.spectators:
+            self.spectators.remove(client)
+
+    def _unseat(self, client):
+        """Removes a client that left between games so its user can log in
+        again for the next game"""
+
+        if self.finished:
+            return
+        self._removePlayer(client)
+        self._server.handleLogOut(client)
+
+    def _recordTurn(self, moves):
+        if self._server.recorder is not None:
+            self._turns.append(Turn(self.gametime(), moves['P1'], moves['P2']))
+
+    def _startTimer(self):
+        self._cancelTimer()
+        self._turnStartTime = time.monotonic()
+        self._timer = asyncio.get_running_loop().call_later(
+                self._server.movetime / 1000, self._timeout)
+
+    def _cancelTimer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _timeout(self):
+        self._timer = None
+        if self.gameEnded:
+            return
+
+        #Players that haven't resumed in time
+        for client in (self.p1, self.p2):
+            if client.isDisconnected:
+                self.endGame(self._lossFor(client),
+                             client.role + ' disconnected', self._moves)
+                return
+
+        p1Disqualified = self._toMove['P1'] and self._moves['P1'] is None
+        p2Disqualified = self._toMove['P2'] and self._moves['P2'] is None
+
+        if p1Disqualified and p2Disqualified:
+            self.endGame('1/2-1/2', 'Both players exceeded move time limit',
+                         self._moves)
+        elif p1Disqualified:
+            self.endGame('0-1', 'P1 exceeded move time limit', self._moves)
+        elif p2Disqualified:
+            self.endGame('1-0', 'P2 exceeded move time limit', self._moves)
+        else:
+            raise RuntimeError('timeout ran but no one was disqualified.')
+
+    def _getFairClientList(self):
+        if random.getrandbits(1):
+            result = [self.p1, self.p2]
+        else:
+            result = [self.p2, self.p1]
+
+        return result
+
+    def _queueForSpectators(self, mtype, *args):
+        """Messages to spectators are encoded once and sent after the
+        players have been sent theirs, batched with any others queued before
+        the event loop runs again."""
+
+        if not self.spectators:
+            return
+
+        if not self._spectatorQueue:
+            asyncio.get_running_loop().call_soon(self._flushSpectatorQueue)
+        self._spectatorQueue.append(grebe_codec.encode(mtype, *args))
+
+    def _flushSpectatorQueue(self):
+        large = any(grebe_codec.isLarge(message)
+                    for message in self._spectatorQueue)
+        data = b''.join(self._spectatorQueue)
+        self._spectatorQueue = []
+        leave = self._spectatorsLeave
+        self._spectatorsLeave = False
+
+        for spectator in list(self.spectators):
+            if spectator.pendingBytes() > SPECTATOR_BUFFER_LIMIT:
+                spectator.disconnect()
+                continue
+
+            spectator.sendEncoded(data, large)
+            if leave and (self.finished or not spectator.session):
+                spectator.disconnect()
+                self._unseat(spectator)
+
+    def _lossFor(self, client):
+        return '0-1' if client is self.p1 else '1-0'
+
+    def handleDisconnect(self, client):
+        if self.finished:
+            return
+
+        if not self.gameStarted:
+            self._removePlayer(client)
+            return
+
+        if client is self.p1 or client is self.p2:
+            #The seat is kept until the turn's move time runs out
+            if client.resume:
+                return
+            self.endGame(self._lossFor(client),
+                         client.role + ' disconnected',
+                         self._moves)
+        elif client in self.spectators:
+            self.spectators.remove(client)
+
+    def handleMove(self, client, move):
+        if not self.gameStarted:
+            #A move sent as the last game ended
+            if self.gamesPlayed > 0 and client.session:
+                return
+            client.sendInvalidAndDisconnect('Not logged in')
+            return
+
+        if self.gameEnded:
+            return
+
+        role = client.role
+        if role == 'Spectator':
+            client.sendInvalidAndDisconnect('Spectators can not move')
+            return
+
+        self.log('{}: {} {}'.format(self.gametime(), role, move))
+
+        if not self._toMove[role]:
+            self.endGame(self._lossFor(client),
+                         role + ' moved when not allowed to',
+                         self._moves)
+            return
+
+        self._moves[role] = move
+        self._queueForSpectators('MOVED', role, move)
+
+        if ((not self._toMove['P1'] or self._moves['P1'] is not None) and
+            (not self._toMove['P2'] or self._moves['P2'] is not None)):
+            self.nextTurn()
+
+    def handleInvalidMessage(self, client):
+        if self.gameEnded:
+            return
+
+        if client is self.p1 or client is self.p2:
+            self.endGame(self._lossFor(client),
+                         client.role + ' sent an invalid message',
+                         self._moves)
+
+
+class Server():
+    """Routes clients to matches and tracks logged in usernames"""
+
+    def __init__(self, Game, pairings, movetime, quiet=False, recorder=None,
+                 games=1, alternate=False):
+        self.Game = Game
+        self.movetime = movetime
+        self.quiet = quiet
+        self.recorder = recorder
+        self.connections = set()
+
+        self._loggedInUsernames = set()
+        self._matchesByUsername = {}
+        self._matches = []
+        self._unfinished = 0
+        self._finished = None
+
+        for p1Username, p2Username in pairings:
+            for username in (p1Username, p2Username):
+                if username in self._matchesByUsername:
+                    raise ValueError(
+                            'User in more than one match: ' + username)
+
+            match = Match(self, '{} v {}'.format(p1Username, p2Username),
+                          p1Username, p2Username, games, alternate)
+            self._matches.append(match)
+            self._matchesByUsername[p1Username] = match
+            self._matchesByUsername[p2Username] = match
+
+        self._unfinished = len(self._matches)
+
+    def log(self, match, message):
+        if self.quiet:
+            return
+        if len(self._matches) > 1:
+            message = '[' + match.name + '] ' + message
+        print(message, flush=True)
+
+    def handleAuthRequest(self, client, username, password):
+        #TODO: Proper password checking
+
+        if username in self._loggedInUsernames:
+            client.denyAuthentication('User already logged in')
+            return
+
+        match = self._matchesByUsername.get(username)
+        if match is None:
+            if len(self._matches) == 1:
+                match = self._matches[0]
+            else:
+                match = self._matchesByUsername.get(password)
+            if match is None:
+                client.denyAuthentication('Incorrect password')
+                return
+
+        if match.finished:
+            client.denyAuthentication('Incorrect password')
+            return
+
+        #Only clients that can handle RESUME take over a player's seat
+        if match.awaitsResume(username) and not client.resume:
+            client.denyAuthentication('User already logged in')
+            return
+
+        self._loggedInUsernames.add(username)
+        match.join(client, username)
+
+    def handleDisconnect(self, client):
+        match = client.match
+        if match is None or match.finished or not match.isSeated(client):
+            return
+
+        if client.username in self._loggedInUsernames:
+            match.log(client.role + ' disconnected')
+            self._loggedInUsernames.discard(client.username)
+
+        match.handleDisconnect(client)
+
+    def handleLogOut(self, client):
+        self._loggedInUsernames.discard(client.username)
+
+    def handleMatchEnd(self, match):
+        for username in (match.p1Username, match.p2Username):
+            self._loggedInUsernames.discard(username)
+        for client in match.spectators:
+            self._loggedInUsernames.discard(client.username)
+
+        self._unfinished -= 1
+        if self._unfinished == 0 and self._finished is not None:
+            self._finished.set_result(None)
+
+    async def serve(self, port):
+        loop = asyncio.get_running_loop()
+        self._finished = loop.create_future()
+        if self._unfinished == 0:
+            self._finished.set_result(None)
+
+        server = await loop.create_server(
+                lambda: Connection(self), port=port, reuse_address=True)
+        print('Server started', flush=True)
+
+        async with server:
+            await self._finished
+
+        #Let the END messages be flushed before exiting
+        pending = [connection.closed for connection in self.connections]
+        if pending:
+            await asyncio.wait(pending, timeout=1)
+
+
+def loadGameModule(path):
+    if not os.path.isfile(path):
+        raise FileNotFoundError()
+    spec = importlib.util.spec_from_file_location('game', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def readPairings(path):
+    with open(path, newline='') as f:
+        return [tuple(row) for row in csv.reader(f) if row]
+
+def main(args):
+    parser = argparse.ArgumentParser(
+            description='Runs the server for many matches between players.')
+    parser.add_argument('game', metavar='GAME',
+                        help='Path to the game module')
+    parser.add_argument('players', metavar='P1 P2', nargs='*',
+                        help='Usernames of the players in each match')
+    parser.add_argument('--port', default='13579',
+                        help='The port to use')
+    parser.add_argument('--movetime', default='1000',
+                        help='The time limit per move in milliseconds')
+    parser.add_argument('--pairings', metavar='FILE',
+                        help='CSV file with a P1,P2 row for each match')
+    parser.add_argument('--quiet', action='store_true',
+                        help='Only log errors')
+    parser.add_argument('--record', metavar='FILE',
+                        help='Game record archive to append each game to')
+    parser.add_argument('--games', default='1',
+                        help='The number of games in each match')
+    parser.add_argument('--alternate', action='store_true',
+                        help="Swap the players' roles after each game")
+    input = parser.parse_args(args)
+
+    try:
+        port = int(input.port)
+    except ValueError:
+        port = -1
+    if port <= 0 or port > 65535:
+        print('Invalid port')
+        return 1
+
+    try:
+        movetime = int(input.movetime)
+    except ValueError:
+        movetime = -1
+    if movetime <= 0:
+        print('Invalid movetime')
+        return 1
+
+    try:
+        games = int(input.games)
+    except ValueError:
+        games = -1
+    if games <= 0:
+        print('Invalid number of games')
+        return 1
+
+    if len(input.players) % 2:
+        print('Players must be given in pairs')
+        return 1
+
+    pairings = list(zip(input.players[::2], input.players[1::2]))
+    if input.pairings:
+        pairings += readPairings(input.pairings)
+
+    try:
+        Game = loadGameModule(abspath(input.game)).Game
+    except FileNotFoundError:
+        print('Game module not found', file=sys.stderr)
+        return 1
+
+    recorder = RecordWriter(input.record) if input.record else None
+    server = Server(Game, pairings, movetime, input.quiet, recorder, games,
+                    input.alternate)
+
+    try:
+        asyncio.run(server.serve(port))
+    except OSError as error:
+        if error.errno == errno.EADDRINUSE:
+            print('Port already in use', file=sys.stderr)
+            return 1
+        raise
+    finally:
+        if recorder is not None:
+            recorder.close()
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
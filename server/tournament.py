@@ -0,0 +1,270 @@
+#! python3
+"""Runs a tournament between player programs.
+
+Every match gets its own server process on a free port. Matches are run in
+parallel by a process pool. Each player command is run with the username,
+host and port appended as arguments, the same as random_player.py takes.
+
+Results are read from the `Result` line the server logs when it sends END."""
+
+import os
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(dirname(abspath(__file__)), '..'))
+
+import argparse
+import concurrent.futures
+import re
+import shlex
+import socket
+import subprocess
+import time
+
+from collections import namedtuple
+
+HOST = 'localhost'
+
+SERVERS = {
+    'node': ['node', join(proj_root, 'server/server.js')],
+    'python': [sys.executable, join(proj_root, 'server/server.py')],
+}
+
+Player = namedtuple('Player', ['name', 'command'])
+MatchResult = namedtuple('MatchResult',
+                         ['p1', 'p2', 'result', 'reason', 'duration', 'error'])
+
+POINTS = {'1-0': (1, 0), '0-1': (0, 1), '1/2-1/2': (0.5, 0.5)}
+
+_resultRegex = re.compile(r'^\d+: Result (\S+) \((.*)\)$', re.MULTILINE)
+
+def findFreePort():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('', 0))
+        return sock.getsockname()[1]
+
+def runMatch(serverCommand, gamePath, p1, p2, movetime, timeout):
+    """Runs one match and returns its `MatchResult`. Runs in a worker."""
+
+    start = time.perf_counter()
+    for attempt in range(3):
+        port = findFreePort()
+        server = subprocess.Popen(
+                serverCommand + [gamePath, 'A', 'B',
+                                 '--port', str(port),
+                                 '--movetime', str(movetime)],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                universal_newlines=True)
+
+        line = server.stdout.readline()
+        if line == 'Server started\n':
+            break
+
+        stdout, stderr = server.communicate()
+        if 'Port already in use' not in stderr:
+            return MatchResult(p1.name, p2.name, None, None,
+                               time.perf_counter() - start,
+                               (line + stdout + stderr).strip())
+    else:
+        return MatchResult(p1.name, p2.name, None, None,
+                           time.perf_counter() - start,
+                           'No free port found')
+
+    players = []
+    try:
+        for username, player in (('A', p1), ('B', p2)):
+            players.append(subprocess.Popen(
+                    shlex.split(player.command) + [username, HOST, str(port)],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL))
+
+        try:
+            stdout, stderr = server.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            stdout, stderr = server.communicate()
+            return MatchResult(p1.name, p2.name, None, None,
+                               time.perf_counter() - start,
+                               'Match timed out')
+    finally:
+        for process in players:
+            try:
+                process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+    duration = time.perf_counter() - start
+    match = _resultRegex.search(stdout)
+    if match is None:
+        return MatchResult(p1.name, p2.name, None, None, duration,
+                           stderr.strip() or 'No result')
+
+    return MatchResult(p1.name, p2.name, match.group(1), match.group(2),
+                       duration, None)
+
+def roundRobinPairings(players, rounds):
+    """Each player plays each other player as P1 and as P2 `rounds` times"""
+
+    return [(p1, p2)
+            for i in range(rounds)
+            for p1 in players
+            for p2 in players
+            if p1 is not p2]
+
+def swissPairings(players, scores, played):
+    """Pairs players with close scores who haven't played each other.
+
+    If there is an odd number of players, the lowest ranked player without a
+    bye gets one. Returns `(pairings, bye)`."""
+
+    ranked = sorted(players, key=lambda player: -scores[player.name])
+    bye = None
+    if len(ranked) % 2:
+        for player in reversed(ranked):
+            if ('', player.name) not in played:
+                bye = player
+                break
+        else:
+            bye = ranked[-1]
+        ranked.remove(bye)
+
+    pairings = []
+    while ranked:
+        p1 = ranked.pop(0)
+        for i, p2 in enumerate(ranked):
+            if frozenset((p1.name, p2.name)) not in played:
+                break
+        else:
+            i = 0
+        p2 = ranked.pop(i)
+        pairings.append((p1, p2))
+
+    return pairings, bye
+
+class Tournament():
+
+    def __init__(self, players, serverCommand, gamePath, movetime,
+                 timeout, workers):
+        self.players = players
+        self.scores = {player.name: 0 for player in players}
+        self.results = []
+
+        self._serverCommand = serverCommand
+        self._gamePath = gamePath
+        self._movetime = movetime
+        self._timeout = timeout
+        self._executor = concurrent.futures.ProcessPoolExecutor(workers)
+
+    def close(self):
+        self._executor.shutdown()
+
+    def play(self, pairings):
+        futures = [self._executor.submit(runMatch,
+                                         self._serverCommand,
+                                         self._gamePath,
+                                         p1, p2,
+                                         self._movetime,
+                                         self._timeout)
+                   for p1, p2 in pairings]
+
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            self.results.append(result)
+            if result.error is None:
+                p1Points, p2Points = POINTS[result.result]
+                self.scores[result.p1] += p1Points
+                self.scores[result.p2] += p2Points
+            self.report(result)
+
+    def playRoundRobin(self, rounds):
+        self.play(roundRobinPairings(self.players, rounds))
+
+    def playSwiss(self, rounds):
+        played = set()
+        for i in range(rounds):
+            pairings, bye = swissPairings(self.players, self.scores, played)
+            if bye is not None:
+                self.scores[bye.name] += 1
+                played.add(('', bye.name))
+            for p1, p2 in pairings:
+                played.add(frozenset((p1.name, p2.name)))
+            self.play(pairings)
+
+    def report(self, result):
+        if result.error is None:
+            print('{} v {}: {} ({})'.format(
+                result.p1, result.p2, result.result, result.reason))
+        else:
+            print('{} v {}: Error - {}'.format(
+                result.p1, result.p2, result.error))
+
+    def printStandings(self, duration):
+        print()
+        print('Standings')
+        print('---------')
+        for name, score in sorted(self.scores.items(),
+                                  key=lambda item: -item[1]):
+            print('{:>6} {}'.format(score, name))
+
+        errors = sum(1 for result in self.results if result.error)
+        print()
+        print('{} matches ({} errors) in {:0.1f}s, {:0.2f} matches/s'.format(
+            len(self.results), errors, duration,
+            len(self.results) / duration))
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('game', metavar='GAME',
+                        help='Path to the game module')
+    parser.add_argument('commands', metavar='PLAYER', nargs='+',
+                        help='Player command, optionally as NAME=COMMAND')
+    parser.add_argument('--format', choices=('roundrobin', 'swiss'),
+                        default='roundrobin')
+    parser.add_argument('--rounds', type=int, default=1,
+                        help='Round robin cycles or Swiss rounds')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='Number of matches to run in parallel')
+    parser.add_argument('--server', choices=sorted(SERVERS),
+                        default='node')
+    parser.add_argument('--movetime', type=int, default=1000,
+                        help='The time limit per move in milliseconds')
+    parser.add_argument('--timeout', type=float, default=600,
+                        help='Seconds before a match is abandoned')
+    input = parser.parse_args(args)
+
+    players = []
+    for i, command in enumerate(input.commands):
+        name, sep, rest = command.partition('=')
+        if sep and re.fullmatch('[a-zA-Z0-9 ]+', name):
+            players.append(Player(name, rest))
+        else:
+            players.append(Player('Player{}'.format(i + 1), command))
+
+    if len(players) < 2:
+        print('At least two players are needed', file=sys.stderr)
+        return 1
+
+    tournament = Tournament(players,
+                            SERVERS[input.server],
+                            abspath(input.game),
+                            input.movetime,
+                            input.timeout,
+                            input.workers)
+    start = time.perf_counter()
+    try:
+        if input.format == 'swiss':
+            tournament.playSwiss(input.rounds)
+        else:
+            tournament.playRoundRobin(input.rounds)
+    finally:
+        tournament.close()
+
+    tournament.printStandings(time.perf_counter() - start)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
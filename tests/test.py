@@ -1,6 +1,10 @@
 #!python3
 #This module contains integration tests for both the Python client and server.
 #Protocol details are tested using private methods of the client
+#
+#The tests are run in parallel, each with its own server on a free port.
+#Pass --python-server to run the tests against server/server.py instead of
+#server/server.js. Run with --help for other options.
 
 import os
 import sys
@@ -14,12 +18,17 @@ def rel(path):
 sys.path.append(rel('clients/Python'))
 sys.path.append(rel('samples/tictactoe/clients/Python'))
 
+import argparse
+import asyncio
+import concurrent.futures
 import locale
 import queue
 import subprocess
 import random
 import re
+import shutil
 import socket
+import tempfile
 import threading
 import time
 import unittest
@@ -29,19 +38,27 @@ from itertools import zip_longest
 from threading import Thread, current_thread
 from traceback import format_exc
 
-from grebe import (Client, 
+from grebe import (AsyncSpectatorClient,
+                   Client, 
                    GameEnd, 
                    InvalidMessageSent, 
                    ClientAlreadyLoggedIn, 
                    UserAlreadyLoggedIn)
 
-from tictactoe import TicTacToe
+from tictactoe import (TicTacToe, AsyncTicTacToe)
 
 HOST = 'localhost'
 PORT = 13579
 
-server_script_path = rel('server/server.js')
-tictactoe_path = rel('samples/tictactoe/server/game.js')
+if '--python-server' in sys.argv:
+    server_command = [sys.executable, rel('server/server.py')]
+    game_module_ext = '.py'
+else:
+    server_command = ['node.exe' if sys.platform == 'win32' else 'node',
+                      rel('server/server.js')]
+    game_module_ext = '.js'
+
+tictactoe_path = rel('samples/tictactoe/server/game' + game_module_ext)
 
 def assertEqual(actual, expected):
     if actual != expected:
@@ -62,31 +79,48 @@ TestResult = namedtuple('TestResult', ['passed', 'error'])
 TestRunResult = namedtuple('TestRunResult', 
                            ['passed', 'error', 'stdout', 'stderr'])
 
+_usedPorts = set()
+_usedPortsLock = threading.Lock()
+
+def findFreePort():
+    """Returns a free port that hasn't been given to another test"""
+    with _usedPortsLock:
+        while True:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+                sock.bind(('', 0))
+                port = sock.getsockname()[1]
+            if port not in _usedPorts:
+                _usedPorts.add(port)
+                return port
+
 class TestBase:
     def __init__(self):
-        self.__serverArgs = ['node.exe',  server_script_path, tictactoe_path,
-                             'A', 'B', '--port', None]
-        self.serverPort = random.randint(49152, 65535)
+        self.__serverArgs = server_command + [tictactoe_path,
+                                              'A', 'B', '--port', None]
+        self.serverPort = findFreePort()
         self.cwd = rel('.')
 
     @property
     def serverPort(self):
-        return int(self.__serverArgs[6])
+        return int(self.__serverArgs[-1])
 
     @serverPort.setter
     def serverPort(self, value):
-        self.__serverArgs[6] = str(value)
+        self.__serverArgs[-1] = str(value)
 
     @property
     def gameModulePath(self):
-        return int(self.__serverArgs[2])
+        return self.__serverArgs[len(server_command)]
 
     @gameModulePath.setter
     def gameModulePath(self, value):
-        self.__serverArgs[2] = str(value)
+        self.__serverArgs[len(server_command)] = str(value)
 
     def addOption(self, name, value):
-        self.__serverArgs += ('--' + name, value)
+        self.__serverArgs[-2:-2] = ('--' + name, value)
+
+    def addFlag(self, name):
+        self.__serverArgs[-2:-2] = ('--' + name,)
 
     def run(self, _test=lambda: TestResult(True, None)):
         result = None
@@ -94,12 +128,16 @@ class TestBase:
         server = None
         stdout = None
         stderr = None
+        firstLine = b''
         try:
             server = subprocess.Popen(self.__serverArgs, 
                                       cwd=self.cwd,
                                       stdout=subprocess.PIPE,
                                       stderr=subprocess.PIPE)
 
+            #Wait until the server is listening or has exited
+            firstLine = server.stdout.readline()
+
             result = _test()
         except:
             result = TestResult(False, format_exc())
@@ -111,6 +149,7 @@ class TestBase:
                 except subprocess.TimeoutExpired:
                     server.kill()
                     stdout, stderr = server.communicate()
+                stdout = firstLine + stdout
 
         encoding = locale.getpreferredencoding()
         stdout = stdout.decode(encoding) if stdout is not None else None
@@ -230,7 +269,7 @@ class ServerPortInUse(TestBase):
 class GameModuleNotFound(TestBase):
     def __init__(self):
         super().__init__()
-        self.gameModulePath = 'missing_module.js'
+        self.gameModulePath = 'missing_module' + game_module_ext
 
     def checkServerOutput(self, stdout, stderr):
         assertEqual(stdout, '')
@@ -242,7 +281,7 @@ class GameModulePathRelativeToCwd(TestBase):
     def __init__(self):
         super().__init__()
         self.cwd = rel('samples')
-        self.gameModulePath = 'tictactoe/server/game.js'
+        self.gameModulePath = 'tictactoe/server/game' + game_module_ext
 
     def checkServerOutput(self, stdout, stderr):
         assertEqual(stdout, 'Server started\n')
@@ -461,6 +500,81 @@ class P2ExceedsTimeLimit(InGameTestBase):
         except GameEnd:
             pass
 
+class BothExceedTimeLimit(InGameTestBase):
+    """Both players are to move in a game of simultaneous moves and neither
+    moves in time"""
+
+    _GAME_MODULES = {
+        '.py': '''
+class Game():
+    def __init__(self):
+        self.result = None
+        self.resultReason = None
+
+    def getState(self):
+        return ''
+
+    def start(self):
+        return {'P1': True, 'P2': True}
+
+    def move(self, moves):
+        return {'P1': True, 'P2': True}
+''',
+        '.js': '''
+"use strict";
+
+function Game() {
+  this.result = null;
+  this.resultReason = null;
+}
+
+Game.prototype.getState = function getState() {
+  return '';
+};
+
+Game.prototype.start = function start() {
+  return {P1: true, P2: true};
+};
+
+Game.prototype.move = function move(moves) {
+  return {P1: true, P2: true};
+};
+
+exports.Game = Game;
+''',
+    }
+
+    def __init__(self):
+        super().__init__()
+        self._directory = tempfile.mkdtemp()
+        self.gameModulePath = join(self._directory,
+                                   'simultaneous' + game_module_ext)
+        with open(self.gameModulePath, 'w') as f:
+            f.write(self._GAME_MODULES[game_module_ext])
+        self.addOption('movetime', '100')
+
+    def run(self):
+        try:
+            return super().run()
+        finally:
+            shutil.rmtree(self._directory)
+
+    def p1InGameRun(self, client):
+        self.waitForDraw(client)
+
+    def p2InGameRun(self, client):
+        self.waitForDraw(client)
+
+    def waitForDraw(self, client):
+        try:
+            client.waitForNextTurn()
+            raise AssertionError('Game did not end')
+
+        except GameEnd as gameEnd:
+            assertEqual(gameEnd.result, '1/2-1/2')
+            assertEqual(gameEnd.reason,
+                        'Both players exceeded move time limit')
+
 class P1Disconnects(InGameTestBase):
     def p1InGameRun(self, client):
         client._sock.close()
@@ -646,7 +760,203 @@ class TicToeClientSampleGame(ClientTestBase):
             pass
 
 
-start = time.clock()
+class AsyncTicTacToeSampleGame(TestBase):
+    """Plays both sides of a game from one event loop"""
+
+    def run(self):
+        return super().run(_test=self.__run)
+
+    def __run(self):
+        asyncio.run(self.__play())
+        return TestResult(True, None)
+
+    async def __play(self):
+        p1 = AsyncTicTacToe('localhost', self.serverPort)
+        p2 = AsyncTicTacToe('localhost', self.serverPort)
+        try:
+            await asyncio.gather(self.p1Run(p1), self.p2Run(p2))
+        finally:
+            p1.close()
+            p2.close()
+
+    async def p1Run(self, client):
+        try:
+            role, state, movetime = await client.login('A', '')
+            assertEqual(role, 'P1')
+            assertEqual(state, (('.', '.', '.'), 
+                                ('.', '.', '.'),
+                                ('.', '.', '.')))
+
+            p1move, p2move = await client.move(2, 2)
+            assertEqual(p1move, (2, 2))
+            assertEqual(p2move, None)
+
+            await client.waitForNextTurn()
+            await client.move(1, 3)
+            await client.waitForNextTurn()
+            await client.move(1, 1)
+            await client.waitForNextTurn()
+            await client.move(3, 3)
+
+        except GameEnd as gameEnd:
+            assertEqual(gameEnd.reason, 'Three in a row')
+            assertEqual(gameEnd.result, '1-0')
+            assertEqual(gameEnd.p1Move, (3, 3))
+            assertEqual(gameEnd.p2Move, None)
+
+    async def p2Run(self, client):
+        try:
+            await client.login('B', '')
+
+            await client.waitForNextTurn()
+            await client.move(3, 1)
+            await client.waitForNextTurn()
+            await client.move(2, 1)
+            await client.waitForNextTurn()
+            await client.move(1, 2)
+            await client.waitForNextTurn()
+
+        except GameEnd as gameEnd:
+            pass
+
+
+class SpectatorSampleGame(AsyncTicTacToeSampleGame):
+    """Plays the sample game with a spectator watching"""
+
+    def run(self):
+        return TestBase.run(self, _test=self.__run)
+
+    def __run(self):
+        asyncio.run(self.__play())
+        return TestResult(True, None)
+
+    async def __play(self):
+        spectator = AsyncSpectatorClient('localhost', self.serverPort)
+        p1 = AsyncTicTacToe('localhost', self.serverPort)
+        p2 = AsyncTicTacToe('localhost', self.serverPort)
+        try:
+            assertEqual(await spectator.login('S', ''), 'Spectator')
+            events, _, _ = await asyncio.gather(
+                    self.watch(spectator), self.p1Run(p1), self.p2Run(p2))
+        finally:
+            spectator.close()
+            p1.close()
+            p2.close()
+
+        assertEqual(events, [
+            ('START', ('...\n...\n...', 1)),
+            ('MOVED', ('P1', '2,2')),
+            ('NEXT', ('2,2', '')),
+            ('MOVED', ('P2', '3,1')),
+            ('NEXT', ('', '3,1')),
+            ('MOVED', ('P1', '1,3')),
+            ('NEXT', ('1,3', '')),
+            ('MOVED', ('P2', '2,1')),
+            ('NEXT', ('', '2,1')),
+            ('MOVED', ('P1', '1,1')),
+            ('NEXT', ('1,1', '')),
+            ('MOVED', ('P2', '1,2')),
+            ('NEXT', ('', '1,2')),
+            ('MOVED', ('P1', '3,3')),
+            ('END', ('1-0', 'Three in a row', '3,3', ''))])
+
+    async def watch(self, spectator):
+        return [event async for event in spectator.events()]
+
+
+class AlternatingSeries(ClientTestBase):
+    """Plays a two game session series with the roles swapped after the
+    first game, P1 winning both games"""
+
+    _P1MOVES = ['2,2', '1,3', '1,1', '3,3']
+    _P2MOVES = ['3,1', '2,1', '1,2']
+
+    def __init__(self):
+        super().__init__()
+        self.addOption('games', '2')
+        self.addFlag('alternate')
+
+    def play(self, client, username):
+        roles = []
+        for role, _, _ in client.games(username, ''):
+            roles.append(role)
+            moves = list(self._P1MOVES if role == 'P1' else self._P2MOVES)
+            try:
+                if role == 'P2':
+                    client.waitForNextTurn()
+                while True:
+                    client.move(moves.pop(0))
+                    client.waitForNextTurn()
+            except GameEnd as gameEnd:
+                assertEqual(gameEnd.result, '1-0')
+        return roles
+
+    def p1Run(self, client):
+        assertEqual(self.play(client, 'A'), ['P1', 'P2'])
+
+    def p2Run(self, client):
+        assertEqual(self.play(client, 'B'), ['P2', 'P1'])
+
+    def checkServerOutput(self, stdout, stderr):
+        assertEqual(stderr, '')
+        if not re.search('Score: A 1 - 1 B', stdout):
+            raise AssertionError('No score in {!r}'.format(stdout))
+
+
+class P1ResumesAfterDisconnect(ClientTestBase):
+    """P1 loses its connection while P2 is to move and logs in again"""
+
+    def __init__(self):
+        super().__init__()
+        self._clientFunc = lambda host, port: TicTacToe(host, port,
+                                                        reconnect=True)
+        self._dropped = threading.Event()
+
+    def p1Run(self, client):
+        try:
+            client.login('A', '')
+            client.move(2, 2)
+
+            client._sock.shutdown(socket.SHUT_RDWR)
+            self._dropped.set()
+            #P2 moves before P1 is back, so the turn is missed
+            time.sleep(0.2)
+            assertEqual(client.waitForNextTurn(), (None, (3, 1)))
+            assertEqual(len(list(client.position.legalMoves())), 7)
+
+            client.move(1, 3)
+            client.waitForNextTurn()
+            client.move(1, 1)
+            client.waitForNextTurn()
+            client.move(3, 3)
+
+        except GameEnd as gameEnd:
+            assertEqual(gameEnd.result, '1-0')
+            assertEqual(gameEnd.reason, 'Three in a row')
+
+    def p2Run(self, client):
+        try:
+            client.login('B', '')
+            client.waitForNextTurn()
+
+            self._dropped.wait()
+            time.sleep(0.05)
+            client.move(3, 1)
+            client.waitForNextTurn()
+            client.move(2, 1)
+            client.waitForNextTurn()
+            client.move(1, 2)
+            client.waitForNextTurn()
+
+        except GameEnd as gameEnd:
+            assertEqual(gameEnd.result, '1-0')
+
+    def checkServerOutput(self, stdout, stderr):
+        assertEqual(stderr, '')
+        for line in ('P1 disconnected', 'P1 resumed'):
+            if line not in stdout.splitlines():
+                raise AssertionError('No {!r} in {!r}'.format(line, stdout))
+
 
 tests = [ServerPortInUse, 
          GameModuleNotFound,
@@ -662,6 +972,7 @@ tests = [ServerPortInUse,
          P2MovesWhenNotHisTurn, 
          P1ExceedsTimeLimit,         
          P2ExceedsTimeLimit,         
+         BothExceedTimeLimit,
          P1Disconnects,
          P2Disconnects,
          MoveReturnValues,
@@ -669,24 +980,18 @@ tests = [ServerPortInUse,
          WaitForNextTurnReturnValues,
          SampleGame1,
          TicToeClientSampleGame,
+         AsyncTicTacToeSampleGame,
+         SpectatorSampleGame,
+         AlternatingSeries,
+         P1ResumesAfterDisconnect,
          ]
 
-numTestsRun = 0
-failure = None
-for test in tests:
-    instance = test()
-    result = instance.run()
-    numTestsRun += 1
-    if result[0]:
-        print('.', end='', flush=True)
-    else:
-        print('F', end='', flush=True)
-        failure = (test.__name__, result[1], result[2], result[3])
-        break
-
-if failure:
-    name, error, stdout, stderr = failure
-    print()
+def runTest(test):
+    start = time.perf_counter()
+    result = test().run()
+    return test, result, time.perf_counter() - start
+
+def printFailure(name, error, stdout, stderr):
     print(80 * '=')
     print('FAIL: {}'.format(name))
     print(80 * '-')
@@ -707,12 +1012,65 @@ if failure:
     print(stderr, end='')
     print()
 
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('names', metavar='TEST', nargs='*',
+                        help='Names of the tests to run. All by default.')
+    parser.add_argument('--python-server', action='store_true',
+                        help='Test server/server.py instead of server.js')
+    parser.add_argument('--workers', type=int, default=len(tests),
+                        help='Number of tests to run at once')
+    parser.add_argument('--timings', action='store_true',
+                        help='Show how long each test took')
+    input = parser.parse_args(args)
+
+    selected = tests
+    if input.names:
+        byName = {test.__name__: test for test in tests}
+        unknown = [name for name in input.names if name not in byName]
+        if unknown:
+            parser.error('Unknown tests: ' + ', '.join(unknown))
+        selected = [byName[name] for name in input.names]
+
+    start = time.perf_counter()
+
+    results = []
+    with concurrent.futures.ThreadPoolExecutor(input.workers) as executor:
+        futures = [executor.submit(runTest, test) for test in selected]
+        for future in concurrent.futures.as_completed(futures):
+            test, result, testDuration = future.result()
+            results.append((test, result, testDuration))
+            print('.' if result.passed else 'F', end='', flush=True)
+
+    duration = time.perf_counter() - start
+
+    #Report in the order the tests are listed
+    results.sort(key=lambda item: selected.index(item[0]))
+
+    print()
+    failures = [(test, result) for test, result, _ in results 
+                if not result.passed]
+    for test, result in failures:
+        printFailure(test.__name__, result.error, result.stdout, 
+                     result.stderr)
+
+    if input.timings:
+        print(80 * '-')
+        for test, result, testDuration in results:
+            print('{:<32} {:>6.2f}s {}'.format(
+                test.__name__, testDuration, 
+                'ok' if result.passed else 'FAIL'))
+
+    print()
+    print(80 * '-')
+    print('Ran {} tests in {:0.1f}s'.format(len(results), duration))
+    if failures:
+        print('FAILED (failures={})'.format(len(failures)))
+    print()
 
-duration = time.clock() - start
+    return 1 if failures else 0
 
-print()
-print(80 * '-')
-print('Ran {} tests in {:0.1f}s'.format(numTestsRun, duration))
-print()
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
 
 #TODO: Test this log-in error when client is already logged in
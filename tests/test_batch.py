@@ -0,0 +1,124 @@
+#!python3
+#Checks the batch simulator against the tic-tac-toe game modules
+
+import os
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(abspath(dirname(__file__)), '..'))
+sys.path.append(join(proj_root, 'samples/tictactoe/server'))
+
+import json
+import random
+import shutil
+import subprocess
+import unittest
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import game
+
+if np is not None:
+    import batch
+
+GAME_JS = join(proj_root, 'samples/tictactoe/server/game.js')
+
+def randomMove(rng):
+    roll = rng.random()
+    if roll < 0.02:
+        return rng.choice(['0,1', '2,4', '22', '', '1,2,3'])
+    return '{},{}'.format(rng.randint(1, 3), rng.randint(1, 3))
+
+def randomTurns(rng):
+    """Turns that include invalid moves, moves on occupied cells and moves
+    by the player not to move"""
+
+    turns = []
+    for moveNumber in range(9):
+        move = randomMove(rng)
+        other = randomMove(rng) if rng.random() < 0.01 else None
+        if moveNumber % 2 == 0:
+            turns.append((move, other))
+        else:
+            turns.append((other, move))
+    return turns
+
+def playPython(turns, board=None):
+    instance = game.TicTacToe(board)
+    instance.start()
+    for p1Move, p2Move in turns:
+        if instance.move({'P1': p1Move, 'P2': p2Move}) is None:
+            break
+    return instance.result, instance.resultReason, instance.getState()
+
+def playJS(games):
+    script = (
+        'var Game = require(process.argv[1]).Game;' +
+        'var games = JSON.parse(require("fs").readFileSync(0, "utf8"));' +
+        'console.log(JSON.stringify(games.map(function(turns) {' +
+        '  var game = new Game(); game.start();' +
+        '  for (var i = 0; i < turns.length; i++) {' +
+        '    if (game.move({P1: turns[i][0], P2: turns[i][1]}) === null) {' +
+        '      break;' +
+        '    }' +
+        '  }' +
+        '  return [game.result, game.resultReason, game.getState()];' +
+        '})));')
+    output = subprocess.check_output(['node', '-e', script, GAME_JS],
+                                     input=json.dumps(games),
+                                     universal_newlines=True)
+    return [tuple(result) for result in json.loads(output)]
+
+def playBatch(games, boards=None):
+    simulator = batch.BatchTicTacToe(len(games), boards)
+    for turn in range(9):
+        p1Moves = [batch.cellOfMove(turns[turn][0]) for turns in games]
+        p2Moves = [batch.cellOfMove(turns[turn][1]) for turns in games]
+        simulator.move(p1Moves, p2Moves)
+    return [simulator.resultOf(i) + (simulator.getState(i),)
+            for i in range(len(games))]
+
+@unittest.skipIf(np is None, 'NumPy is not installed')
+class BatchTests(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(1)
+        self.games = [randomTurns(rng) for i in range(2000)]
+
+    def testMatchesPythonGame(self):
+        expected = [playPython(turns) for turns in self.games]
+        self.assertEqual(playBatch(self.games), expected)
+
+    @unittest.skipIf(shutil.which('node') is None, 'Node.js is not installed')
+    def testMatchesJSGame(self):
+        self.assertEqual(playBatch(self.games), playJS(self.games))
+
+    def testStartingBoards(self):
+        boards = ['XX.\nOO.\n...', 'XOX\nXOO\nOX.', 'XXX\nOO.\n...']
+        games = [[('1,3', None)] + [(None, None)] * 8,
+                 [('3,3', None)] + [(None, None)] * 8,
+                 [(None, '1,1')] + [(None, None)] * 8]
+        expected = [playPython(turns, board)
+                    for turns, board in zip(games, boards[:2])]
+        results = playBatch(games, boards)
+
+        self.assertEqual(results[:2], expected)
+        self.assertEqual(results[2][:2], ('1-0', 'Three in a row'))
+
+    def testPlayRandomPolicies(self):
+        rng = np.random.default_rng(1)
+        simulator = batch.BatchTicTacToe(10000)
+        policy = batch.randomPolicy(rng)
+        simulator.play(policy, policy)
+
+        self.assertFalse(simulator.active.any())
+        self.assertNotIn(batch.INVALID_MOVE, simulator.reason)
+        p1Wins, p2Wins, draws = simulator.scores()
+        self.assertEqual(p1Wins + p2Wins + draws, 10000)
+        self.assertGreater(p1Wins, p2Wins)
+
+if __name__ == '__main__':
+    unittest.main()
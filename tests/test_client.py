@@ -0,0 +1,675 @@
+#!python3
+#Unit tests for grebe.Client that use a socket pair in place of a server
+
+import os
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(abspath(dirname(__file__)), '..'))
+sys.path.append(join(proj_root, 'clients/Python'))
+
+import random
+import socket
+import struct
+import threading
+import time
+import unittest
+
+import grebe_codec
+
+from grebe import (MAX_LARGE_BODY_SIZE, Client, Deadline, FrameReader, GameEnd,
+                   Instruments, InvalidMessageFormat, NoMoveFound,
+                   NotASpectator, Ponderer, SpectatorClient, sendFrames)
+from grebe_host import (Host, Strategy)
+from grebe_loopback import (LoopbackServer, ScriptedServer,
+                            TranscriptMismatch, parseTranscript)
+
+class SocketPairTestBase(unittest.TestCase):
+    def setUp(self):
+        self.client = Client('localhost', 0)
+        self.client._sock, self.server = socket.socketpair()
+        self.client._reader = FrameReader(self.client._sock)
+        self.serverReader = FrameReader(self.server)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+
+    def serverSend(self, mtype, *args):
+        self.server.sendall(grebe_codec.encode(mtype, *args))
+
+    def serverRecv(self):
+        return grebe_codec.decode(str(self.serverReader.read(), 'utf-8'))
+
+    def start(self, movetime):
+        self.serverSend('START', '...', str(movetime))
+        self.client._waitForStart()
+
+
+class DeadlineTests(SocketPairTestBase):
+    def testDeadlineAfterStart(self):
+        self.start(1000)
+        deadline = self.client.deadline()
+        self.assertAlmostEqual(deadline.expires,
+                               self.client._receivedAt + 1 - 
+                               self.client.safetyMargin)
+        self.assertFalse(deadline.expired)
+
+    def testLatencyIsSubtracted(self):
+        self.start(1000)
+        self.serverSend('NEXT', 'a', '')
+        self.client.move('a')
+        self.assertEqual(self.serverRecv(), ('MOVE', ['a']))
+
+        latency = self.client.latency
+        self.assertGreater(latency, 0)
+        self.assertLessEqual(self.client.deadline().expires, 
+                             self.client._receivedAt + 1 - latency)
+
+    def testMoveBeforeDeadlineSendsBestMove(self):
+        self.start(100)
+
+        def search(deadline):
+            i = 0
+            while not deadline.expired:
+                i += 1
+                deadline.offer(str(i))
+                time.sleep(0.001)
+
+        expires = self.client.deadline().expires
+        self.serverSend('NEXT', '', '')
+        self.client.moveBeforeDeadline(search)
+        sent = time.monotonic()
+
+        mtype, margs = self.serverRecv()
+        self.assertEqual(mtype, 'MOVE')
+        self.assertGreater(int(margs[0]), 1)
+        self.assertLess(sent, expires + 0.05)
+
+    def testMoveBeforeDeadlineWhenSearchFinishes(self):
+        self.start(60000)
+        self.serverSend('NEXT', '', '')
+        self.client.moveBeforeDeadline(lambda deadline: deadline.offer('x'))
+        self.assertEqual(self.serverRecv(), ('MOVE', ['x']))
+
+    def testNoMoveFound(self):
+        self.start(10)
+        with self.assertRaises(NoMoveFound):
+            self.client.moveBeforeDeadline(lambda deadline: None)
+
+class PondererTests(unittest.TestCase):
+    def setUp(self):
+        self.searched = []
+        self.release = threading.Event()
+
+        def search(key, deadline):
+            self.searched.append(key)
+            deadline.offer(key, 'first')
+            if key == 'slow':
+                while not self.release.is_set():
+                    if deadline.expired:
+                        return
+                    time.sleep(0.001)
+            deadline.offer(key, 'done')
+
+        self.ponderer = Ponderer(search)
+
+    def tearDown(self):
+        self.ponderer.close()
+
+    def waitForSearch(self, key):
+        while key not in self.searched:
+            time.sleep(0.001)
+
+    def testCachedResult(self):
+        self.ponderer.ponder(['a', 'b'])
+        self.waitForSearch('b')
+        time.sleep(0.01)
+        deadline = Deadline(time.monotonic() + 1)
+        self.assertEqual(self.ponderer.take('b', deadline), ('b', 'done'))
+
+    def testUnpredictedKey(self):
+        self.ponderer.ponder(['a'])
+        self.waitForSearch('a')
+        deadline = Deadline(time.monotonic() + 1)
+        self.assertIsNone(self.ponderer.take('c', deadline))
+
+    def testSearchInProgressContinues(self):
+        self.ponderer.ponder(['slow', 'other'])
+        self.waitForSearch('slow')
+        threading.Timer(0.02, self.release.set).start()
+
+        deadline = Deadline(time.monotonic() + 5)
+        self.assertEqual(self.ponderer.take('slow', deadline), 
+                         ('slow', 'done'))
+        self.assertNotIn('other', self.searched)
+
+    def testSearchInProgressStopsAtDeadline(self):
+        self.ponderer.ponder(['slow'])
+        self.waitForSearch('slow')
+
+        deadline = Deadline(time.monotonic() + 0.02)
+        self.assertEqual(self.ponderer.take('slow', deadline), 
+                         ('slow', 'first'))
+        self.assertTrue(deadline.expired)
+
+SAMPLE_GAME_P1 = parseTranscript(r"""
+    > LOGIN:A,
+    < LOGIN/SUCCESS:P1
+    < START:"...\n...\n...",1000
+    > MOVE:"2,2"
+    < NEXT:,"3,1"
+    > MOVE:"1,3"
+    < NEXT:,"2,1"
+    > MOVE:"1,1"
+    < NEXT:,"1,2"
+    > MOVE:"3,3"
+    < END:1-0,Three in a row,"3,3",
+""")
+
+class PartialSocket():
+    """Accepts at most `limit` bytes per call"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.data = bytearray()
+        self.calls = 0
+
+    def sendmsg(self, buffers):
+        self.calls += 1
+        data = b''.join(buffers)[:self.limit]
+        self.data += data
+        return len(data)
+
+
+class ChunkedSocket():
+    """Returns `data` from `recv_into` at most `limit` bytes per call"""
+
+    def __init__(self, data, limit):
+        self.data = data
+        self.limit = limit
+        self.position = 0
+
+    def recv_into(self, buffer):
+        count = min(len(buffer), self.limit, len(self.data) - self.position)
+        buffer[:count] = self.data[self.position:self.position + count]
+        self.position += count
+        return count
+
+class FrameReaderTests(unittest.TestCase):
+    BURST = (grebe_codec.encode('NEXT', '2,2', '') +
+             grebe_codec.encode('NEXT', '', '3,1') +
+             grebe_codec.encode('END', '1-0', 'Three in a row', '3,3', ''))
+
+    def readAll(self, limit, bursts=1000):
+        reader = FrameReader(ChunkedSocket(self.BURST * bursts, limit))
+        bodies = [str(reader.read(), 'utf-8') for i in range(3 * bursts)]
+        self.assertEqual(bodies, [
+            'NEXT:"2,2",\r\n',
+            'NEXT:,"3,1"\r\n',
+            'END:1-0,Three in a row,"3,3",\r\n'] * bursts)
+
+    def testFragmented(self):
+        #Every frame is split across several recv_into calls
+        for limit in (1, 2, 7):
+            with self.subTest(limit=limit):
+                self.readAll(limit, 100)
+
+    def testCoalesced(self):
+        #Many frames, and parts of frames, arrive in each recv_into call
+        for limit in (len(self.BURST) * 64, 5000, 1 << 20):
+            with self.subTest(limit=limit):
+                self.readAll(limit)
+
+    def testHasFrame(self):
+        reader = FrameReader(ChunkedSocket(self.BURST * 1000, 5000))
+        count = 0
+        while count < 3000:
+            while not reader.hasFrame():
+                reader.fill()
+            reader.read()
+            count += 1
+        self.assertFalse(reader.hasFrame())
+
+class WriteBufferTests(SocketPairTestBase):
+    def testFlush(self):
+        self.client.autoFlush = False
+        self.client._send('MOVE', 'a')
+        self.client._send('MOVE', 'b')
+
+        self.server.setblocking(False)
+        with self.assertRaises(BlockingIOError):
+            self.server.recv(1)
+        self.server.setblocking(True)
+
+        self.client.flush()
+        self.assertEqual(self.serverRecv(), ('MOVE', ['a']))
+        self.assertEqual(self.serverRecv(), ('MOVE', ['b']))
+
+    def testFlushedBeforeWaiting(self):
+        self.start(1000)
+        self.client.autoFlush = False
+
+        def serve():
+            self.serverRecv()
+            self.serverSend('NEXT', 'a', '')
+
+        thread = threading.Thread(target=serve)
+        thread.start()
+        self.assertEqual(self.client.move('a'), ('a', ''))
+        thread.join()
+
+    def testPartialSends(self):
+        frames = [grebe_codec.encode('MOVE', str(i)) for i in range(10)]
+        sock = PartialSocket(7)
+        sendFrames(sock, frames)
+        self.assertEqual(sock.data, b''.join(frames))
+        self.assertGreater(sock.calls, 1)
+
+    def testSingleSendmsg(self):
+        frames = [grebe_codec.encode('MOVE', str(i)) for i in range(10)]
+        sock = PartialSocket(1000)
+        sendFrames(sock, frames)
+        self.assertEqual(sock.data, b''.join(frames))
+        self.assertEqual(sock.calls, 1)
+
+
+class LargeFrameTests(SocketPairTestBase):
+    def setUp(self):
+        super().setUp()
+        self.client._reader.largeFrames = True
+
+    def testLargeStart(self):
+        state = ''.join(random.choice('.#') for i in range(1 << 20))
+        thread = threading.Thread(target=self.serverSend,
+                                  args=('START', state, '1000'))
+        thread.start()
+        initialState, movetime = self.client._waitForStart()
+        thread.join()
+        self.assertEqual(initialState, state)
+
+    def testBufferIsReused(self):
+        #Small messages around the large ones come through the usual buffer
+        for size in (5000, 3000):
+            self.serverSend('NEXT', 'a' * size, '')
+            self.serverSend('NEXT', 'b', '')
+            self.assertEqual(self.client.waitForNextTurn(), ('a' * size, ''))
+            self.assertEqual(self.client.waitForNextTurn(), ('b', ''))
+            if size == 5000:
+                buffer = self.client._reader._large
+        self.assertIs(self.client._reader._large, buffer)
+        self.assertFalse(self.client._reader.hasFrame())
+
+    def testNotNegotiated(self):
+        self.client._reader.largeFrames = False
+        self.serverSend('NEXT', 'a' * 1000, '')
+        with self.assertRaises(InvalidMessageFormat):
+            self.client.waitForNextTurn()
+
+    def testFillUntilLargeFrame(self):
+        #Larger than the reader's buffer and received in small chunks
+        state = 'x' * 100000
+        reader = FrameReader(ChunkedSocket(
+                grebe_codec.encode('START', state, 1000) +
+                grebe_codec.encode('NEXT', 'b', ''), 1000))
+        reader.largeFrames = True
+        bodies = []
+        while len(bodies) < 2:
+            while not reader.hasFrame():
+                reader.fill()
+            bodies.append(str(reader.read(), 'utf-8'))
+        self.assertEqual(bodies, ['START:{},1000\r\n'.format(state),
+                                  'NEXT:b,\r\n'])
+
+    def testTooLarge(self):
+        self.server.sendall(struct.pack('!HI', 0, MAX_LARGE_BODY_SIZE + 1))
+        with self.assertRaises(InvalidMessageFormat):
+            self.client.waitForNextTurn()
+
+
+class NoDelayTests(unittest.TestCase):
+    def setUp(self):
+        self.listener = socket.create_server(('localhost', 0))
+        self.port = self.listener.getsockname()[1]
+
+    def tearDown(self):
+        self.listener.close()
+
+    def noDelayOf(self, **kwargs):
+        client = Client('localhost', self.port, **kwargs)
+        client._connect()
+        try:
+            return client._sock.getsockopt(socket.IPPROTO_TCP, 
+                                           socket.TCP_NODELAY)
+        finally:
+            client.close()
+
+    def testDefault(self):
+        self.assertTrue(self.noDelayOf())
+
+    def testDisabled(self):
+        self.assertFalse(self.noDelayOf(noDelay=False))
+
+class LoopbackTests(unittest.TestCase):
+    def testSampleGameTranscript(self):
+        server = ScriptedServer(SAMPLE_GAME_P1)
+        client = Client('localhost', 0, transport=server.connect)
+
+        role, state, movetime = client.login('A', '')
+        self.assertEqual((role, state, movetime), ('P1', '...\n...\n...', 1))
+        self.assertEqual(client.move('2,2'), ('', '3,1'))
+        client.move('1,3')
+        client.move('1,1')
+        with self.assertRaises(GameEnd) as context:
+            client.move('3,3')
+        client.close()
+
+        self.assertEqual(context.exception.result, '1-0')
+        self.assertEqual(context.exception.reason, 'Three in a row')
+        self.assertTrue(server.finished)
+
+    def testUnexpectedMessage(self):
+        server = ScriptedServer(SAMPLE_GAME_P1)
+        client = Client('localhost', 0, transport=server.connect)
+        client.login('A', '')
+        with self.assertRaises(TranscriptMismatch):
+            client.move('1,1')
+        client.close()
+
+    def testParseTranscriptEscapes(self):
+        transcript = parseTranscript(r"""
+            > LOGIN:Zoë,
+            < START:"a\nb\r\\c\t",1000
+        """)
+        self.assertEqual(transcript, [('>', 'LOGIN:Zoë,'),
+                                      ('<', 'START:"a\nb\r\\c\\t",1000')])
+
+    def testServerDisconnect(self):
+        server = ScriptedServer(parseTranscript("""
+            > LOGIN:A,
+            < LOGIN/FAILURE:Username in use
+        """))
+        client = Client('localhost', 0, transport=server.connect)
+        client._connect()
+        client._send('LOGIN', 'A', '')
+        self.assertEqual(client._recv(), ('LOGIN/FAILURE', ['Username in use']))
+        with self.assertRaises(ConnectionError):
+            client._recv()
+        client.close()
+
+    def testEchoServer(self):
+        class EchoServer(LoopbackServer):
+            def handle(self, transport, mtype, margs):
+                self.send(transport, 'NEXT', margs[0], '')
+
+        client = Client('localhost', 0, transport=EchoServer().connect)
+        client._connect()
+        client._loggedIn = True
+        for move in ('1,1', 'a"b', ''):
+            self.assertEqual(client.move(move), (move, ''))
+        client.close()
+
+
+class SpectatorTests(unittest.TestCase):
+    def testEvents(self):
+        server = ScriptedServer(parseTranscript(r"""
+            > LOGIN:S,
+            < LOGIN/SUCCESS:Spectator
+            < START:"...\n...\n...",1000
+            < MOVED:P1,"2,2"
+            < NEXT:"2,2",
+            < MOVED:P2,"3,1"
+            < END:0-1,P1 exceeded move time limit,,"3,1"
+        """))
+        client = SpectatorClient('localhost', 0, transport=server.connect)
+
+        self.assertEqual(list(client.watch('S', '')), [
+            ('START', ('...\n...\n...', 1)),
+            ('MOVED', ('P1', '2,2')),
+            ('NEXT', ('2,2', '')),
+            ('MOVED', ('P2', '3,1')),
+            ('END', ('0-1', 'P1 exceeded move time limit', '', '3,1'))])
+        self.assertTrue(server.finished)
+
+    def testLoggedInAsPlayer(self):
+        server = ScriptedServer(parseTranscript("""
+            > LOGIN:A,
+            < LOGIN/SUCCESS:P1
+        """))
+        client = SpectatorClient('localhost', 0, transport=server.connect)
+        with self.assertRaises(NotASpectator):
+            client.login('A', '')
+
+class SessionTests(unittest.TestCase):
+    def testGames(self):
+        server = ScriptedServer(parseTranscript(r"""
+            > LOGIN:A,,session
+            < LOGIN/SUCCESS:P1,session
+            < START:"...\n...\n...",1000,P1
+            > MOVE:"2,2"
+            < NEXT:"2,2",
+            < NEXT:,"1,1"
+            < END:1-0,Three in a row,"3,3",
+            < START:"...\n...\n...",1000,P2
+            < END:0-1,P1 exceeded move time limit,,
+        """))
+        client = Client('localhost', 0, transport=server.connect)
+
+        games = []
+        for role, initialState, movetime in client.games('A', ''):
+            games.append(role)
+            if role == 'P1':
+                client.move('2,2')
+            #The rest of the first game is skipped
+            elif role == 'P2':
+                with self.assertRaises(GameEnd):
+                    client.waitForNextTurn()
+
+        self.assertEqual(games, ['P1', 'P2'])
+        self.assertTrue(server.finished)
+
+    def testServerWithoutSessions(self):
+        server = ScriptedServer(parseTranscript(r"""
+            > LOGIN:A,,session
+            < LOGIN/SUCCESS:P2,
+            < START:"...\n...\n...",1000
+        """))
+        client = Client('localhost', 0, transport=server.connect)
+
+        self.assertEqual(list(client.games('A', '')),
+                         [('P2', '...\n...\n...', 1.0)])
+        self.assertTrue(server.finished)
+
+class DroppingServer(ScriptedServer):
+    """Drops the connection at the end of its transcript"""
+
+    def _sendReplies(self, transport):
+        super()._sendReplies(transport)
+        if self.finished:
+            self.disconnect(transport)
+
+def connectInTurn(*servers):
+    """A transport that connects to each of `servers` in turn"""
+    servers = iter(servers)
+    return lambda host, port: next(servers).connect()
+
+class ResumeTests(unittest.TestCase):
+    def testMissedTurn(self):
+        first = DroppingServer(parseTranscript(r"""
+            > LOGIN:A,,resume
+            < LOGIN/SUCCESS:P1,resume
+            < START:"...\n...\n...",1000
+            > MOVE:"2,2"
+        """))
+        second = ScriptedServer(parseTranscript(r"""
+            > LOGIN:A,,resume
+            < LOGIN/SUCCESS:P1,resume
+            < RESUME:"...\n.X.\n...",2,"2,2",,,400
+            < NEXT:,"3,1"
+        """))
+        client = Client('localhost', 0, reconnect=True,
+                        transport=connectInTurn(first, second))
+
+        client.login('A', '')
+        self.assertEqual(client.move('2,2'), ('2,2', ''))
+        self.assertLessEqual(client.deadline().remaining(), 0.4)
+        self.assertEqual(client.waitForNextTurn(), ('', '3,1'))
+        self.assertTrue(second.finished)
+        client.close()
+
+    def testLostMoveIsSentAgain(self):
+        first = DroppingServer(parseTranscript(r"""
+            > LOGIN:A,,resume
+            < LOGIN/SUCCESS:P1,resume
+            < START:"...\n...\n...",1000
+        """))
+        refused = ScriptedServer(parseTranscript(r"""
+            > LOGIN:A,,resume
+            < LOGIN/FAILURE:User already logged in
+        """))
+        second = ScriptedServer(parseTranscript(r"""
+            > LOGIN:A,,resume
+            < LOGIN/SUCCESS:P1,resume
+            < RESUME:"...\n...\n...",1,,,,900
+            > MOVE:"2,2"
+            < NEXT:"2,2",
+        """))
+        client = Client('localhost', 0, reconnect=True,
+                        transport=connectInTurn(first, refused, second))
+
+        client.login('A', '')
+        self.assertEqual(client.move('2,2'), ('2,2', ''))
+        self.assertTrue(second.finished)
+        client.close()
+
+    def testServerWithoutResume(self):
+        server = DroppingServer(parseTranscript(r"""
+            > LOGIN:A,,resume
+            < LOGIN/SUCCESS:P1,
+            < START:"...\n...\n...",1000
+            > MOVE:"2,2"
+        """))
+        client = Client('localhost', 0, reconnect=True,
+                        transport=server.connect)
+
+        client.login('A', '')
+        with self.assertRaises(ConnectionError):
+            client.move('2,2')
+        client.close()
+
+class LargeMessageTests(unittest.TestCase):
+    def testLargeOption(self):
+        state = '.' * 70000
+        server = ScriptedServer(parseTranscript(r"""
+            > LOGIN:A,,large
+            < LOGIN/SUCCESS:P1,large
+            < START:{},1000
+            > MOVE:{}
+            < END:1-0,Done,,
+        """.format(state, 'm' * 600)))
+        client = Client('localhost', 0, transport=server.connect,
+                        largeMessages=True)
+
+        self.assertEqual(client.login('A', ''), ('P1', state, 1))
+        with self.assertRaises(GameEnd):
+            client.move('m' * 600)
+        self.assertTrue(server.finished)
+
+    def testServerWithoutLargeMessages(self):
+        server = ScriptedServer(parseTranscript(r"""
+            > LOGIN:A,,large
+            < LOGIN/SUCCESS:P1,
+        """))
+        client = Client('localhost', 0, transport=server.connect,
+                        largeMessages=True)
+        client._connect()
+        client._loginWithOptions('A', '')
+        self.assertFalse(client._reader.largeFrames)
+        client.close()
+
+class InstrumentsTests(unittest.TestCase):
+    def testSampleGame(self):
+        events = []
+        instruments = Instruments(
+                lambda event, mtype, value: events.append((event, mtype)))
+        server = ScriptedServer(SAMPLE_GAME_P1)
+        client = Client('localhost', 0, transport=server.connect,
+                        instruments=instruments)
+
+        client.login('A', '')
+        with self.assertRaises(GameEnd):
+            for move in ('2,2', '1,3', '1,1', '3,3'):
+                client.move(move)
+        client.close()
+
+        summary = instruments.summary()
+        self.assertEqual(summary['messagesSent'], 5)
+        self.assertEqual(summary['messagesReceived'], 6)
+        #Each message has a length prefix and a CSV line terminator
+        self.assertEqual(summary['bytesSent'], 
+                         sum(4 + len(body) for direction, body 
+                             in SAMPLE_GAME_P1 if direction == '>'))
+
+        stages = summary['stages']
+        self.assertEqual(stages['recv']['count'], 6)
+        self.assertEqual(stages['decode']['count'], 6)
+        self.assertEqual(stages['parse']['count'], 4)
+        self.assertEqual(stages['think']['count'], 4)
+        self.assertEqual(stages['send']['count'], 5)
+        self.assertIn(('received', 'END'), events)
+        self.assertIn(('think', 'MOVE'), events)
+
+    def testDisabledByDefault(self):
+        server = ScriptedServer(SAMPLE_GAME_P1)
+        client = Client('localhost', 0, transport=server.connect)
+        client.login('A', '')
+        client.close()
+        self.assertIsNone(client.instruments)
+
+class HostTests(unittest.TestCase):
+    def setUp(self):
+        self.listener = socket.create_server(('localhost', 0))
+        self.host = Host()
+        self.seat = self.host.add(
+                Client('localhost', self.listener.getsockname()[1]),
+                'A', '', Strategy())
+        self.server, _ = self.listener.accept()
+        while not self.seat._connected:
+            self.host.poll(1)
+        self.serverReader = FrameReader(self.server)
+
+    def tearDown(self):
+        self.host.close()
+        self.server.close()
+        self.listener.close()
+
+    def testLogin(self):
+        self.assertEqual(str(self.serverReader.read(), 'utf-8'), 'LOGIN:A,\r\n')
+        self.assertFalse(self.seat.client._sock.getblocking())
+
+    def testOutputToSlowPeerDoesNotBlock(self):
+        #More than the socket buffers hold while the server isn't reading
+        frame = grebe_codec.encode('MOVE', 'x' * 500)
+        count = 20000
+        self.seat.client._writeBuffer.extend([frame] * count)
+        self.host._flush(self.seat)
+        self.assertTrue(self.seat._output)
+
+        self.serverReader.read()
+        received = 0
+        self.server.settimeout(0)
+        while received < count:
+            self.host.poll(0)
+            while self.serverReader.hasFrame():
+                self.serverReader.read()
+                received += 1
+            try:
+                self.serverReader.fill()
+            except BlockingIOError:
+                pass
+        self.assertFalse(self.seat._output)
+        self.assertEqual(received, count)
+
+if __name__ == '__main__':
+    unittest.main()
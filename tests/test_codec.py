@@ -0,0 +1,151 @@
+#!python3
+#Checks that grebe_codec matches the csv module based encoding and decoding
+#that it replaced in grebe.Client
+
+import os
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(abspath(dirname(__file__)), '..'))
+sys.path.append(join(proj_root, 'clients/Python'))
+
+import csv
+import io
+import random
+import struct
+import unittest
+
+import grebe_codec
+
+def csvEncode(mtype, *args):
+    f = io.StringIO()
+    writer = csv.writer(f)
+    writer.writerow(args)
+    bytes_ = (mtype + ':' + f.getvalue()).encode('utf-8')
+    return struct.pack('!H', len(bytes_)) + bytes_
+
+def csvDecode(body):
+    mtype, argcsv = body.split(':', 1)
+    rows = [row for row in csv.reader(io.StringIO(argcsv))]
+    return mtype, rows[0] if rows else []
+
+def bodyOf(message):
+    return message[2:].decode('utf-8')
+
+MESSAGES = [
+    ('LOGIN', 'A', ''),
+    ('LOGIN', 'Player 1', 'secret'),
+    ('MOVE', '2,2'),
+    ('MOVE', ''),
+    ('MOVE', None),
+    ('MOVE', 12),
+    ('MOVE',),
+    ('FOO', ''),
+    ('NEXT', '2,2', ''),
+    ('NEXT', '', '3,1'),
+    ('NEXT', '', ''),
+    ('START', '...\n...\n...', '1000'),
+    ('START', 'X"O', '60000'),
+    ('END', '1-0', 'Three in a row', '3,3', ''),
+    ('END', '1/2-1/2', 'Out of squares', '', '1,2'),
+    ('INVALID', 'Incorrect number of arguments for MOVE'),
+    ('MOVE', 'a"b'),
+    ('MOVE', '"quoted"'),
+    ('MOVE', 'a\rb'),
+    ('MOVE', ' padded '),
+    ('MOVE', 'éè,中'),
+]
+
+#Bodies in the format sent by server/client.js
+SERVER_BODIES = [
+    'LOGIN/SUCCESS:P1',
+    'LOGIN/FAILURE:User already logged in',
+    'START:"...\n...\n...",1000',
+    'NEXT:"2,2",',
+    'NEXT:,"3,1"',
+    'NEXT:,',
+    'END:1-0,Three in a row,"3,3",',
+    'END:0-1,P1 disconnected,,',
+    'INVALID:Not logged in',
+    'MOVE:"a""b"',
+    'MOVE:a"b,c',
+    'MOVE:"a"b,c',
+    'MOVE:a,"b"c',
+    'MOVE:"unterminated',
+    'MOVE:""',
+    'MOVE:',
+]
+
+class EncodeTests(unittest.TestCase):
+    def testMatchesCsvWriter(self):
+        for message in MESSAGES:
+            with self.subTest(message=message):
+                self.assertEqual(grebe_codec.encode(*message), 
+                                 csvEncode(*message))
+
+    def testRandomFieldsMatchCsvWriter(self):
+        rand = random.Random(1234)
+        alphabet = 'ab ,"\r\n1'
+        for i in range(2000):
+            args = [''.join(rand.choice(alphabet) 
+                            for j in range(rand.randint(0, 6)))
+                    for k in range(rand.randint(0, 4))]
+            self.assertEqual(grebe_codec.encode('MOVE', *args),
+                             csvEncode('MOVE', *args))
+
+    def testLargeMessage(self):
+        state = 'x' * 100000
+        message = grebe_codec.encode('START', state, 1000)
+        self.assertTrue(grebe_codec.isLarge(message))
+        self.assertEqual(message[:grebe_codec.LARGE_HEADER_SIZE],
+                         struct.pack('!HI', 0, len(state) + 13))
+        self.assertEqual(
+            grebe_codec.decode(
+                message[grebe_codec.LARGE_HEADER_SIZE:].decode('utf-8')),
+            ('START', [state, '1000']))
+        self.assertFalse(grebe_codec.isLarge(grebe_codec.encode('MOVE', 'a')))
+
+
+class DecodeTests(unittest.TestCase):
+    def testRoundTrip(self):
+        for message in MESSAGES:
+            with self.subTest(message=message):
+                body = bodyOf(grebe_codec.encode(*message))
+                self.assertEqual(grebe_codec.decode(body), csvDecode(body))
+
+    def testMatchesCsvReader(self):
+        for body in SERVER_BODIES:
+            with self.subTest(body=body):
+                self.assertEqual(grebe_codec.decode(body), csvDecode(body))
+
+    def testRandomBodiesMatchCsvReader(self):
+        rand = random.Random(4321)
+        alphabet = 'ab,"'
+        for i in range(5000):
+            body = 'MOVE:' + ''.join(rand.choice(alphabet) 
+                                     for j in range(rand.randint(0, 10)))
+            self.assertEqual(grebe_codec.decode(body), csvDecode(body))
+
+    def testLargeBoardWithLineBreaks(self):
+        #Larger than the csv module's field size limit
+        board = ('.' * 511 + '\n') * 512
+        message = grebe_codec.encode('START', board, 1000)
+        body = message[grebe_codec.LARGE_HEADER_SIZE:].decode('utf-8')
+        self.assertEqual(grebe_codec.decode(body), ('START', [board, '1000']))
+
+    def testNoColon(self):
+        with self.assertRaises(ValueError):
+            grebe_codec.decode('NEXT')
+
+    def testMultipleRows(self):
+        with self.assertRaises(ValueError):
+            grebe_codec.decode('NEXT:a\nb')
+
+    def testUnterminatedFieldTooLarge(self):
+        #The csv module raises its own error for fields over its size limit
+        with self.assertRaises(ValueError):
+            grebe_codec.decode('MOVE:"' + 'x' * 200000)
+
+if __name__ == '__main__':
+    unittest.main()
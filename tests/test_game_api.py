@@ -0,0 +1,54 @@
+#!python3
+#Runs the game module conformance suite on the Python game modules
+
+import os
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(abspath(dirname(__file__)), '..'))
+sys.path.append(join(proj_root, 'server'))
+
+import unittest
+
+from game_api import (Game, checkConformance, loadCases, loadGameClass)
+
+TICTACTOE = join(proj_root, 'samples/tictactoe/server')
+
+class GameApiTests(unittest.TestCase):
+    def setUp(self):
+        self.cases = loadCases(join(TICTACTOE, 'conformance.json'))
+        self.TicTacToe = loadGameClass(join(TICTACTOE, 'game.py'))
+
+    def testTicTacToeImplementsGame(self):
+        self.assertIsInstance(self.TicTacToe(), Game)
+
+    def testTicTacToeConforms(self):
+        self.assertEqual(checkConformance(self.TicTacToe, self.cases), [])
+
+    def testDifferencesFound(self):
+        class NoDraws(self.TicTacToe):
+            def move(self, value):
+                toMove = super().move(value)
+                if self.result == '1/2-1/2':
+                    self.result = '1-0'
+                return toMove
+
+        failures = checkConformance(NoDraws, self.cases)
+        self.assertTrue(failures)
+        self.assertTrue(any(failure.startswith('Draw:')
+                            for failure in failures))
+
+    def testMissingMembersFound(self):
+        class NoState():
+            result = None
+            resultReason = None
+            def start(self):
+                return {'P1': True, 'P2': False}
+            def move(self, value):
+                return None
+
+        self.assertEqual(len(checkConformance(NoState, self.cases)), 1)
+
+if __name__ == '__main__':
+    unittest.main()
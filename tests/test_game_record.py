@@ -0,0 +1,108 @@
+#!python3
+#Unit tests for the game record archive format
+
+import os
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(abspath(dirname(__file__)), '..'))
+sys.path.append(join(proj_root, 'server'))
+
+import shutil
+import tempfile
+import unittest
+
+from game_record import (GameRecord, INDEX_SUFFIX, InvalidArchive,
+                         RecordReader, RecordWriter, Turn, decodeRecord,
+                         encodeRecord)
+
+def sampleRecord(number=0):
+    return GameRecord('A', 'B', 1000, '...\n...\n...',
+                      [Turn(0, '2,2', None),
+                       Turn(12, None, '3,1'),
+                       Turn(20 + number, '', None)],
+                      '1-0', 'Game {}'.format(number))
+
+class GameRecordTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = join(self.directory, 'games.rec')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def writeGames(self, count):
+        with RecordWriter(self.path) as writer:
+            for i in range(count):
+                writer.write(sampleRecord(i))
+
+    def testEncodeDecode(self):
+        record = sampleRecord()
+        self.assertEqual(decodeRecord(encodeRecord(record)), record)
+
+    def testLongMoves(self):
+        #Lengths that don't fit in 2 bytes, or equal the old NO_MOVE
+        for length in (0xFFFF, 70000):
+            record = GameRecord('A', 'B', 1000, '...',
+                                [Turn(0, 'x' * length, None)],
+                                '1-0', 'r' * length)
+            self.assertEqual(decodeRecord(encodeRecord(record)), record)
+
+    def testIterate(self):
+        self.writeGames(3)
+        with RecordReader(self.path) as reader:
+            self.assertEqual(list(reader),
+                             [sampleRecord(i) for i in range(3)])
+
+    def testAppend(self):
+        self.writeGames(2)
+        self.writeGames(1)
+        with RecordReader(self.path) as reader:
+            self.assertEqual(len(reader), 3)
+            self.assertEqual(reader[2], sampleRecord(0))
+
+    def testRandomAccess(self):
+        self.writeGames(5)
+        with RecordReader(self.path) as reader:
+            self.assertEqual(len(reader), 5)
+            self.assertEqual(reader[3], sampleRecord(3))
+            self.assertEqual(reader[-1], sampleRecord(4))
+
+    def testMissingIndex(self):
+        self.writeGames(4)
+        os.remove(self.path + INDEX_SUFFIX)
+        with RecordReader(self.path) as reader:
+            self.assertEqual(len(reader), 4)
+            self.assertEqual(reader[1], sampleRecord(1))
+
+    def testIncompleteIndex(self):
+        self.writeGames(4)
+        with open(self.path + INDEX_SUFFIX, 'r+b') as f:
+            f.truncate(8 + 2 * 8 + 3)
+        with RecordReader(self.path) as reader:
+            self.assertEqual(len(reader), 4)
+            self.assertEqual(reader[3], sampleRecord(3))
+
+    def testTruncatedRecordIgnored(self):
+        self.writeGames(2)
+        with open(self.path, 'ab') as f:
+            f.write(encodeRecord(sampleRecord(2))[:-5])
+        with RecordReader(self.path) as reader:
+            self.assertEqual(len(list(reader)), 2)
+            self.assertEqual(len(reader), 2)
+
+    def testNotAnArchive(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not an archive')
+        with self.assertRaises(InvalidArchive):
+            RecordReader(self.path)
+
+    def testAppendToOtherArchive(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'GRBREC01')
+        with self.assertRaises(InvalidArchive):
+            RecordWriter(self.path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+#!python3
+#Unit tests for the alpha-beta engine, using the tic-tac-toe adapter
+
+import os
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(abspath(dirname(__file__)), '..'))
+sys.path.append(join(proj_root, 'clients/Python'))
+sys.path.append(join(proj_root, 'samples/tictactoe/clients/Python'))
+sys.path.append(join(proj_root, 'samples/tictactoe/players/Python'))
+
+import tempfile
+import time
+import unittest
+
+import perfect_table
+
+from grebe import Deadline
+from grebe_search import (EXACT, LOWER, Engine, TranspositionTable)
+from tictactoe import (Position, SearchAdapter, TicTacToe)
+
+def parse(board):
+    return Position.fromState(TicTacToe._parseState(None, board))
+
+def reachable(position, seen):
+    """Yields every position reachable from `position` that isn't over"""
+    if position.result is not None or position in seen:
+        return
+    seen.add(position)
+    yield position.copy()
+    for cell in list(position.legalMoves()):
+        position.apply(cell)
+        yield from reachable(position, seen)
+        position.undo(cell)
+
+class TranspositionTableTests(unittest.TestCase):
+    def testStoreAndProbe(self):
+        table = TranspositionTable(16)
+        table.store(0x1234, 3, EXACT, 7, 'a')
+        self.assertEqual(table.probe(0x1234), (3, EXACT, 7, 'a'))
+        self.assertIsNone(table.probe(0x5234))
+        self.assertEqual(table.used(), 1)
+
+    def testReplacement(self):
+        table = TranspositionTable(16)
+        table.store(0x10, 5, EXACT, 1, 'deep')
+
+        #A shallower search in the same generation doesn't replace it
+        table.store(0x20, 2, LOWER, 2, 'shallow')
+        self.assertEqual(table.probe(0x10)[3], 'deep')
+
+        table.store(0x20, 5, LOWER, 2, 'same depth')
+        self.assertEqual(table.probe(0x20)[3], 'same depth')
+
+        #Anything replaces an entry from an earlier search
+        table.newSearch()
+        table.store(0x30, 1, EXACT, 3, 'new')
+        self.assertEqual(table.probe(0x30)[3], 'new')
+
+    def testSizeMustBePowerOf2(self):
+        with self.assertRaises(ValueError):
+            TranspositionTable(100)
+
+class SearchAdapterTests(unittest.TestCase):
+    def testIncrementalHash(self):
+        adapter = SearchAdapter()
+        position = Position()
+        key = adapter.hash(position)
+        for cell in (4, 0, 8, 2):
+            key ^= adapter.moveHash(position, cell)
+            adapter.apply(position, cell)
+            self.assertEqual(key, adapter.hash(position))
+
+class EngineTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        path = join(cls.directory.name, 'perfect.table')
+        perfect_table.generate(path)
+        cls.table = perfect_table.PerfectTable(path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.table.close()
+        cls.directory.cleanup()
+
+    def setUp(self):
+        self.engine = Engine(SearchAdapter(), 1 << 12)
+
+    def testTakesWin(self):
+        result = self.engine.search(parse('XX.\nOO.\n...'))
+        self.assertEqual(result.move, 2)
+        self.assertEqual(result.score, 5)
+
+    def testBlocksLoss(self):
+        result = self.engine.search(parse('XX.\n.O.\n...'))
+        self.assertEqual(result.move, 2)
+
+    def testMatchesPerfectTable(self):
+        values = {perfect_table.WIN: 1, perfect_table.DRAW: 0,
+                  perfect_table.LOSS: -1}
+        for position in reachable(Position(), set()):
+            result = self.engine.search(position)
+            _, value = self.table.lookup(position)
+            self.assertEqual((result.score > 0) - (result.score < 0),
+                             values[value], position)
+
+            #The move chosen keeps the position's value
+            position.apply(result.move)
+            if position.result is None:
+                _, valueAfter = self.table.lookup(position)
+                moveValue = -values[valueAfter]
+            else:
+                moveValue = 0 if position.result == '1/2-1/2' else 1
+            self.assertEqual(moveValue, values[value], position)
+
+    def testReportsNodes(self):
+        result = self.engine.search(Position())
+        self.assertEqual(result.depth, 9)
+        self.assertGreater(result.nodes, 0)
+        self.assertGreater(result.nodesPerSecond, 0)
+
+    def testReusesTable(self):
+        first = self.engine.search(Position())
+        second = self.engine.search(Position())
+        self.assertEqual(second.score, first.score)
+        self.assertLess(second.nodes, first.nodes)
+
+    def testFinishedPositionAfterSearch(self):
+        self.engine.search(Position())
+        result = self.engine.search(parse('XXX\nOO.\n...'))
+        self.assertIsNone(result.move)
+
+    def testStopsAtDeadline(self):
+        deadline = Deadline(time.monotonic())
+        result = self.engine.search(Position(), deadline)
+        self.assertLess(result.depth, 9)
+
+    def testMaxDepth(self):
+        result = self.engine.search(Position(), maxDepth=2)
+        self.assertEqual(result.depth, 2)
+        self.assertIn(result.move, range(9))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+#!python3
+#Unit tests for the tic-tac-toe client's bitboard position
+
+import os
+import sys
+
+from os.path import (abspath, dirname, join, normpath)
+
+proj_root = normpath(join(abspath(dirname(__file__)), '..'))
+sys.path.append(join(proj_root, 'clients/Python'))
+sys.path.append(join(proj_root, 'samples/tictactoe/clients/Python'))
+sys.path.append(join(proj_root, 'samples/tictactoe/players/Python'))
+
+import random
+import tempfile
+import time
+import unittest
+
+import mcts
+import perfect_table
+
+from grebe import Deadline
+from tictactoe import (Position, TicTacToe, cellOf, coordsOf)
+
+def parse(board):
+    return TicTacToe._parseState(None, board)
+
+class PositionTests(unittest.TestCase):
+    def testFromState(self):
+        position = Position.fromState(parse('X..\n.O.\n..X'))
+        self.assertEqual(position.x, 0b100000001)
+        self.assertEqual(position.o, 0b000010000)
+        self.assertEqual(position.moveCount, 3)
+        self.assertFalse(position.isP1ToMove)
+
+    def testLegalMoves(self):
+        position = Position.fromState(parse('XO.\n.X.\nO..'))
+        self.assertEqual(list(position.legalMoves()), [2, 3, 5, 7, 8])
+
+    def testApplyAndUndo(self):
+        position = Position()
+        for cell in (4, 0, 8):
+            position.apply(cell)
+        self.assertEqual(position, Position.fromState(parse('O..\n.X.\n..X')))
+
+        position.undo(8)
+        position.undo(0)
+        position.undo(4)
+        self.assertEqual(position, Position())
+
+    def testResult(self):
+        self.assertEqual(Position.fromState(parse('XXX\nOO.\n...')).result,
+                         '1-0')
+        self.assertEqual(Position.fromState(parse('XX.\nOOO\nX..')).result,
+                         '0-1')
+        self.assertEqual(Position.fromState(parse('XOX\nXOO\nOXX')).result,
+                         '1/2-1/2')
+        self.assertEqual(Position().result, None)
+
+    def testCoords(self):
+        for row in (1, 2, 3):
+            for column in (1, 2, 3):
+                self.assertEqual(coordsOf(cellOf(row, column)), 
+                                 (row, column))
+
+    def testClientFollowsTurns(self):
+        client = TicTacToe('localhost', 0)
+        client._onStart(parse('...\n...\n...'))
+        client._onNext((2, 2), None)
+        client._onNext(None, (1, 3))
+        self.assertEqual(client.position, 
+                         Position.fromState(parse('..O\n.X.\n...')))
+
+        #The server lets a move replace a mark
+        client._onNext((1, 3), None)
+        self.assertEqual(client.position.x, 0b000010100)
+        self.assertEqual(client.position.o, 0)
+        self.assertEqual(client.position.moveCount, 3)
+
+class PerfectTableTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        path = join(cls.directory.name, 'perfect.table')
+        cls.count = perfect_table.generate(path)
+        cls.table = perfect_table.PerfectTable(path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.table.close()
+        cls.directory.cleanup()
+
+    def testPositionCount(self):
+        self.assertEqual(self.count, 5478)
+
+    def testEmptyBoardIsDrawn(self):
+        cell, value = self.table.lookup(Position())
+        self.assertEqual(value, perfect_table.DRAW)
+
+    def testTakesWin(self):
+        position = Position.fromState(parse('XX.\nOO.\n...'))
+        self.assertEqual(self.table.lookup(position), 
+                         (2, perfect_table.WIN))
+
+    def testBlocksLoss(self):
+        position = Position.fromState(parse('XX.\n.O.\n...'))
+        self.assertEqual(self.table.bestMove(position), 2)
+
+    def testGameOver(self):
+        position = Position.fromState(parse('XXX\nOO.\n...'))
+        self.assertEqual(self.table.lookup(position), 
+                         (None, perfect_table.LOSS))
+
+    def testSelfPlayIsDrawn(self):
+        position = Position()
+        while position.result is None:
+            position.apply(self.table.bestMove(position))
+        self.assertEqual(position.result, '1/2-1/2')
+
+class MCTSTests(unittest.TestCase):
+    def grown(self, position, playouts, seed=1):
+        root = mcts.Node()
+        rng = random.Random(seed)
+        for i in range(playouts):
+            mcts.playout(root, position.copy(), rng)
+        return root
+
+    def testTakesWin(self):
+        position = Position.fromState(parse('XX.\nOO.\n...'))
+        self.assertEqual(mcts.bestCell(self.grown(position, 2000).stats()), 2)
+
+    def testBlocksLoss(self):
+        position = Position.fromState(parse('XX.\n.O.\n...'))
+        self.assertEqual(mcts.bestCell(self.grown(position, 3000).stats()), 2)
+
+    def testMergeStats(self):
+        stats = [self.grown(Position(), 100, seed).stats() for seed in (1, 2)]
+        merged = mcts.mergeStats(stats)
+
+        self.assertEqual(sum(visits for visits, wins in merged.values()), 200)
+        for cell, (visits, wins) in merged.items():
+            self.assertEqual(visits, sum(tree.get(cell, (0, 0))[0]
+                                         for tree in stats))
+
+    def testSubtree(self):
+        position = Position()
+        root = self.grown(position, 500)
+        after = position.copy()
+        after.apply(4)
+        after.apply(0)
+        self.assertIs(mcts.subtree(root, position, after),
+                      root.children[4].children[0])
+
+        #The server lets a move replace a mark, which isn't in the tree
+        replaced = after.copy()
+        replaced.replace(0)
+        self.assertIsNone(mcts.subtree(root, after, replaced))
+
+    def testSearcherReusesTree(self):
+        position = Position()
+        with mcts.Searcher(2, seed=1) as searcher:
+            cell = searcher.search(position, Deadline(time.monotonic() + 0.3))
+            self.assertIn(cell, range(9))
+            self.assertGreater(searcher.playouts, 0)
+            self.assertEqual(sum(visits for visits, wins
+                                 in searcher.stats.values()),
+                             searcher.playouts)
+
+            position.apply(cell)
+            position.apply(next(position.legalMoves()))
+            searcher.search(position, Deadline(time.monotonic() + 0.3))
+            self.assertGreater(searcher.reused, 0)
+
+if __name__ == '__main__':
+    unittest.main()